@@ -1,36 +1,14 @@
 import streamlit as st
-import os
-import firebase_admin
-from firebase_admin import credentials, firestore
-from dotenv import load_dotenv
 import pandas as pd
-
-# Inicialização do Firebase (usando cache para evitar reconexões)
-@st.cache_resource
-def init_firebase():
-    """Inicializa a conexão com o Firebase de forma segura."""
-    load_dotenv()
-    try:
-        FIREBASE_KEY_PATH = os.getenv("FIREBASE_KEY_PATH", "app/firebase_key.json")
-        if not os.path.exists(FIREBASE_KEY_PATH):
-            st.error(f"Arquivo de chave do Firebase não encontrado em: {FIREBASE_KEY_PATH}")
-            st.stop()
-        
-        if not firebase_admin._apps:
-            cred = credentials.Certificate(FIREBASE_KEY_PATH)
-            firebase_admin.initialize_app(cred)
-            
-    except Exception as e:
-        st.error(f"Erro ao inicializar o Firebase: {e}")
-        st.stop()
-        
-    return firestore.client()
-
-db = init_firebase()
+from metricas import medir, nova_requisicao
+from repositorio import obter_repositorio
+from projeto import ConflitoMedicao
 
 def main():
     st.set_page_config(layout="wide")
     st.title("Atualização da Medição do Projeto")
+    nova_requisicao(pagina="medicoes")
+    repositorio = obter_repositorio()
 
     # --- Seção de Busca de Projeto ---
     st.header("1. Encontre o Projeto")
@@ -45,35 +23,35 @@ def main():
         st.info("Digite um termo para iniciar a busca de projetos.")
         st.stop()
 
-    # Consulta no Firestore
-    projetos_ref = db.collection("projetos").stream()
+    # Consulta no índice em memória (mantido atualizado por listener do Firestore)
     campo_firebase = campos_busca[campo_escolhido]
-
-    projetos_filtrados = []
-    for doc in projetos_ref:
-        data = doc.to_dict()
-        if termo_busca.lower() in str(data.get(campo_firebase, "")).lower():
-            projetos_filtrados.append((doc.id, data))
+    with medir("busca_projetos", campo=campo_firebase):
+        projetos_filtrados = repositorio.buscar(termo_busca, campo_firebase)
 
     if not projetos_filtrados:
         st.warning("Nenhum projeto encontrado com os critérios de busca.")
         st.stop()
 
     # --- Seção de Seleção e Edição ---
-    projeto_opcoes = {f"{d.get('n_contrato', 'Sem Contrato')} - {d.get('objeto', 'Sem Objeto')}": (doc_id, d) 
-                      for doc_id, d in projetos_filtrados}
+    projeto_opcoes = {f"{p.dados.get('n_contrato', 'Sem Contrato')} - {p.dados.get('objeto', 'Sem Objeto')}": p
+                      for p in projetos_filtrados}
     
     nome_projeto_selecionado = st.selectbox("Selecione o projeto para editar:", list(projeto_opcoes.keys()))
     
     if not nome_projeto_selecionado:
         st.stop()
 
-    projeto_id, projeto_data = projeto_opcoes[nome_projeto_selecionado]
+    # Versão mais recente do projeto (cache compartilhado, invalidado a cada gravação)
+    projeto = repositorio.obter(projeto_opcoes[nome_projeto_selecionado].id)
+    if projeto is None:
+        st.error("O projeto selecionado não existe mais.")
+        st.stop()
+    projeto_id, projeto_data = projeto.id, projeto.dados
 
     st.header("2. Edite a Tabela de Medição")
     
     # Carrega a tabela de medição e o prazo original
-    tabela_medicao_dados = projeto_data.get("tabela_medicao", [])
+    tabela_medicao_dados = projeto.medicao
     prazo_meses_original = int(projeto_data.get("prazo_meses", 12))
     medicao_atual = int(projeto_data.get("medicao_atual", 1))
     
@@ -165,22 +143,23 @@ def main():
                 
                 # --- FIM DO NOVO CÓDIGO ---
 
-                tabela_medicao_atualizada = df_final.fillna("").to_dict(orient='records')
-                
-                # ATUALIZA O PRAZO E O MÊS ATUAL DO PROJETO SE NECESSÁRIO
-                dados_para_atualizar = {
-                    "tabela_medicao": tabela_medicao_atualizada,
-                    "medicao_atual": int(mes_medicao_atual)
-                }
-                if mes_medicao_atual > prazo_meses_original:
-                    dados_para_atualizar["prazo_meses"] = mes_medicao_atual
-                
-                db.collection("projetos").document(projeto_id).update(dados_para_atualizar)
+                # Grava apenas os meses alterados (e seus totais), em uma transação
+                meses_gravados = repositorio.salvar_medicao(
+                    projeto_id, projeto.tabelas,
+                    df_para_salvar[colunas_meses].to_numpy(dtype=float),
+                    medicao_atual=int(mes_medicao_atual),
+                    prazo_meses=mes_medicao_atual if mes_medicao_atual > prazo_meses_original else None,
+                )
                 
-                st.success("Tabela de medição atualizada com sucesso!")
+                if meses_gravados:
+                    st.success(f"Tabela de medição atualizada com sucesso! Mês(es) gravado(s): {', '.join(map(str, meses_gravados))}.")
+                else:
+                    st.success("Nenhum valor alterado; mês de medição atualizado.")
                 st.write("Dados atualizados (com totais por mês):")
                 st.dataframe(df_final)
 
+            except ConflitoMedicao as e:
+                st.error(f"As alterações não foram salvas: {e}")
             except Exception as e:
                 st.error(f"Ocorreu um erro ao salvar as alterações: {e}")
 
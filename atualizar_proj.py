@@ -1,36 +1,13 @@
 import streamlit as st
-import os
-import firebase_admin
-from firebase_admin import credentials, firestore
-from dotenv import load_dotenv
 import pandas as pd
-
-# Inicialização do Firebase (usando cache para evitar reconexões)
-@st.cache_resource
-def init_firebase():
-    """Inicializa a conexão com o Firebase de forma segura."""
-    load_dotenv()
-    try:
-        FIREBASE_KEY_PATH = os.getenv("FIREBASE_KEY_PATH", "app/firebase_key.json")
-        if not os.path.exists(FIREBASE_KEY_PATH):
-            st.error(f"Arquivo de chave do Firebase não encontrado em: {FIREBASE_KEY_PATH}")
-            st.stop()
-        
-        if not firebase_admin._apps:
-            cred = credentials.Certificate(FIREBASE_KEY_PATH)
-            firebase_admin.initialize_app(cred)
-            
-    except Exception as e:
-        st.error(f"Erro ao inicializar o Firebase: {e}")
-        st.stop()
-        
-    return firestore.client()
-
-db = init_firebase()
+from metricas import medir, nova_requisicao
+from repositorio import obter_repositorio
 
 def main():
     st.set_page_config(layout="wide")
     st.title("Atualização do Projeto")
+    nova_requisicao(pagina="atualizar")
+    repositorio = obter_repositorio()
 
     # --- Seção de Busca de Projeto ---
     st.header("1. Encontre o Projeto")
@@ -45,35 +22,35 @@ def main():
         st.info("Digite um termo para iniciar a busca de projetos.")
         st.stop()
 
-    # Consulta no Firestore
-    projetos_ref = db.collection("projetos").stream()
+    # Consulta no índice em memória (mantido atualizado por listener do Firestore)
     campo_firebase = campos_busca[campo_escolhido]
-
-    projetos_filtrados = []
-    for doc in projetos_ref:
-        data = doc.to_dict()
-        if termo_busca.lower() in str(data.get(campo_firebase, "")).lower():
-            projetos_filtrados.append((doc.id, data))
+    with medir("busca_projetos", campo=campo_firebase):
+        projetos_filtrados = repositorio.buscar(termo_busca, campo_firebase)
 
     if not projetos_filtrados:
         st.warning("Nenhum projeto encontrado com os critérios de busca.")
         st.stop()
 
     # --- Seção de Seleção e Edição ---
-    projeto_opcoes = {f"{d.get('n_contrato', 'Sem Contrato')} - {d.get('objeto', 'Sem Objeto')}": (doc_id, d) 
-                      for doc_id, d in projetos_filtrados}
+    projeto_opcoes = {f"{p.dados.get('n_contrato', 'Sem Contrato')} - {p.dados.get('objeto', 'Sem Objeto')}": p
+                      for p in projetos_filtrados}
     
     nome_projeto_selecionado = st.selectbox("Selecione o projeto para editar:", list(projeto_opcoes.keys()))
     
     if not nome_projeto_selecionado:
         st.stop()
 
-    projeto_id, projeto_data = projeto_opcoes[nome_projeto_selecionado]
+    # Versão mais recente do projeto (cache compartilhado, invalidado a cada gravação)
+    projeto = repositorio.obter(projeto_opcoes[nome_projeto_selecionado].id)
+    if projeto is None:
+        st.error("O projeto selecionado não existe mais.")
+        st.stop()
+    projeto_id, projeto_data = projeto.id, projeto.dados
 
     st.header("2. Edite a Tabela de Projeto")
     
-    # Carrega a tabela de medição e o prazo original
-    tabela_medicao_dados = projeto_data.get("table", [])
+    # Carrega a tabela de planejamento (sem a linha de total, recalculada na leitura) e o prazo original
+    tabela_medicao_dados = projeto.tabelas.linhas_planejamento(incluir_total=False)
     prazo_meses_original = int(projeto_data.get("prazo_meses", 12))
     
     
@@ -133,16 +110,18 @@ def main():
                 
                 df_editado['Total por etapa'] = pd.to_numeric(df_editado['Total por etapa'], errors='coerce').fillna(0)
 
-                tabela_planejamento_atualizada = df_editado.fillna("").to_dict(orient='records')
-                
                 # --- ALTERAÇÃO 2: ATUALIZA O PRAZO DO PROJETO SE NECESSÁRIO ---
-                dados_para_atualizar = {
-                    "table": tabela_planejamento_atualizada,
-                }
-                if mes_medicao_atual > prazo_meses_original:
-                    dados_para_atualizar["prazo_meses"] = mes_medicao_atual
-                
-                db.collection("projetos").document(projeto_id).update(dados_para_atualizar)
+                novo_prazo = mes_medicao_atual if mes_medicao_atual > prazo_meses_original else None
+
+                # Grava no esquema colunar (v2) em uma transação que relê o documento: a medição
+                # gravada por outra pessoa depois que esta página carregou o projeto é preservada
+                repositorio.salvar_planejamento(
+                    projeto_id,
+                    df_editado['Item'].astype(str),
+                    df_editado['Total por etapa'],
+                    df_editado[colunas_meses].to_numpy(dtype=float),
+                    prazo_meses=novo_prazo,
+                )
                 
                 st.success("Tabela de medição atualizada com sucesso!")
                 st.write("Dados atualizados:")
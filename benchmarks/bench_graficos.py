@@ -0,0 +1,84 @@
+"""
+Compara o gráfico de aderência completo (uma barra por item) com o modo resumido
+(os itens de maior desvio + "Outros", dentro do orçamento de pixels) em projetos
+sintéticos grandes: tempo de desenho, tamanho do PNG e dimensões da imagem.
+
+Uso:
+    python benchmarks/bench_graficos.py
+    python benchmarks/bench_graficos.py --itens 100 400 1000 --max-itens 25 --saida graficos.json
+"""
+import argparse
+import json
+import struct
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks.bench_relatorio import _medir, _resumo
+from benchmarks.firestore_memoria import FirestoreMemoria
+from projeto import carregar_projeto
+import processamento
+from data_gen import graphs
+from data_gen.table import ParametrosGeracao, gerar_projeto
+
+ITENS_PADRAO = [25, 100, 400, 1000]
+
+
+def _dimensoes_png(png: bytes):
+    """(largura, altura) lidas do cabeçalho IHDR do PNG."""
+    return struct.unpack(">II", png[16:24])
+
+def medir_itens(n_itens, n_meses, max_itens, repeticoes):
+    db = FirestoreMemoria()
+    parametros = ParametrosGeracao(itens=n_itens, meses=n_meses, atraso=0, progresso=2 / 3)
+    db.collection("projetos").document("bench").set(gerar_projeto(0, parametros))
+    tabela_5 = processamento.gerar_tabela_previsto_realizado_acumulado(carregar_projeto(db, "bench"))
+
+    modos = {}
+    for modo, limite in (("completo", 0), ("resumido", max_itens)):
+        # O modo completo reproduz o gráfico anterior: sem limite de itens nem de pixels
+        orcamento = graphs.MAX_PIXELS_GRAFICO if limite else 0
+        graphs.MAX_PIXELS_GRAFICO, anterior = orcamento, graphs.MAX_PIXELS_GRAFICO
+        try:
+            tempos, png = _medir(lambda: graphs.gerar_grafico_aderencia(tabela_5, max_itens=limite), repeticoes)
+        finally:
+            graphs.MAX_PIXELS_GRAFICO = anterior
+        largura, altura = _dimensoes_png(png)
+        modos[modo] = dict(_resumo(tempos), png_kb=round(len(png) / 1024, 1), largura_px=largura, altura_px=altura)
+    return {"itens": n_itens, "meses": n_meses, "modos": modos}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itens", type=int, nargs="+", default=ITENS_PADRAO)
+    parser.add_argument("--meses", type=int, default=24)
+    parser.add_argument("--max-itens", type=int, default=graphs.MAX_ITENS_ADERENCIA)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Grava o resultado neste arquivo JSON")
+    args = parser.parse_args()
+
+    # Importa e inicializa o matplotlib fora da medida
+    graphs.gerar_grafico_aderencia(pd.DataFrame({"Item": ["A"], "Valor Previsto Acumulado": [1],
+                                                 "Valor Realizado Acumulado": [1]}))
+
+    resultados = []
+    for n_itens in args.itens:
+        r = medir_itens(n_itens, args.meses, args.max_itens, args.repeticoes)
+        resultados.append(r)
+        for modo, m in r["modos"].items():
+            print(f"{n_itens:>5} itens  {modo:<9} {m['min_s'] * 1000:9.1f}ms  {m['png_kb']:9.1f} KB  "
+                  f"{m['largura_px']}x{m['altura_px']} px", file=sys.stderr)
+
+    texto = json.dumps({"max_itens": args.max_itens, "max_pixels": graphs.MAX_PIXELS_GRAFICO,
+                        "resultados": resultados}, indent=2, ensure_ascii=False)
+    if args.saida:
+        Path(args.saida).write_text(texto, encoding="utf-8")
+    else:
+        print(texto)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Mede o custo de importação de cada página (partida a frio de um processo novo).
+
+Cada módulo é importado em um interpretador novo com `python -X importtime`, de modo
+que nada vem de importações anteriores. São reportados o tempo total da importação
+(cumulativo do módulo) e os pacotes que mais pesam nele. Como o `main.py` importa
+as páginas sob demanda, a abertura do app custa o `main` + a página inicial; as
+demais só pagam a importação quando são abertas pela primeira vez.
+
+Uso:
+    python benchmarks/bench_importacao.py
+    python benchmarks/bench_importacao.py --modulos consultar_proj relatorio --repeticoes 5 --saida importacao.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Módulos medidos por padrão: as páginas do registro do main.py e as dependências pesadas
+MODULOS_PADRAO = [
+    "streamlit", "home", "cadastro_proj", "consultar_proj", "atualizar_proj", "atualizar_medi",
+    "relatorio", "lote",
+]
+MAIORES = 8
+
+
+def medir_importacao(modulo: str):
+    """
+    Importa `modulo` em um processo novo e retorna (total em s, {pacote: cumulativo em s}).
+    O tempo de `streamlit` é incluído quando o módulo o importa, como no app.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip().splitlines()[-1])
+
+    # Os filhos são listados antes do módulo que os importou; o recuo do nome indica
+    # a profundidade (2 espaços por nível)
+    pacotes, filhos, total = {}, {}, None
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha.split(":", 1)[1].split("|")
+        try:
+            cumulativo = int(cumulativo) / 1e6
+        except ValueError:
+            continue   # cabeçalho
+        nome = nome.rstrip()[1:]
+        if not nome.startswith(" "):
+            if nome == modulo:
+                total, pacotes = cumulativo, filhos
+            filhos = {}
+        elif not nome.startswith("   "):
+            # Importações diretas, agrupadas pelo pacote de primeiro nível
+            pacote = nome.strip().split(".")[0]
+            filhos[pacote] = filhos.get(pacote, 0.0) + cumulativo
+    return total, pacotes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulos", nargs="+", default=MODULOS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Grava o resultado neste arquivo JSON")
+    args = parser.parse_args()
+
+    resultados = {}
+    for modulo in args.modulos:
+        try:
+            medidas = [medir_importacao(modulo) for _ in range(args.repeticoes)]
+        except RuntimeError as e:
+            print(f"{modulo:<16} erro: {e}", file=sys.stderr)
+            continue
+        totais = [total for total, _ in medidas]
+        pacotes = medidas[-1][1]
+        maiores = sorted(pacotes.items(), key=lambda p: p[1], reverse=True)[:MAIORES]
+        resultados[modulo] = {
+            "mediana_s": round(statistics.median(totais), 4),
+            "min_s": round(min(totais), 4),
+            "maiores": {nome: round(t, 4) for nome, t in maiores},
+        }
+        detalhe = ", ".join(f"{nome} {t * 1000:.0f}ms" for nome, t in maiores)
+        print(f"{modulo:<16} {statistics.median(totais) * 1000:8.0f}ms   {detalhe}", file=sys.stderr)
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Mede o tempo de compilação e de preenchimento de um template com centenas de
+placeholders (parte deles quebrada em vários runs) e tabelas grandes.
+
+Mede também a inserção de uma tabela de `--linhas-tabela` linhas (DataFrame) pelo
+escritor de XML em bloco de `template_docx` e pela forma anterior, com a API do
+python-docx (`add_table` + `rows[i].cells` + `add_run` por célula).
+
+Uso:
+    python benchmarks/bench_preencher_campos.py --placeholders 500 --tabelas 5 --linhas 300 --linhas-tabela 500
+"""
+import argparse
+import json
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+from docx import Document
+from docx.shared import Pt
+from template_docx import TemplateCompilado, _inserir_tabela_apos, normalize_table
+
+
+def criar_template(n_placeholders, n_tabelas):
+    doc = Document()
+    for i in range(n_placeholders):
+        p = doc.add_paragraph(f"Parágrafo {i}: valor ")
+        if i % 3 == 0:
+            # Simula o Word quebrando o placeholder em vários runs
+            for parte in ("{{", "campo_", str(i), "}}"):
+                p.add_run(parte)
+        else:
+            p.add_run(f"{{{{campo_{i}}}}}")
+        p.add_run(" fim.")
+    for t in range(n_tabelas):
+        doc.add_paragraph(f"{{{{tabela_{t}}}}}")
+    buffer = BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def criar_dados(n_placeholders, n_tabelas, n_linhas):
+    dados = {f"campo_{i}": f"texto {i}" for i in range(n_placeholders)}
+    for t in range(n_tabelas):
+        dados[f"tabela_{t}"] = [
+            {"Item": f"Etapa {r}", "Total por etapa": r * 10.0, "Percentual": f"{r / n_linhas:.2%}"}
+            for r in range(n_linhas)
+        ]
+    return dados
+
+def _inserir_tabela_api(doc, p_element, records):
+    """Inserção anterior de `template_docx`, célula a célula pela API do python-docx (referência)."""
+    cols = list(records[0].keys())
+    table = doc.add_table(rows=1 + len(records), cols=len(cols), style='Table Grid')
+    table.autofit = True
+    hdr_cells = table.rows[0].cells
+    for j, c in enumerate(cols):
+        run = hdr_cells[j].paragraphs[0].add_run(str(c))
+        run.bold = True
+        run.font.size = Pt(10)
+    for i, row_data in enumerate(records, start=1):
+        row_cells = table.rows[i].cells
+        for j, c in enumerate(cols):
+            cell_value = row_data.get(c)
+            run = row_cells[j].paragraphs[0].add_run("" if cell_value is None else str(cell_value))
+            run.font.size = Pt(10)
+    p_element.addnext(table._element)
+
+def medir_tabela(n_linhas, repeticoes):
+    """Tempo mínimo de inserção de uma tabela de `n_linhas` linhas e 6 colunas, em bloco e pela API."""
+    df = pd.DataFrame({
+        "Item": [f"Etapa {r}" for r in range(n_linhas)],
+        "Total por etapa": [r * 10.0 for r in range(n_linhas)],
+        "Percentual": [f"{r / n_linhas:.2%}" for r in range(n_linhas)],
+        "Previsto": [f"R$ {r * 1.5:,.2f}" for r in range(n_linhas)],
+        "Realizado": [f"R$ {r * 1.2:,.2f}" for r in range(n_linhas)],
+        "Observação": [None if r % 7 else "revisar" for r in range(n_linhas)],
+    })
+    formas = {
+        "bloco": lambda doc, p: _inserir_tabela_apos(doc, p, df),
+        # A forma anterior recebia a tabela já convertida em list[dict]
+        "api_python_docx": lambda doc, p: _inserir_tabela_api(doc, p, normalize_table(df)),
+    }
+    resultado = {}
+    for nome, inserir in formas.items():
+        tempos = []
+        for _ in range(repeticoes):
+            doc = Document()
+            p = doc.add_paragraph("{{tabela}}")._p
+            inicio = time.perf_counter()
+            inserir(doc, p)
+            tempos.append(time.perf_counter() - inicio)
+        resultado[f"{nome}_min_s"] = round(min(tempos), 4)
+    resultado["aceleracao"] = round(resultado["api_python_docx_min_s"] / resultado["bloco_min_s"], 1)
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--placeholders", type=int, default=500)
+    parser.add_argument("--tabelas", type=int, default=5)
+    parser.add_argument("--linhas", type=int, default=300)
+    parser.add_argument("--linhas-tabela", type=int, default=500)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    template = criar_template(args.placeholders, args.tabelas)
+    dados = criar_dados(args.placeholders, args.tabelas, args.linhas)
+
+    inicio = time.perf_counter()
+    compilado = TemplateCompilado.de_arquivo(template)
+    tempo_compilacao = time.perf_counter() - inicio
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        inicio = time.perf_counter()
+        compilado.renderizar(dados)
+        tempos.append(time.perf_counter() - inicio)
+
+    print(json.dumps({
+        "placeholders": args.placeholders,
+        "tabelas": args.tabelas,
+        "linhas_por_tabela": args.linhas,
+        "compilacao_s": round(tempo_compilacao, 4),
+        "preenchimento_s": [round(t, 4) for t in tempos],
+        "preenchimento_min_s": round(min(tempos), 4),
+        "tabela": dict(linhas=args.linhas_tabela, **medir_tabela(args.linhas_tabela, args.repeticoes)),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Mede cada etapa da geração do relatório em uma grade de projetos sintéticos.
+
+Etapas: leitura do snapshot (Firestore em memória, sem rede), cada tabela de
+`processamento`, cada gráfico de `data_gen.graphs`, o preenchimento do template, o
+PDF nativo (ReportLab) e a conversão para PDF pelo LibreOffice (ignorada com --sem-pdf
+ou se o LibreOffice não estiver instalado).
+
+O cache de gráficos fica desativado (CACHE_GRAFICOS_MB=0, herdado pelos processos
+de `geradores`): as etapas de montagem medem o desenho dos gráficos a cada
+repetição, e não leituras do cache.
+
+O resultado é gravado em JSON; com --comparar, cada etapa é comparada com uma
+execução anterior e as regressões acima da tolerância são listadas (código de saída 1).
+
+Uso:
+    python benchmarks/bench_relatorio.py --saida antes.json
+    python benchmarks/bench_relatorio.py --itens 10 100 --meses 6 24 --saida depois.json --comparar antes.json
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+if __name__ == "__main__":
+    # Antes de qualquer import que crie o cache ou o pool de processos de `geradores`
+    os.environ["CACHE_GRAFICOS_MB"] = "0"
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.firestore_memoria import FirestoreMemoria
+from projeto import carregar_projeto
+import processamento
+from data_gen.graphs import gerar_curva_s, gerar_grafico_aderencia
+from data_gen.table import ParametrosGeracao, gerar_projeto
+from geradores import Montagem
+from relatorio import CAMINHO_TEMPLATE, obter_layout_pdf, obter_template_compilado
+
+ITENS_PADRAO = [10, 100, 1000]
+MESES_PADRAO = [6, 24, 60, 120]
+
+TABELAS = {
+    "tabela_1": processamento.gerar_tabela_percentual,
+    "tabela_2": processamento.gerar_tabela_previsto_realizado,
+    "tabela_3": processamento.gerar_tabela_previsto_realizado_mes,
+    "tabela_4": processamento.gerar_tabela_contratual,
+    "tabela_5": processamento.gerar_tabela_previsto_realizado_acumulado,
+}
+
+
+def _medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes; retorna (tempos, último resultado)."""
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, resultado
+
+def _resumo(tempos):
+    return {"min_s": round(min(tempos), 6), "mediana_s": round(statistics.median(tempos), 6)}
+
+def _pdf_nativo(dados):
+    from pdf_nativo import renderizar_pdf
+    return renderizar_pdf(obter_layout_pdf(str(RAIZ / CAMINHO_TEMPLATE)), dados)
+
+def medir_projeto(n_itens, n_meses, repeticoes, com_pdf):
+    db = FirestoreMemoria()
+    # Projeto sintético reprodutível, medido até 2/3 do prazo
+    parametros = ParametrosGeracao(itens=n_itens, meses=n_meses, atraso=0, progresso=2 / 3)
+    db.collection("projetos").document("bench").set(gerar_projeto(0, parametros))
+    etapas, erros = {}, {}
+
+    def etapa(nome, funcao, repeticoes=repeticoes):
+        try:
+            tempos, resultado = _medir(funcao, repeticoes)
+            etapas[nome] = _resumo(tempos)
+            return resultado
+        except Exception as e:
+            erros[nome] = f"{type(e).__name__}: {e}"
+            return None
+
+    projeto = etapa("snapshot", lambda: carregar_projeto(db, "bench"))
+    tabelas = {nome: etapa(nome, lambda f=funcao: f(projeto)) for nome, funcao in TABELAS.items()}
+    etapa("tabelas_total", lambda: processamento.calcular_tabelas(projeto))
+    # Tabelas e gráficos pelo grafo de `geradores`: um nó por vez x nós independentes em paralelo
+    campos = obter_template_compilado(str(RAIZ / CAMINHO_TEMPLATE)).campos
+    etapa("montagem_sequencial", lambda: Montagem(projeto).preencher(campos, paralelo=False))
+    etapa("montagem_paralela", lambda: Montagem(projeto).preencher(campos))
+
+    png_aderencia = etapa("grafico_aderencia", lambda: gerar_grafico_aderencia(tabelas["tabela_5"]))
+    png_curva_s = etapa("grafico_curva_s", lambda: gerar_curva_s(tabelas["tabela_3"]))
+
+    template = obter_template_compilado(str(RAIZ / CAMINHO_TEMPLATE))
+    dados = dict(projeto.dados, table=tabelas["tabela_1"], table_2=tabelas["tabela_2"],
+                 table_3=tabelas["tabela_3"], table_4=tabelas["tabela_4"], table_5=tabelas["tabela_5"],
+                 grafico_1=png_aderencia, grafico_2=png_aderencia, grafico_3=png_curva_s,
+                 grafico_4=png_curva_s, grafico_5=png_curva_s, grafico_6=png_curva_s)
+    dados = {k: v for k, v in dados.items() if v is not None}
+    doc = etapa("preencher_campos", lambda: template.renderizar(dados))
+    etapa("pdf_nativo", lambda: _pdf_nativo(dados))
+
+    if com_pdf and doc is not None:
+        from conversao_pdf import converter_docx_bytes
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        docx_bytes = buffer.getvalue()
+        # A primeira conversão inclui a partida do LibreOffice; não entra na medida
+        if etapa("converter_para_pdf_partida", lambda: converter_docx_bytes(docx_bytes), 1):
+            etapa("converter_para_pdf", lambda: converter_docx_bytes(docx_bytes))
+
+    return {"itens": n_itens, "meses": n_meses, "etapas": etapas, "erros": erros}
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def comparar(atual, anterior, tolerancia, piso_s):
+    """Lista as etapas cujo tempo mínimo cresceu mais que `tolerancia` (e mais que `piso_s` em valor absoluto)."""
+    base = {(r["itens"], r["meses"]): r["etapas"] for r in anterior["resultados"]}
+    linhas, regressoes = [], []
+    for r in atual["resultados"]:
+        etapas_base = base.get((r["itens"], r["meses"]))
+        if not etapas_base:
+            continue
+        for nome, medida in r["etapas"].items():
+            if nome not in etapas_base:
+                continue
+            antes, depois = etapas_base[nome]["min_s"], medida["min_s"]
+            razao = depois / antes if antes else float("inf")
+            linha = (r["itens"], r["meses"], nome, antes, depois, razao)
+            linhas.append(linha)
+            if razao > 1 + tolerancia and depois - antes > piso_s:
+                regressoes.append(linha)
+    return linhas, regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itens", type=int, nargs="+", default=ITENS_PADRAO)
+    parser.add_argument("--meses", type=int, nargs="+", default=MESES_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-pdf", action="store_true", help="Não mede a conversão para PDF")
+    parser.add_argument("--saida", help="Grava o resultado neste arquivo JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Aumento relativo aceito (padrão: 0.2 = 20%%)")
+    parser.add_argument("--piso-ms", type=float, default=1.0, help="Diferenças abaixo deste valor são ignoradas")
+    args = parser.parse_args()
+
+    resultados = []
+    for n_itens in args.itens:
+        for n_meses in args.meses:
+            r = medir_projeto(n_itens, n_meses, args.repeticoes, not args.sem_pdf)
+            resultados.append(r)
+            resumo = ", ".join(f"{k}={v['min_s'] * 1000:.1f}ms" for k, v in r["etapas"].items())
+            print(f"[{n_itens} itens x {n_meses} meses] {resumo}", file=sys.stderr)
+            for nome, erro in r["erros"].items():
+                print(f"    {nome}: {erro}", file=sys.stderr)
+
+    saida = {
+        "meta": {
+            "data": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "plataforma": platform.platform(),
+            "repeticoes": args.repeticoes,
+        },
+        "resultados": resultados,
+    }
+    texto = json.dumps(saida, indent=2, ensure_ascii=False)
+    if args.saida:
+        Path(args.saida).write_text(texto, encoding="utf-8")
+    else:
+        print(texto)
+
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        linhas, regressoes = comparar(saida, anterior, args.tolerancia, args.piso_ms / 1000)
+        for itens, meses, nome, antes, depois, razao in linhas:
+            marca = "  REGRESSÃO" if (itens, meses, nome, antes, depois, razao) in regressoes else ""
+            print(f"{itens:>5} x {meses:>3}  {nome:<28} {antes * 1000:10.2f}ms -> {depois * 1000:10.2f}ms  ({razao:5.2f}x){marca}",
+                  file=sys.stderr)
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}.", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Substituto em memória do cliente do Firestore para benchmarks (sem rede).
+
+Implementa apenas o necessário para `projeto.carregar_projeto` e afins:
+`collection(...).document(...).get()/set()/update()`, `collection(...).stream()`
+e `collection(...).add()`. Os documentos são copiados em cada leitura e escrita,
+como acontece na desserialização de um documento real.
+"""
+import copy
+import uuid
+
+
+class DocumentoMemoria:
+    def __init__(self, doc_id, dados):
+        self.id = doc_id
+        self._dados = dados
+        self.exists = dados is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._dados)
+
+
+class ReferenciaMemoria:
+    def __init__(self, colecao, doc_id):
+        self._colecao = colecao
+        self.id = doc_id
+
+    def get(self, transaction=None):
+        return DocumentoMemoria(self.id, self._colecao._docs.get(self.id))
+
+    def set(self, dados):
+        self._colecao._docs[self.id] = copy.deepcopy(dados)
+
+    def update(self, dados):
+        self._colecao._docs.setdefault(self.id, {}).update(copy.deepcopy(dados))
+
+
+class ColecaoMemoria:
+    def __init__(self):
+        self._docs = {}
+
+    def document(self, doc_id):
+        return ReferenciaMemoria(self, doc_id)
+
+    def add(self, dados):
+        ref = self.document(uuid.uuid4().hex)
+        ref.set(dados)
+        return None, ref
+
+    def stream(self):
+        for doc_id, dados in list(self._docs.items()):
+            yield DocumentoMemoria(doc_id, copy.deepcopy(dados))
+
+
+class FirestoreMemoria:
+    """Cliente com a mesma interface básica de `firestore.client()`."""
+
+    def __init__(self):
+        self._colecoes = {}
+
+    def collection(self, nome):
+        return self._colecoes.setdefault(nome, ColecaoMemoria())
@@ -0,0 +1,183 @@
+"""
+Índice de busca de projetos mantido em memória.
+
+O índice é construído a partir de um listener `on_snapshot` da coleção "projetos":
+a primeira notificação traz todos os documentos e as seguintes apenas os que foram
+adicionados, alterados ou removidos, de modo que o índice é atualizado de forma
+incremental e os reruns do Streamlit não voltam a ler a coleção inteira.
+
+A busca ignora acentos e maiúsculas e usa um índice de n-gramas (1 a 3 caracteres)
+por campo de cabeçalho, o que mantém o custo praticamente constante à medida que a
+coleção cresce. Só os campos de cabeçalho de cada projeto são guardados (as tabelas
+são descartadas assim que chegam), de modo que a memória do índice não depende do
+tamanho do planejamento e da medição. Os resultados são ordenados priorizando correspondência exata,
+depois prefixo do campo, depois prefixo de palavra e, por fim, substring.
+"""
+import threading
+import unicodedata
+import streamlit as st
+from firebase_admin import firestore
+from projeto import CabecalhoProjeto
+
+CAMPOS_BUSCA = (
+    "n_contrato", "periodo_vigencia", "n_os", "objeto",
+    "valor_bens_receb", "contratante", "contratada"
+)
+TAMANHO_GRAMA = 3
+
+
+def normalizar(texto) -> str:
+    """Remove acentos, converte para minúsculas e colapsa espaços."""
+    if texto is None:
+        return ""
+    if isinstance(texto, (list, tuple)):
+        texto = " ".join(str(t) for t in texto)
+    sem_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", str(texto)) if not unicodedata.combining(c)
+    )
+    return " ".join(sem_acentos.casefold().split())
+
+def gramas(texto: str) -> set:
+    """Retorna todas as substrings de 1 a TAMANHO_GRAMA caracteres do texto."""
+    return {
+        texto[i:i + n]
+        for n in range(1, TAMANHO_GRAMA + 1)
+        for i in range(len(texto) - n + 1)
+    }
+
+
+class IndiceProjetos:
+    """Índice em memória dos campos de cabeçalho dos projetos, atualizado por listener."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pronto = threading.Event()
+        self._projetos = {}      # doc_id -> CabecalhoProjeto
+        self._valores = {}       # (doc_id, campo) -> valor normalizado
+        self._postings = {}      # (campo, grama) -> set(doc_id)
+        self._observadores = []  # funções chamadas a cada documento alterado
+        self._watch = None
+
+    # --- Manutenção incremental ---
+
+    def atualizar(self, doc_id: str, dados: dict):
+        """Indexa (ou reindexa) um documento."""
+        with self._lock:
+            self._remover_postings(doc_id)
+            self._projetos[doc_id] = CabecalhoProjeto.de_dict(doc_id, dados)
+            for campo in CAMPOS_BUSCA:
+                valor = normalizar(dados.get(campo))
+                self._valores[(doc_id, campo)] = valor
+                for g in gramas(valor):
+                    self._postings.setdefault((campo, g), set()).add(doc_id)
+
+    def remover(self, doc_id: str):
+        with self._lock:
+            self._remover_postings(doc_id)
+            self._projetos.pop(doc_id, None)
+
+    def _remover_postings(self, doc_id):
+        for campo in CAMPOS_BUSCA:
+            valor = self._valores.pop((doc_id, campo), None)
+            if valor is None:
+                continue
+            for g in gramas(valor):
+                ids = self._postings.get((campo, g))
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._postings[(campo, g)]
+
+    def observar(self, funcao):
+        """Registra `funcao(doc_id, dados)`, chamada a cada documento alterado (`dados` None se removido)."""
+        with self._lock:
+            if funcao not in self._observadores:
+                self._observadores.append(funcao)
+
+    def _ao_mudar(self, col_snapshot, changes, read_time):
+        """Callback do listener `on_snapshot` (executado em thread do Firestore)."""
+        for change in changes:
+            doc_id = change.document.id
+            if change.type.name == "REMOVED":
+                dados = None
+                self.remover(doc_id)
+            else:
+                dados = change.document.to_dict()
+                self.atualizar(doc_id, dados)
+            for funcao in list(self._observadores):
+                funcao(doc_id, dados)
+        self._pronto.set()
+
+    def iniciar(self, db: firestore.client, espera_max: float = 30.0):
+        """Registra o listener na coleção e aguarda a carga inicial."""
+        self._watch = db.collection("projetos").on_snapshot(self._ao_mudar)
+        self._pronto.wait(espera_max)
+
+    def encerrar(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    # --- Consulta ---
+
+    def obter(self, doc_id: str) -> CabecalhoProjeto:
+        with self._lock:
+            return self._projetos.get(doc_id)
+
+    def _candidatos(self, campo, termo):
+        """Documentos cujo campo contém todos os n-gramas do termo."""
+        if len(termo) <= TAMANHO_GRAMA:
+            return set(self._postings.get((campo, termo), ()))
+        conjuntos = []
+        for i in range(len(termo) - TAMANHO_GRAMA + 1):
+            ids = self._postings.get((campo, termo[i:i + TAMANHO_GRAMA]))
+            if not ids:
+                return set()
+            conjuntos.append(ids)
+        conjuntos.sort(key=len)
+        return set(conjuntos[0]).intersection(*conjuntos[1:])
+
+    def buscar(self, termo: str, campo: str = None) -> list:
+        """
+        Busca projetos cujo campo (ou qualquer campo de cabeçalho) contenha o termo.
+
+        Args:
+            termo (str): Texto buscado; acentos e maiúsculas são ignorados.
+            campo (str): Campo do Firestore a consultar; se None, busca em todos.
+
+        Returns:
+            list[CabecalhoProjeto]: Projetos encontrados, dos mais aos menos relevantes.
+        """
+        termo = normalizar(termo)
+        campos = (campo,) if campo else CAMPOS_BUSCA
+
+        with self._lock:
+            if not termo:
+                return sorted(self._projetos.values(), key=lambda p: normalizar(p.dados.get("n_contrato")))
+
+            ranking = {}
+            for c in campos:
+                for doc_id in self._candidatos(c, termo):
+                    valor = self._valores[(doc_id, c)]
+                    if termo not in valor:
+                        continue
+                    if valor == termo:
+                        nota = 0
+                    elif valor.startswith(termo):
+                        nota = 1
+                    elif f" {termo}" in valor:
+                        nota = 2
+                    else:
+                        nota = 3
+                    ranking[doc_id] = min(nota, ranking.get(doc_id, nota))
+
+            ordenados = sorted(ranking, key=lambda d: (ranking[d], self._valores[(d, campos[0])]))
+            return [self._projetos[d] for d in ordenados]
+
+
+@st.cache_resource
+def obter_indice_projetos(_db: firestore.client) -> IndiceProjetos:
+    """Retorna o índice do processo, compartilhado entre sessões e reruns."""
+    indice = IndiceProjetos()
+    indice.iniciar(_db)
+    return indice
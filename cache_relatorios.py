@@ -0,0 +1,211 @@
+"""
+Cache endereçado por conteúdo dos relatórios gerados (PDF e DOCX intermediário).
+
+A chave de cada relatório é o hash SHA-256 do documento do projeto, dos bytes do
+template, da versão do gerador e da configuração dos gráficos (limite de itens do
+gráfico de aderência, orçamento de pixels): se nada disso mudou, o PDF já gerado é devolvido
+em milissegundos, sem refazer tabelas, gráficos, preenchimento e LibreOffice.
+
+Os arquivos ficam em disco (compartilhados entre sessões e processos do lote) e o
+espaço total é limitado, com remoção dos itens menos usados recentemente (LRU). O
+limite vale para o diretório inteiro, não para cada processo: a limpeza relê o
+diretório sob uma trava de arquivo. Os contadores de acertos e falhas são de cada
+processo.
+
+Os gráficos têm um cache próprio (`obter_cache_graficos`), com a mesma estrutura,
+endereçado pelas séries plotadas (`data_gen.graphs.chave_grafico`): um relatório
+refeito sem mudança nas tabelas 3 e 5 (ex.: só o cabeçalho mudou, outro template ou
+outro backend de PDF) não redesenha nada no matplotlib.
+
+Configuração (variáveis de ambiente):
+    CACHE_RELATORIOS_DIR   Diretório do cache (padrão: .cache/relatorios)
+    CACHE_RELATORIOS_MB    Tamanho máximo do cache, em MB (padrão: 500)
+    CACHE_GRAFICOS_DIR     Diretório do cache de gráficos (padrão: .cache/graficos)
+    CACHE_GRAFICOS_MB      Tamanho máximo do cache de gráficos, em MB; 0 o desativa (padrão: 100)
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: a limpeza fica protegida só entre as threads do processo
+    fcntl = None
+
+# Incrementar sempre que a geração mudar de forma a alterar o PDF (tabelas, gráficos, layout)
+VERSAO_GERADOR = "4"
+
+# Temporários mais antigos que isto são sobras de gravações interrompidas
+IDADE_TEMPORARIOS_S = 3600
+
+
+def chave_relatorio(dados_projeto: dict, template_bytes: bytes, versao: str = VERSAO_GERADOR,
+                    parametros: dict = None) -> str:
+    """Hash do documento do projeto, do template, da versão do gerador e dos `parametros` de geração."""
+    h = hashlib.sha256()
+    h.update(versao.encode())
+    h.update(json.dumps(parametros or {}, sort_keys=True, default=str).encode())
+    h.update(hashlib.sha256(template_bytes).digest())
+    h.update(json.dumps(dados_projeto, sort_keys=True, default=str, ensure_ascii=False).encode())
+    return h.hexdigest()
+
+
+class CacheDisco:
+    """
+    Cache de arquivos em disco com limite de tamanho e remoção LRU.
+
+    O próprio diretório é o índice, compartilhado por todos os processos que usam o
+    cache (sessões do Streamlit, pool de gráficos, processos do lote): cada acerto
+    atualiza a data de modificação do arquivo e, a cada gravação, o diretório é relido
+    sob uma trava de arquivo (`.lock`) e os arquivos usados há mais tempo são removidos
+    até o total caber no limite, incluindo os gravados por outros processos.
+
+    Args:
+        diretorio (str): Onde os arquivos são guardados.
+        limite_bytes (int): Tamanho total máximo; ao ultrapassá-lo, os menos usados são removidos.
+    """
+
+    def __init__(self, diretorio, limite_bytes):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.limite_bytes = limite_bytes
+        # Contadores deste processo
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str, extensao: str, contabilizar: bool = True):
+        """
+        Retorna o caminho do arquivo em cache, ou None se não existir.
+        Com `contabilizar=False`, a consulta não entra nos contadores de acertos/falhas.
+        """
+        caminho = self.diretorio / f"{chave}{extensao}"
+        try:
+            # Marca o arquivo como usado agora (ordem LRU vista por todos os processos)
+            os.utime(caminho)
+        except FileNotFoundError:
+            caminho = None
+        if contabilizar:
+            with self._lock:
+                if caminho is None:
+                    self.falhas += 1
+                else:
+                    self.acertos += 1
+        return caminho
+
+    def ler(self, chave: str, extensao: str, contabilizar: bool = True) -> bytes:
+        """Conteúdo do arquivo em cache, ou None se não existir (ou tiver acabado de ser removido)."""
+        caminho = self.obter(chave, extensao, contabilizar)
+        if caminho is None:
+            return None
+        try:
+            return caminho.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, chave: str, extensao: str, conteudo: bytes) -> Path:
+        """Grava o conteúdo de forma atômica e aplica o limite de tamanho."""
+        nome = f"{chave}{extensao}"
+        caminho = self.diretorio / nome
+        fd, temp = tempfile.mkstemp(dir=self.diretorio, prefix=".tmp_")
+        with os.fdopen(fd, "wb") as f:
+            f.write(conteudo)
+        os.replace(temp, caminho)
+
+        with self._travar_diretorio():
+            arquivos = self._varrer()
+            total = sum(tamanho for _, _, tamanho in arquivos)
+            for _, antigo, tamanho in sorted(arquivos):
+                if total <= self.limite_bytes:
+                    break
+                if antigo == nome:
+                    continue
+                total -= tamanho
+                try:
+                    os.remove(self.diretorio / antigo)
+                    self.remocoes += 1
+                except FileNotFoundError:
+                    pass
+        return caminho
+
+    @contextmanager
+    def _travar_diretorio(self):
+        """Exclusão mútua da limpeza entre threads e, com fcntl, entre processos."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.diretorio / ".lock", "a") as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _varrer(self) -> list:
+        """Arquivos do cache em disco, de todos os processos: [(último uso, nome, tamanho)]."""
+        arquivos = []
+        agora = time.time()
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                try:
+                    estado = entrada.stat()
+                    if entrada.name.startswith(".tmp_") and agora - estado.st_mtime > IDADE_TEMPORARIOS_S:
+                        # Sobra de uma gravação interrompida
+                        os.remove(entrada.path)
+                    elif not entrada.name.startswith(".") and entrada.is_file():
+                        arquivos.append((estado.st_mtime, entrada.name, estado.st_size))
+                except FileNotFoundError:
+                    continue
+        return arquivos
+
+    def estatisticas(self) -> dict:
+        """Acertos, falhas e remoções deste processo; itens e bytes do diretório (todos os processos)."""
+        arquivos = self._varrer()
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "remocoes": self.remocoes,
+                "itens": len(arquivos),
+                "bytes": sum(tamanho for _, _, tamanho in arquivos),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def obter_cache_relatorios() -> CacheDisco:
+    """Retorna o cache de relatórios do processo, criando-o na primeira chamada."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheDisco(
+                os.getenv("CACHE_RELATORIOS_DIR", ".cache/relatorios"),
+                int(float(os.getenv("CACHE_RELATORIOS_MB", "500")) * 1024 * 1024),
+            )
+        return _cache
+
+_cache_graficos = None
+
+def obter_cache_graficos():
+    """
+    Retorna o cache de gráficos (PNG) do processo, criando-o na primeira chamada,
+    ou None se CACHE_GRAFICOS_MB for 0 (todo gráfico é desenhado).
+    """
+    global _cache_graficos
+    limite = int(float(os.getenv("CACHE_GRAFICOS_MB", "100")) * 1024 * 1024)
+    if limite <= 0:
+        return None
+    with _cache_lock:
+        if _cache_graficos is None:
+            _cache_graficos = CacheDisco(os.getenv("CACHE_GRAFICOS_DIR", ".cache/graficos"), limite)
+        return _cache_graficos
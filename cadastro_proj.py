@@ -1,10 +1,10 @@
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-import os
-from dotenv import load_dotenv
 import datetime
+import numpy as np
 import pandas as pd
+from projeto import TabelasProjeto
+from metricas import nova_requisicao
+from repositorio import obter_repositorio
 
 # Funções e constantes
 data_atual = datetime.datetime.now()
@@ -15,23 +15,9 @@ dez_31 = datetime.date(2100, 12, 31)
 def main():
     st.set_page_config(layout="wide")
     st.title("Cadastro de Projeto")
+    nova_requisicao(pagina="cadastro")
 
-    load_dotenv()
-
-    # --- Inicialização do Firebase ---
-    try:
-        if not firebase_admin._apps:
-            FIREBASE_KEY_PATH = os.getenv("FIREBASE_KEY_PATH", "app/firebase_key.json")
-            if not os.path.exists(FIREBASE_KEY_PATH):
-                st.error(f"Arquivo de chave do Firebase não encontrado em: {FIREBASE_KEY_PATH}")
-                st.stop()
-            cred = credentials.Certificate(FIREBASE_KEY_PATH)
-            firebase_admin.initialize_app(cred)
-    except Exception as e:
-        st.error(f"Erro ao inicializar o Firebase: {e}")
-        st.stop()
-
-    db = firestore.client()
+    repositorio = obter_repositorio()
 
     st.header("1. Defina o Prazo do Projeto")
     
@@ -87,9 +73,7 @@ def main():
             st.stop()
 
         try:
-            projetos_ref = db.collection("projetos")
-            query = projetos_ref.where("n_contrato", "==", n_contrato.strip()).limit(1).stream()
-            if any(query):
+            if repositorio.contrato_existe(n_contrato.strip()):
                 st.error(f"Erro: Já existe um projeto cadastrado com o Contrato n° '{n_contrato}'.")
                 st.stop()
         except Exception as e:
@@ -108,46 +92,18 @@ def main():
             
             df_calculado['Total por etapa'] = df_calculado[colunas_meses_existentes].sum(axis=1)
 
-            if not df_calculado.empty:
-                total_planejamento = pd.DataFrame(df_calculado[colunas_meses_existentes + ['Total por etapa']].sum()).T
-                total_planejamento['Item'] = 'TOTAL'
-                df_calculado = pd.concat([df_calculado, total_planejamento], ignore_index=True)
-            
-            tabela_planejamento_salvar = df_calculado.fillna("").to_dict(orient='records')
-
-            # 1. Copia a estrutura base da tabela de planejamento
-            df_medicao = edited_df[['Item']].copy() # Copia apenas os itens originais
-            df_medicao['Total por etapa'] = df_calculado['Total por etapa'].iloc[:len(edited_df)] # Pega os totais calculados, sem a linha de total
-
-            # 2. Adiciona as colunas de meses, mas vazias, pois serão preenchidas no futuro
-            for col in colunas_meses_existentes:
-                df_medicao[col] = 0
-
-            # 3. Adiciona a coluna 'Total' inicializada com 0
-            df_medicao['Total'] = 0.0
-
-            # 4. Adiciona a coluna 'Percentual do total da etapa' inicializada com '0.00%'
-            df_medicao['Percentual do total da etapa'] = '0.00%'
-
-            # 5. Garante a ordem correta das colunas
-            colunas_medicao_ordenadas = ['Item', 'Total por etapa'] + colunas_meses_existentes + ['Total', 'Percentual do total da etapa']
-            df_medicao = df_medicao[colunas_medicao_ordenadas]
-
-            if not df_medicao.empty:
-                total_medicao = pd.DataFrame(df_medicao[['Total por etapa', 'Total']].sum()).T
-                total_medicao['Item'] = 'TOTAL'
-                # Preenche as outras colunas da linha de total com valores padrão
-                for col in colunas_meses_existentes:
-                    total_medicao[col] = 0.0
-                total_medicao['Percentual do total da etapa'] = ''
-                # Garante a ordem das colunas e concatena
-                total_medicao = total_medicao[colunas_medicao_ordenadas]
-                df_medicao = pd.concat([df_medicao, total_medicao], ignore_index=True)
-            
-            # 6. Converte a tabela de medição para o formato de salvamento
-            tabela_medicao_salvar = df_medicao.fillna("").to_dict(orient='records')
-            
-            # --- FIM DA ALTERAÇÃO ---
+            # --- GRAVAÇÃO NO ESQUEMA COLUNAR (v2) ---
+            # Planejamento como colunas numéricas por mês; a medição começa sem nenhum mês
+            # gravado (os meses entram à medida que são medidos). Linhas de total e
+            # percentuais são calculados na leitura.
+            df_calculado = df_calculado[df_calculado['Item'].notna()]
+            tabelas = TabelasProjeto(
+                itens=tuple(str(item) for item in df_calculado['Item']),
+                total_etapa=df_calculado['Total por etapa'].to_numpy(dtype=float),
+                previsto=df_calculado[colunas_meses_existentes].to_numpy(dtype=float),
+                realizado=np.zeros((len(df_calculado), len(colunas_meses_existentes))),
+                tem_medicao=True,
+            )
 
             dados = {
                 "n_contrato": n_contrato.strip(),
@@ -158,18 +114,17 @@ def main():
                 "contratante": contratante,
                 "contratada": contratada,
                 "prazo_meses": prazo_meses,
-                "table": tabela_planejamento_salvar, # Tabela de Planejamento
-                "tabela_medicao": tabela_medicao_salvar, # Nova Tabela de Medição
+                **tabelas.para_documento(), # Tabelas de Planejamento e Medição
                 "medicao_atual": 1
             }
 
             try:
-                doc_ref = db.collection("projetos").add(dados)
-                st.success(f"Projeto e tabelas salvos com sucesso! ID do Projeto: `{doc_ref[1].id}`")
+                project_id = repositorio.criar(dados)
+                st.success(f"Projeto e tabelas salvos com sucesso! ID do Projeto: `{project_id}`")
                 st.write("Tabela de Planejamento salva:")
-                st.dataframe(df_calculado)
+                st.dataframe(pd.DataFrame(tabelas.linhas_planejamento()))
                 st.write("Tabela de Medição inicial criada:")
-                st.dataframe(df_medicao)
+                st.dataframe(pd.DataFrame(tabelas.linhas_medicao()))
             except Exception as e:
                 st.error(f"Erro ao salvar no Firebase: {e}")
 
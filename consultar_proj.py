@@ -3,35 +3,18 @@ import os
 import tempfile
 import shutil
 import re
-import subprocess
-from pathlib import Path
-import firebase_admin
-from firebase_admin import credentials, firestore
+from dataclasses import dataclass
 import pandas as pd
-from docx import Document
-from docx.shared import Inches, Pt
-
-# Funções de processamento de tabelas
-from processamento import (
-    gerar_tabela_percentual, 
-    gerar_tabela_previsto_realizado, 
-    gerar_tabela_previsto_realizado_mes, 
-    gerar_tabela_contratual, 
-    gerar_tabela_previsto_realizado_acumulado
-)
-
-# --- NOVO: Importar funções de gráfico ---
-from data_gen.graphs import (
-    gerar_curva_s,
-    gerar_grafico_aderencia
-)
-# ----------------------------------------
-
-
-def get_downloads_folder():
-    """Retorna o caminho para a pasta de Downloads do usuário."""
-    home = Path.home()
-    return home / "Downloads"
+
+from repositorio import obter_repositorio
+
+# Pipeline de geração do relatório (tabelas, gráficos, template e PDF), executado em segundo plano.
+# python-docx, matplotlib e o LibreOffice só são carregados na primeira geração.
+from fila_relatorios import obter_fila_relatorios, CONCLUIDO, PENDENTE
+from cache_relatorios import obter_cache_graficos, obter_cache_relatorios
+from conversao_pdf import BACKEND_PADRAO, libreoffice_disponivel
+from metricas import REGISTRO, medir, nova_requisicao
+
 
 def extrair_campos(doc):
     """Extrai todos os placeholders {{campo}} de um documento Word."""
@@ -49,153 +32,114 @@ def preencher_campos(doc, dados):
     """
     Substitui placeholders {{chave}} no documento por:
       - Texto (str/int/float)
-      - Imagem (caminho .png/.jpg/.jpeg)
+      - Imagem (bytes PNG/JPEG em memória ou caminho .png/.jpg/.jpeg)
       - Tabela (list[dict] ou pandas.DataFrame) com grid.
+
+    O documento é compilado (placeholders localizados, inclusive os quebrados em
+    vários runs) e preenchido em uma única passada. Para preencher o mesmo template
+    várias vezes, prefira o registro de `modelos` (`obter_registro_modelos().obter(nome).compilado.renderizar`).
     """
-    def is_image(v):
-        # --- MODIFICAÇÃO: Garantir que Path ou str funcionem ---
-        return isinstance(v, (str, Path)) and str(v).lower().endswith((".png", ".jpg", ".jpeg"))
-        # ------------------------------------------------------
-
-    def is_table(v):
-        if isinstance(v, pd.DataFrame):
-            return True
-        if isinstance(v, list) and v and all(isinstance(r, dict) for r in v):
-            return True
-        return False
-
-    def normalize_table(v):
-        if isinstance(v, pd.DataFrame):
-            return v.to_dict(orient="records")
-        return v
-
-    def replace_text_in_paragraph(p, mapping_text):
-        original_text = p.text
-        for k, v in mapping_text.items():
-            placeholder = f"{{{{{k}}}}}"
-            if placeholder in p.text:
-                # Substitui o placeholder pelo valor, mantendo o resto do texto
-                # --- MODIFICAÇÃO: Converte 'v' para str explicitamente ---
-                p.text = p.text.replace(placeholder, str(v) if v is not None else "")
-                # -----------------------------------------------------------
-
-    def paragraph_only_placeholder(p, placeholder):
-        return p.text.strip() == placeholder
-
-    def insert_image_at_paragraph(p, img_path):
-        for r in p.runs:
-            r.text = ""
-        # --- MODIFICAÇÃO: Garantir que img_path é string ---
-        p.add_run().add_picture(str(img_path), width=Inches(6.0)) # Aumentei a largura
-        # -----------------------------------------------------
-
-    def insert_table_after_paragraph(doc, p, records):
-        """Cria uma tabela com grid e cabeçalho em negrito."""
-        if not records:
-            p.text = "" # Limpa o placeholder se a tabela estiver vazia
-            return
-        
-        cols = list(records[0].keys())
-        
-        table = doc.add_table(rows=1 + len(records), cols=len(cols), style='Table Grid')
-        table.autofit = True # Ajusta colunas ao conteúdo
-
-        hdr_cells = table.rows[0].cells
-        for j, c in enumerate(cols):
-            run = hdr_cells[j].paragraphs[0].add_run(str(c))
-            run.bold = True
-            run.font.size = Pt(10)
-
-        for i, row_data in enumerate(records, start=1):
-            row_cells = table.rows[i].cells
-            for j, c in enumerate(cols):
-                cell_value = row_data.get(c)
-                run = row_cells[j].paragraphs[0].add_run("" if cell_value is None else str(cell_value))
-                run.font.size = Pt(10)
-                
-        p._element.addnext(table._element)
-        p.text = "" # Limpa o placeholder
-
-    dados_texto, dados_imagem, dados_tabela = {}, {}, {}
-    for k, v in dados.items():
-        if is_image(v):
-            dados_imagem[k] = v
-        elif is_table(v):
-            dados_tabela[k] = normalize_table(v)
-        else:
-            dados_texto[k] = v
-
-    all_paragraphs = list(doc.paragraphs)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                all_paragraphs.extend(cell.paragraphs)
-
-    for p in all_paragraphs:
-        # --- MODIFICAÇÃO: Inserir tabelas e imagens primeiro ---
-        
-        # Lógica de Tabela (substitui o placeholder)
-        for k, rows in dados_tabela.items():
-            ph = f"{{{{{k}}}}}"
-            if ph in p.text:
-                if paragraph_only_placeholder(p, ph):
-                    insert_table_after_paragraph(doc, p, rows)
-                else:
-                    # Se houver texto junto, apenas limpa (a tabela será inserida depois)
-                    p.text = p.text.replace(ph, "")
-                    insert_table_after_paragraph(doc, p, rows)
-
-        # Lógica de Imagem (substitui o placeholder)
-        for k, img in dados_imagem.items():
-            ph = f"{{{{{k}}}}}"
-            if ph in p.text:
-                if paragraph_only_placeholder(p, ph):
-                    insert_image_at_paragraph(p, img)
-                else:
-                    # Se houver mais texto, a imagem é inserida inline
-                    p.text = p.text.replace(ph, "")
-                    p.add_run().add_picture(str(img), width=Inches(6.0))
-
-        # Lógica de Texto (substitui o que sobrou)
-        replace_text_in_paragraph(p, dados_texto)
-        # ----------------------------------------------------
-
-def converter_para_pdf(caminho_docx):
-    """Converte um arquivo .docx para .pdf usando LibreOffice."""
-    downloads_dir = get_downloads_folder()
-    os.makedirs(downloads_dir, exist_ok=True)
-    comando = [
-        "soffice", "--headless", "--convert-to", "pdf",
-        "--outdir", str(downloads_dir), caminho_docx
-    ]
-    result = subprocess.run(comando, capture_output=True, text=True, check=False)
-    if result.returncode != 0:
-        raise RuntimeError(f"Erro na conversão para PDF:\n{result.stderr}")
-
-    base_name = Path(caminho_docx).stem
-    pdf_path = downloads_dir / f"{base_name}.pdf"
-    
-    if not pdf_path.exists():
-         raise FileNotFoundError(f"Arquivo PDF esperado não foi encontrado em: {pdf_path}")
-    
-    return str(pdf_path)
+    from template_docx import TemplateCompilado
+    TemplateCompilado(doc).aplicar(doc, dados)
+
+def converter_para_pdf(docx_bytes):
+    """Converte um .docx (bytes) para PDF (bytes) usando o serviço persistente do LibreOffice."""
+    from conversao_pdf import converter_docx_bytes
+    return converter_docx_bytes(docx_bytes)
+
+# Intervalo (s) de consulta do estado de um PDF em geração
+INTERVALO_CONSULTA = 2
+
+@st.fragment(run_every=INTERVALO_CONSULTA)
+def acompanhar_trabalho(trabalho_id):
+    """Consulta periodicamente um trabalho da fila; ao terminar, recarrega a página para exibir o resultado."""
+    trabalho = obter_fila_relatorios().obter(trabalho_id)
+    if trabalho is None or trabalho.finalizado:
+        st.rerun()
+    if trabalho.estado == PENDENTE:
+        st.info(f"PDF na fila de geração há {trabalho.espera:.0f}s...")
+    else:
+        st.info(f"Gerando tabelas, gráficos e PDF... ({trabalho.execucao:.0f}s)")
+
+def mostrar_trabalho(doc_id):
+    """Mostra o estado do PDF do projeto pedido nesta sessão (em andamento, pronto ou com erro)."""
+    trabalho_id = st.session_state.trabalhos_pdf.get(doc_id)
+    if trabalho_id is None:
+        return
+    trabalho = obter_fila_relatorios().obter(trabalho_id)
+    if trabalho is None:
+        # Descartado da fila (ex.: muito antigo)
+        del st.session_state.trabalhos_pdf[doc_id]
+    elif not trabalho.finalizado:
+        acompanhar_trabalho(trabalho_id)
+    elif trabalho.estado == CONCLUIDO:
+        with medir("download", projeto=doc_id, bytes=len(trabalho.pdf)):
+            st.download_button(
+                label="✔️ Baixar PDF Pronto",
+                data=trabalho.pdf,
+                file_name=f"projeto_{doc_id}.pdf",
+                mime="application/pdf",
+                key=f"download_{doc_id}"
+            )
+        st.success(f"PDF gerado com sucesso em {trabalho.execucao:.1f}s!")
+    else:
+        st.error(f"Erro ao gerar PDF: {trabalho.erro}")
+
+TAMANHOS_PAGINA = [10, 20, 50, 100]
+
+# Rótulo -> backend de PDF (ver `relatorio.gerar_pdf`)
+BACKENDS_PDF = {"Rápido (PDF direto)": "nativo", "Fiel ao Word (LibreOffice)": "libreoffice"}
+
+
+@dataclass
+class PaginaConsulta:
+    """Uma página de resultados da consulta (só cabeçalhos dos projetos)."""
+    itens: list
+    numero: int
+    tem_proxima: bool
+    total: int = None        # conhecido só na busca por termo
+    ids_busca: list = None   # todos os IDs encontrados na busca por termo
+
+def paginar(repositorio, termo, campo, tamanho) -> PaginaConsulta:
+    """
+    Resultados da página atual da sessão. Sem termo, lista os projetos direto do
+    Firestore, só com os campos de cabeçalho e paginando por cursor; com termo, pagina
+    os resultados do índice de busca (que também guarda só os cabeçalhos). A posição
+    volta à primeira página quando o termo, o campo ou o tamanho da página mudam.
+    """
+    chave = (termo, campo, tamanho)
+    estado = st.session_state.get("consulta")
+    if estado is None or estado["chave"] != chave:
+        # cursores[n] = cursor para a página n (None na primeira)
+        estado = st.session_state.consulta = {"chave": chave, "pagina": 0, "cursores": [None]}
+    numero = estado["pagina"]
+
+    if termo.strip():
+        encontrados = repositorio.buscar(termo, campo)
+        return PaginaConsulta(
+            itens=encontrados[numero * tamanho:(numero + 1) * tamanho],
+            numero=numero,
+            tem_proxima=(numero + 1) * tamanho < len(encontrados),
+            total=len(encontrados),
+            ids_busca=[p.id for p in encontrados],
+        )
+
+    itens, proximo = repositorio.listar(tamanho, apos=estado["cursores"][numero])
+    if proximo is not None and len(estado["cursores"]) == numero + 1:
+        estado["cursores"].append(proximo)
+    return PaginaConsulta(itens=itens, numero=numero, tem_proxima=proximo is not None)
 
 # ==== App principal ====
 def main():
     st.set_page_config(layout="wide")
     st.title("Consulta de Projetos e Geração de PDF")
+    nova_requisicao(pagina="consultar")
 
-    # Inicialização do Firebase (evita reinicializar)
-    if not firebase_admin._apps:
-        try:
-            FIREBASE_KEY_PATH = os.getenv("FIREBASE_KEY_PATH", "app/firebase_key.json")
-            cred = credentials.Certificate(FIREBASE_KEY_PATH)
-            firebase_admin.initialize_app(cred)
-        except Exception as e:
-            st.error(f"Erro ao inicializar Firebase: {e}")
-            st.stop()
+    repositorio = obter_repositorio()
 
-    db = firestore.client()
+    # Trabalhos de PDF pedidos nesta sessão (project_id -> ID na fila); sobrevivem a reruns e à troca de página
+    if "trabalhos_pdf" not in st.session_state:
+        st.session_state.trabalhos_pdf = {}
 
     campos = {
         "N° do Contrato": "n_contrato", "Período de Vigência": "periodo_vigencia",
@@ -206,21 +150,24 @@ def main():
 
     campo_escolhido = st.selectbox("Selecione o campo para buscar:", list(campos.keys()))
     termo_busca = st.text_input("Digite o termo para busca:")
+    tamanho_pagina = st.selectbox("Projetos por página:", TAMANHOS_PAGINA, index=1)
+    if libreoffice_disponivel():
+        rotulos = list(BACKENDS_PDF)
+        padrao = list(BACKENDS_PDF.values()).index(BACKEND_PADRAO) if BACKEND_PADRAO in BACKENDS_PDF.values() else 0
+        backend = BACKENDS_PDF[st.radio("Geração do PDF:", rotulos, index=padrao, horizontal=True)]
+    else:
+        # Imagem sem LibreOffice: só o PDF direto
+        backend = "nativo"
 
-    projetos_ref = db.collection("projetos")
-    
     st.subheader("Projetos encontrados:")
     campo_firebase = campos[campo_escolhido]
-    
-    query = projetos_ref.stream()
-    resultados = []
-    for doc in query:
-        data = doc.to_dict()
-        if termo_busca.lower() in str(data.get(campo_firebase, "")).lower():
-            resultados.append((doc.id, data))
-
-    if resultados:
-        for doc_id, data in resultados:
+
+    with medir("busca_projetos", campo=campo_firebase, termo=bool(termo_busca.strip())):
+        pagina = paginar(repositorio, termo_busca, campo_firebase, tamanho_pagina)
+
+    if pagina.itens:
+        for projeto in pagina.itens:
+            doc_id, data = projeto.id, projeto.dados
             st.markdown(f"---")
             df_info = pd.DataFrame({
                 "Item": list(campos.keys()),
@@ -229,112 +176,98 @@ def main():
             st.table(df_info)
 
             if st.button(f"Gerar PDF para o Projeto", key=f"gerar_pdf_{doc_id}"):
-                
-                # --- NOVO: Lista para guardar caminhos de imagens temporárias ---
-                temp_image_paths = []
-                # --------------------------------------------------------------
-                
-                with st.spinner("Gerando tabelas e gráficos..."):
-                    try:
-                        # --- GERAÇÃO DE TABELAS ---
-                        tabela_1_df = gerar_tabela_percentual(db, doc_id)
-                        if tabela_1_df is None:
-                            st.error("Falha ao gerar a tabela 1 (Percentual).")
-                            continue
-
-                        tabela_2_df = gerar_tabela_previsto_realizado(db, doc_id)
-                        if tabela_2_df is None:
-                            st.error("Falha ao gerar a tabela 2 (Previsto x Realizado).")
-                            continue
-
-                        tabela_3_df = gerar_tabela_previsto_realizado_mes(db, doc_id)
-                        if tabela_3_df is None:
-                            st.error("Falha ao gerar a tabela 3 (Mês a Mês).")
-                            continue
-
-                        tabela_4_df = gerar_tabela_contratual(db, doc_id)
-                        if tabela_4_df is None:
-                            st.error("Falha ao gerar a tabela 4 (Contratual).")
-                            continue
-
-                        tabela_5_df = gerar_tabela_previsto_realizado_acumulado(db, doc_id)
-                        if tabela_5_df is None:
-                            st.error("Falha ao gerar a tabela 5 (Acumulado).")
-                            continue
-                        
-                        # --- NOVO: GERAÇÃO DE GRÁFICOS ---
-                        # Gráfico para {{grafico_1}} e {{grafico_2}} (Aderência)
-                        path_grafico_aderencia = gerar_grafico_aderencia(tabela_5_df)
-                        if path_grafico_aderencia:
-                            temp_image_paths.append(path_grafico_aderencia)
-                        
-                        # Gráfico para {{grafico_3}} e {{grafico_4}} (Curva S)
-                        path_curva_s = gerar_curva_s(tabela_3_df)
-                        if path_curva_s:
-                            temp_image_paths.append(path_curva_s)
-                        
-                        # (Você pode adicionar aqui a geração do grafico_7 se criar a função)
-                        # -----------------------------------
-
-                        # 2. Adiciona tabelas e gráficos ao dicionário
-                        dados_para_template = data.copy()
-                        dados_para_template['table'] = tabela_1_df
-                        dados_para_template['table_2'] = tabela_2_df
-                        dados_para_template['table_3'] = tabela_3_df
-                        dados_para_template['table_4'] = tabela_4_df
-                        dados_para_template['table_5'] = tabela_5_df
-                        # (Adicione table_6, table_7... se existirem)
-
-                        # --- NOVO: Adiciona gráficos ---
-                        # Usando os mesmos gráficos para os placeholders, conforme template
-                        dados_para_template['grafico_1'] = path_grafico_aderencia
-                        dados_para_template['grafico_2'] = path_grafico_aderencia
-                        dados_para_template['grafico_3'] = path_curva_s
-                        dados_para_template['grafico_4'] = path_curva_s
-                        dados_para_template['grafico_5'] = path_curva_s # Placeholder existe, vamos preencher
-                        dados_para_template['grafico_6'] = path_curva_s # Placeholder existe, vamos preencher
-                        # dados_para_template['grafico_7'] = path_grafico_idp 
-                        # ---------------------------------
-                        
-                        # Copia o template para um local temporário
-                        caminho_template = "template/Template_ata_ebserh.docx"
-                        if not os.path.exists(caminho_template):
-                            st.error(f"Template não encontrado: {caminho_template}")
-                            continue
-                        
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx:
-                            shutil.copyfile(caminho_template, temp_docx.name)
-                            
-                            doc_obj = Document(temp_docx.name)
-                            preencher_campos(doc_obj, dados_para_template)
-                            doc_obj.save(temp_docx.name)
-                            
-                            pdf_path = converter_para_pdf(temp_docx.name)
-
-                        with open(pdf_path, "rb") as pdf_file:
-                            st.download_button(
-                                label="✔️ Baixar PDF Pronto",
-                                data=pdf_file,
-                                file_name=f"projeto_{doc_id}.pdf",
-                                mime="application/pdf",
-                                key=f"download_{doc_id}"
-                            )
-                        st.success(f"PDF gerado com sucesso! Salvo em sua pasta de Downloads.")
-                    
-                    except Exception as e:
-                        st.error(f"Erro ao gerar PDF: {e}")
-                    
-                    # --- NOVO: Bloco Finally para limpar imagens ---
-                    finally:
-                        for img_path in temp_image_paths:
-                            try:
-                                if img_path and os.path.exists(img_path):
-                                    os.remove(img_path)
-                            except Exception as e:
-                                st.warning(f"Não foi possível remover o arquivo temporário {img_path}: {e}")
-                    # ----------------------------------------------
+                # As tabelas só são lidas agora, para o projeto escolhido (cache compartilhado do repositório).
+                # A fila apenas enfileira: a geração roda em segundo plano, sem travar a sessão.
+                with medir("fila_envio", projeto=doc_id):
+                    projeto_completo = repositorio.obter(doc_id)
+                    if projeto_completo is None:
+                        st.error("O projeto selecionado não existe mais.")
+                    else:
+                        st.session_state.trabalhos_pdf[doc_id] = obter_fila_relatorios().enviar(projeto_completo, backend)
+
+            mostrar_trabalho(doc_id)
+
+        # --- Navegação entre páginas ---
+        st.markdown("---")
+        col_anterior, col_posicao, col_proxima = st.columns([1, 3, 1])
+        with col_anterior:
+            if st.button("◀ Anterior", disabled=pagina.numero == 0, key="pagina_anterior"):
+                st.session_state.consulta["pagina"] -= 1
+                st.rerun()
+        with col_posicao:
+            total = f" de {pagina.total} encontrado(s)" if pagina.total is not None else ""
+            st.caption(f"Página {pagina.numero + 1}: {len(pagina.itens)} projeto(s){total}")
+        with col_proxima:
+            if st.button("Próxima ▶", disabled=not pagina.tem_proxima, key="pagina_proxima"):
+                st.session_state.consulta["pagina"] += 1
+                st.rerun()
+
+        # --- Geração em lote dos projetos encontrados ---
+        rotulo_lote = f"{pagina.total} projeto(s) encontrados" if pagina.total is not None else "todos os projetos"
+        with st.expander(f"Gerar PDFs em lote ({rotulo_lote})"):
+            workers = st.number_input("Processos em paralelo:", min_value=1, value=os.cpu_count() or 1, step=1)
+            if st.button("Gerar PDFs de todos os projetos encontrados", key="gerar_lote"):
+                from lote import gerar_lote, selecionar_projetos
+                # Sem termo, os IDs vêm de uma consulta com projeção (nenhuma tabela é lida aqui)
+                ids_lote = pagina.ids_busca if pagina.ids_busca is not None else selecionar_projetos(repositorio.db)
+                barra = st.progress(0.0, text="Iniciando geração em lote...")
+
+                def progresso(concluidos, total, pid, erro):
+                    barra.progress(concluidos / total, text=f"{concluidos}/{total} concluído(s)")
+                    if erro:
+                        st.warning(f"Falha no projeto {pid}: {erro}")
+
+                dir_lote = tempfile.mkdtemp(prefix="lote_")
+                zip_path = os.path.join(dir_lote, "atas.zip")
+                with medir("lote", projetos=len(ids_lote), workers=int(workers)):
+                    resultado = gerar_lote(ids_lote, dir_lote, workers=int(workers),
+                                           zip_path=zip_path, ao_progredir=progresso, backend=backend)
+
+                st.success(f"{len(resultado.pdfs)} PDF(s) gerado(s), {len(resultado.falhas)} falha(s).")
+                if resultado.pdfs:
+                    with open(zip_path, "rb") as zip_file:
+                        zip_bytes = zip_file.read()
+                    with medir("download", lote=True, bytes=len(zip_bytes)):
+                        st.download_button(
+                            label="✔️ Baixar ZIP com os PDFs",
+                            data=zip_bytes,
+                            file_name="atas_medicao.zip",
+                            mime="application/zip",
+                            key="download_lote"
+                        )
+                shutil.rmtree(dir_lote, ignore_errors=True)
     else:
         st.info("Nenhum projeto encontrado com os critérios de busca.")
 
+    # Arquivos e MB: o diretório inteiro; acertos e falhas: só os deste processo do servidor
+    # (os do lote e do pool de gráficos são contados nos respectivos processos)
+    stats_cache = obter_cache_relatorios().estatisticas()
+    st.caption(
+        f"Cache de relatórios: {stats_cache['itens']} arquivo(s), {stats_cache['bytes'] / 1024 / 1024:.1f} MB; "
+        f"neste processo: {stats_cache['acertos']} acerto(s), {stats_cache['falhas']} falha(s)"
+    )
+    cache_graficos = obter_cache_graficos()
+    if cache_graficos is not None:
+        stats_graficos = cache_graficos.estatisticas()
+        st.caption(
+            f"Cache de gráficos: {stats_graficos['itens']} imagem(ns), {stats_graficos['bytes'] / 1024 / 1024:.1f} MB; "
+            f"neste processo: {stats_graficos['acertos']} acerto(s), {stats_graficos['falhas']} falha(s)"
+        )
+    stats_fila = obter_fila_relatorios().metricas()
+    st.caption(
+        f"Fila de PDFs: {stats_fila['na_fila']} na fila, {stats_fila['executando']}/{stats_fila['workers']} em execução, "
+        f"espera média {stats_fila['espera_media']:.1f}s, execução média {stats_fila['execucao_media']:.1f}s, "
+        f"{stats_fila['concluidos']} concluído(s), {stats_fila['falhas']} falha(s)"
+    )
+
+    resumo_etapas = REGISTRO.resumo()
+    if resumo_etapas:
+        with st.expander("Tempos por etapa (desde o início do processo)"):
+            st.dataframe(pd.DataFrame([
+                {"Etapa": etapa, "Execuções": r["total"], "Erros": r["erros"], "Média (ms)": r["media_s"] * 1000,
+                 "p95 (ms) ≤": r["p95_s"] * 1000, "p99 (ms) ≤": r["p99_s"] * 1000}
+                for etapa, r in resumo_etapas.items()
+            ]), hide_index=True)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
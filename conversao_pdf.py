@@ -0,0 +1,338 @@
+"""
+Serviço persistente de conversão DOCX -> PDF com LibreOffice.
+
+Em vez de iniciar um `soffice --convert-to pdf` a frio para cada relatório, o serviço
+mantém um pool de trabalhadores "quentes". Cada trabalhador é uma instância `soffice`
+ouvindo em um pipe UNO, com perfil de usuário próprio (o que permite conversões em
+paralelo), e uma ponte (`ponte_uno.py`) executada pelo Python do LibreOffice.
+
+Os trabalhadores são reciclados após um número máximo de conversões ou quando a
+memória da instância ultrapassa o limite, e são reiniciados quando uma conversão
+excede o tempo máximo. Um trabalhador que não consegue reiniciar volta ao pool marcado
+para nova tentativa, com espera crescente entre elas (REINICIO_ESPERA_S, dobrando até
+REINICIO_ESPERA_MAX_S); enquanto nenhum estiver ativo, as conversões usam o soffice
+avulso. Se a ponte UNO não estiver disponível, o serviço recorre à conversão a frio
+com `soffice --convert-to`.
+
+A aplicação converte documentos em memória (`converter_bytes`): os bytes do DOCX
+entram, os do PDF saem, e os arquivos que o LibreOffice precisa ficam em um
+diretório temporário exclusivo da conversão, removido ao final. Não há diretório
+compartilhado entre conversões, o que mantém corretas as conversões simultâneas.
+
+Configuração (variáveis de ambiente):
+    CONVERSAO_WORKERS      Número de trabalhadores (padrão: 2)
+    CONVERSAO_MAX_JOBS     Conversões antes de reciclar um trabalhador (padrão: 50)
+    CONVERSAO_MEMORIA_MB   Memória máxima de uma instância, em MB (padrão: 800)
+    CONVERSAO_TIMEOUT      Tempo máximo de uma conversão, em segundos (padrão: 60)
+    LIBREOFFICE_PYTHON     Python com o módulo `uno` (padrão: /usr/bin/python3)
+    PDF_BACKEND            Backend padrão dos relatórios: nativo ou libreoffice (padrão: nativo)
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from metricas import contar
+
+SOFFICE = os.getenv("SOFFICE_PATH", "soffice")
+LIBREOFFICE_PYTHON = os.getenv("LIBREOFFICE_PYTHON", "/usr/bin/python3")
+PONTE_UNO = str(Path(__file__).with_name("ponte_uno.py"))
+
+# Backends de geração do PDF (ver `relatorio.gerar_pdf`): "nativo" desenha o PDF direto
+# com o ReportLab (`pdf_nativo.py`), sem LibreOffice; "libreoffice" preenche o DOCX e o
+# converte com este serviço, e também é o caminho de reserva se o nativo falhar.
+BACKENDS = ("nativo", "libreoffice")
+BACKEND_PADRAO = os.getenv("PDF_BACKEND", "nativo")
+
+# Espera antes de tentar de novo iniciar um trabalhador que falhou (dobra a cada falha seguida)
+REINICIO_ESPERA_S = 5
+REINICIO_ESPERA_MAX_S = 300
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_mb(pid):
+    """Soma a memória residente (MB) de um processo e de todos os seus descendentes."""
+    total_kb = 0
+    pendentes = [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            with open(f"/proc/{atual}/status") as f:
+                for linha in f:
+                    if linha.startswith("VmRSS:"):
+                        total_kb += int(linha.split()[1])
+                        break
+            with open(f"/proc/{atual}/task/{atual}/children") as f:
+                pendentes.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+def _encerrar_processo(proc):
+    """Encerra o processo e seu grupo (soffice cria processos filhos)."""
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=5)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+
+def converter_a_frio(caminho_docx, dir_saida, timeout=None):
+    """Converte iniciando um `soffice` novo, com perfil isolado (caminho lento)."""
+    perfil = tempfile.mkdtemp(prefix="lo_perfil_frio_")
+    try:
+        comando = [
+            SOFFICE, f"-env:UserInstallation={Path(perfil).as_uri()}",
+            "--headless", "--convert-to", "pdf",
+            "--outdir", str(dir_saida), str(caminho_docx)
+        ]
+        result = subprocess.run(comando, capture_output=True, text=True, check=False, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"Erro na conversão para PDF:\n{result.stderr}")
+    finally:
+        shutil.rmtree(perfil, ignore_errors=True)
+
+    pdf_path = Path(dir_saida) / f"{Path(caminho_docx).stem}.pdf"
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"Arquivo PDF esperado não foi encontrado em: {pdf_path}")
+    return str(pdf_path)
+
+
+class TrabalhadorLibreOffice:
+    """Uma instância `soffice` ouvindo em pipe UNO, com perfil próprio, e sua ponte."""
+
+    def __init__(self, indice, timeout_inicio=30):
+        self.indice = indice
+        self.timeout_inicio = timeout_inicio
+        self.perfil = tempfile.mkdtemp(prefix=f"lo_perfil_{indice}_")
+        self.geracao = 0
+        self.conversoes = 0
+        self.soffice = None
+        self.ponte = None
+        self.falhas_seguidas = 0       # tentativas de início que falharam em sequência
+        self.reiniciar_apos = 0.0      # time.monotonic() a partir do qual pode tentar de novo
+
+    def iniciar(self):
+        self.geracao += 1
+        self.conversoes = 0
+        nome_pipe = f"conversor_{os.getpid()}_{self.indice}_{self.geracao}"
+
+        self.soffice = subprocess.Popen(
+            [
+                SOFFICE, f"-env:UserInstallation={Path(self.perfil).as_uri()}",
+                "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+                f"--accept=pipe,name={nome_pipe};urp;StarOffice.ComponentContext",
+            ],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        try:
+            self.ponte = subprocess.Popen(
+                [LIBREOFFICE_PYTHON, PONTE_UNO, nome_pipe, str(self.timeout_inicio)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, bufsize=1, start_new_session=True,
+            )
+            resposta = self._ler_resposta(self.timeout_inicio + 5)
+        except Exception:
+            self.encerrar()
+            raise
+        if not resposta.get("pronto"):
+            self.encerrar()
+            raise RuntimeError(f"Trabalhador de conversão não iniciou: {resposta.get('erro')}")
+
+    def _ler_resposta(self, timeout):
+        prontos, _, _ = select.select([self.ponte.stdout], [], [], timeout)
+        if not prontos:
+            raise TimeoutError(f"Trabalhador de conversão {self.indice} não respondeu em {timeout}s")
+        linha = self.ponte.stdout.readline()
+        if not linha:
+            raise RuntimeError(f"Trabalhador de conversão {self.indice} encerrou inesperadamente")
+        return json.loads(linha)
+
+    def converter(self, caminho_docx, caminho_pdf, timeout):
+        pedido = {"entrada": str(Path(caminho_docx).resolve()), "saida": str(Path(caminho_pdf).resolve())}
+        self.ponte.stdin.write(json.dumps(pedido) + "\n")
+        self.ponte.stdin.flush()
+        resposta = self._ler_resposta(timeout)
+        self.conversoes += 1
+        if not resposta.get("ok"):
+            raise RuntimeError(f"Erro na conversão para PDF:\n{resposta.get('erro')}")
+        return resposta["saida"]
+
+    def ativo(self):
+        return (self.soffice is not None and self.soffice.poll() is None
+                and self.ponte is not None and self.ponte.poll() is None)
+
+    def memoria_mb(self):
+        return _rss_mb(self.soffice.pid) if self.ativo() else 0
+
+    def encerrar(self):
+        _encerrar_processo(self.ponte)
+        _encerrar_processo(self.soffice)
+        self.ponte = self.soffice = None
+
+    def descartar(self):
+        self.encerrar()
+        shutil.rmtree(self.perfil, ignore_errors=True)
+
+
+class ServicoConversao:
+    """
+    Pool de trabalhadores LibreOffice mantidos aquecidos entre conversões.
+
+    Args:
+        n_workers (int): Número de instâncias `soffice` simultâneas.
+        max_conversoes (int): Conversões antes de reciclar uma instância.
+        memoria_max_mb (float): Memória (RSS) acima da qual a instância é reciclada.
+        timeout (float): Tempo máximo de uma conversão; a instância é reiniciada ao excedê-lo.
+    """
+
+    def __init__(self, n_workers=2, max_conversoes=50, memoria_max_mb=800, timeout=60):
+        self.max_conversoes = max_conversoes
+        self.memoria_max_mb = memoria_max_mb
+        self.timeout = timeout
+        self.trabalhadores = [TrabalhadorLibreOffice(i) for i in range(n_workers)]
+        self._livres = queue.Queue()
+        self.uno_disponivel = True
+
+        # Inicia as instâncias em paralelo
+        threads = [threading.Thread(target=self._iniciar_trabalhador, args=(t,)) for t in self.trabalhadores]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+        if not any(t.ativo() for t in self.trabalhadores):
+            self.uno_disponivel = False
+            logger.warning("Nenhum trabalhador UNO iniciou; as conversões usam o soffice avulso")
+
+    def _tentar_iniciar(self, trabalhador, etapa):
+        """
+        Inicia o trabalhador; se falhar, registra e agenda a próxima tentativa (espera
+        exponencial). Retorna se ele está ativo.
+        """
+        try:
+            trabalhador.iniciar()
+        except Exception:
+            trabalhador.falhas_seguidas += 1
+            espera = min(REINICIO_ESPERA_S * 2 ** (trabalhador.falhas_seguidas - 1), REINICIO_ESPERA_MAX_S)
+            trabalhador.reiniciar_apos = time.monotonic() + espera
+            logger.exception(f"Falha ao iniciar o trabalhador de conversão {trabalhador.indice} ({etapa}); "
+                             f"nova tentativa em {espera}s")
+            contar("conversao_trabalhador_falhas", etapa=etapa)
+            return False
+        trabalhador.falhas_seguidas = 0
+        return True
+
+    def _iniciar_trabalhador(self, trabalhador):
+        # Mesmo se falhar, o trabalhador fica no pool e é reiniciado mais tarde (`converter`)
+        self._tentar_iniciar(trabalhador, "inicio")
+        self._livres.put(trabalhador)
+
+    def _devolver(self, trabalhador):
+        """Recicla o trabalhador se necessário e o devolve ao pool (mesmo se não reiniciar)."""
+        precisa_reciclar = (
+            not trabalhador.ativo()
+            or trabalhador.conversoes >= self.max_conversoes
+            or trabalhador.memoria_mb() > self.memoria_max_mb
+        )
+        if precisa_reciclar:
+            trabalhador.encerrar()
+            self._tentar_iniciar(trabalhador, "reciclagem")
+        self._livres.put(trabalhador)
+
+    def _obter_trabalhador(self):
+        """
+        Retira um trabalhador ativo do pool, reiniciando os parados cuja espera acabou.
+        Retorna None se nenhum trabalhador estiver ativo (a conversão deve ser feita a frio).
+        """
+        while True:
+            try:
+                trabalhador = self._livres.get(timeout=1)
+            except queue.Empty:
+                continue
+            if trabalhador.ativo():
+                return trabalhador
+            if time.monotonic() >= trabalhador.reiniciar_apos:
+                trabalhador.encerrar()
+                if self._tentar_iniciar(trabalhador, "reinicio"):
+                    return trabalhador
+            self._livres.put(trabalhador)
+            if not any(t.ativo() for t in self.trabalhadores):
+                return None
+            # Os ativos estão ocupados: aguarda um deles voltar ao pool
+            time.sleep(0.1)
+
+    def converter(self, caminho_docx, dir_saida):
+        """Converte `caminho_docx` para PDF em `dir_saida` e retorna o caminho do PDF."""
+        pdf_path = Path(dir_saida) / f"{Path(caminho_docx).stem}.pdf"
+
+        trabalhador = self._obter_trabalhador() if self.uno_disponivel else None
+        if trabalhador is None:
+            contar("conversoes_a_frio")
+            return converter_a_frio(caminho_docx, dir_saida, timeout=self.timeout)
+
+        try:
+            trabalhador.converter(caminho_docx, pdf_path, self.timeout)
+        except TimeoutError:
+            # Conversão travada: mata a instância, que será reiniciada ao ser devolvida
+            trabalhador.encerrar()
+            raise
+        finally:
+            self._devolver(trabalhador)
+
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"Arquivo PDF esperado não foi encontrado em: {pdf_path}")
+        return str(pdf_path)
+
+    def converter_bytes(self, docx_bytes: bytes, nome: str = "documento") -> bytes:
+        """Converte um DOCX em memória e retorna os bytes do PDF (diretório temporário próprio da conversão)."""
+        with tempfile.TemporaryDirectory(prefix="conversao_") as dir_trabalho:
+            caminho_docx = Path(dir_trabalho) / f"{nome}.docx"
+            caminho_docx.write_bytes(docx_bytes)
+            return Path(self.converter(caminho_docx, dir_trabalho)).read_bytes()
+
+    def encerrar(self):
+        for trabalhador in self.trabalhadores:
+            trabalhador.descartar()
+
+
+_servico = None
+_servico_lock = threading.Lock()
+
+def obter_servico_conversao():
+    """Retorna o serviço de conversão do processo, criando-o na primeira chamada."""
+    global _servico
+    with _servico_lock:
+        if _servico is None:
+            _servico = ServicoConversao(
+                n_workers=int(os.getenv("CONVERSAO_WORKERS", "2")),
+                max_conversoes=int(os.getenv("CONVERSAO_MAX_JOBS", "50")),
+                memoria_max_mb=float(os.getenv("CONVERSAO_MEMORIA_MB", "800")),
+                timeout=float(os.getenv("CONVERSAO_TIMEOUT", "60")),
+            )
+            atexit.register(_servico.encerrar)
+        return _servico
+
+def converter_docx_bytes(docx_bytes: bytes, nome: str = "documento") -> bytes:
+    """Converte os bytes de um DOCX para os bytes do PDF com o serviço do processo."""
+    return obter_servico_conversao().converter_bytes(docx_bytes, nome)
+
+def libreoffice_disponivel() -> bool:
+    """Indica se o executável do LibreOffice está instalado (a imagem pode ser gerada sem ele)."""
+    return shutil.which(SOFFICE) is not None
@@ -1,114 +1,254 @@
-import matplotlib.pyplot as plt
+import hashlib
+import io
+import json
+import logging
+import math
+import os
 import pandas as pd
 import numpy as np
-import tempfile
-import os
 
-# Define um estilo básico para os gráficos
-plt.style.use('seaborn-v0_8-darkgrid')
+# Os gráficos usam a API orientada a objetos (Figure + canvas Agg) em vez do pyplot:
+# nenhum estado global é alterado, o que torna a geração segura em threads, e a
+# imagem é devolvida em memória (bytes PNG), sem arquivos temporários.
+#
+# Com um `cache` (ex.: `cache_relatorios.obter_cache_graficos()`), cada gráfico é
+# guardado pela chave das séries plotadas + tipo + estilo + tamanho (`chave_grafico`):
+# se os dados não mudaram, a imagem vem do cache e o matplotlib nem é importado.
+#
+# O custo de cada gráfico é limitado, qualquer que seja o número de itens do contrato:
+# o de aderência mostra no máximo GRAFICO_ADERENCIA_MAX_ITENS barras (os itens com
+# maior desvio entre previsto e realizado, e os demais somados em "Outros"), e nenhuma
+# imagem passa de GRAFICO_MAX_PIXELS pixels (a resolução é reduzida se preciso).
+#
+# Configuração (variáveis de ambiente):
+#     GRAFICO_ADERENCIA_MAX_ITENS   Barras do gráfico de aderência; 0 mostra todos os itens (padrão: 25)
+#     GRAFICO_MAX_PIXELS            Pixels por imagem (padrão: 3000000, ex.: 12 x 25 polegadas a 100 dpi)
+
+DPI_PADRAO = 100
+TAMANHO_CURVA_S = (10, 6)           # polegadas (largura, altura)
+LARGURA_ADERENCIA = 12              # polegadas; a altura cresce com o número de itens
+ALTURA_POR_ITEM = 0.8               # polegadas por item no gráfico de aderência (mínimo de 8)
+MAX_ITENS_ADERENCIA = int(os.getenv("GRAFICO_ADERENCIA_MAX_ITENS", "25"))
+MAX_PIXELS_GRAFICO = int(os.getenv("GRAFICO_MAX_PIXELS", "3000000"))
+
+# Estilo equivalente ao 'seaborn-v0_8-darkgrid', aplicado por figura (sem rcParams globais)
+COR_TEXTO = '0.15'
+COR_FUNDO_EIXOS = '#EAEAF2'
+
+# Incrementar sempre que a aparência dos gráficos mudar (cores, títulos, fontes), para invalidar o cache
+VERSAO_ESTILO = "1"
+
+logger = logging.getLogger(__name__)
 
 def formatar_reais(x, pos):
     'Formata o eixo Y como R$'
     return f'R$ {x:,.0f}'.replace(',', '.')
 
-def gerar_curva_s(df_tabela_3: pd.DataFrame):
+def parametros_graficos() -> dict:
+    """Configuração que altera as imagens geradas; entra na chave dos relatórios em cache."""
+    return {"estilo": VERSAO_ESTILO, "max_itens_aderencia": MAX_ITENS_ADERENCIA,
+            "max_pixels": MAX_PIXELS_GRAFICO}
+
+def chave_grafico(tipo: str, series: dict, **parametros) -> str:
+    """Hash das séries plotadas (numéricas ou rótulos), do tipo, do estilo e dos parâmetros (tamanho, dpi)."""
+    h = hashlib.sha256()
+    h.update(json.dumps({"tipo": tipo, "estilo": VERSAO_ESTILO, **parametros}, sort_keys=True, default=str).encode())
+    for nome in sorted(series):
+        valores = np.asarray(series[nome])
+        h.update(nome.encode())
+        if valores.dtype.kind in "biuf":
+            h.update(np.ascontiguousarray(valores, dtype=np.float64).tobytes())
+        else:
+            h.update("\x1f".join(map(str, valores)).encode())
+    return h.hexdigest()
+
+def _com_cache(cache, chave, desenho, desenhar=True):
+    """
+    Devolve a imagem em cache ou a desenha (e guarda); sem cache, apenas desenha.
+    Com `desenhar=False`, só consulta o cache (None se a imagem ainda não existe).
+    """
+    if cache is None:
+        return desenho() if desenhar else None
+    png = cache.ler(chave, ".png")
+    if png is None and desenhar:
+        png = desenho()
+        if png is not None:
+            cache.guardar(chave, ".png", png)
+    return png
+
+def _dpi_no_orcamento(tamanho, dpi, max_pixels=None) -> int:
+    """Maior resolução (até `dpi`) com que a figura de `tamanho` polegadas cabe em `max_pixels`."""
+    max_pixels = MAX_PIXELS_GRAFICO if max_pixels is None else max_pixels
+    largura, altura = tamanho
+    if max_pixels <= 0 or largura * altura * dpi * dpi <= max_pixels:
+        return dpi
+    return max(int(math.sqrt(max_pixels / (largura * altura))), 1)
+
+def resumir_itens(itens, previsto, realizado, max_itens: int):
+    """
+    Reduz as séries do gráfico de aderência a `max_itens` barras: ficam os itens com
+    maior desvio |realizado - previsto| (na ordem original) e os demais são somados em
+    uma barra "Outros (n itens)". Com `max_itens` <= 0 ou poucos itens, nada muda.
+    """
+    itens = pd.Series(itens).astype(str).reset_index(drop=True)
+    previsto = pd.Series(previsto).reset_index(drop=True)
+    realizado = pd.Series(realizado).reset_index(drop=True)
+    if max_itens <= 0 or len(itens) <= max_itens:
+        return itens, previsto, realizado
+
+    desvio = (realizado - previsto).abs().to_numpy()
+    # argsort estável: em empate fica o item que aparece primeiro
+    manter = np.sort(np.argsort(-desvio, kind='stable')[:max_itens - 1])
+    resto = np.setdiff1d(np.arange(len(itens)), manter)
+    rotulo = f"Outros ({len(resto)} itens)"
+    return (pd.concat([itens.iloc[manter], pd.Series([rotulo])], ignore_index=True),
+            pd.concat([previsto.iloc[manter], pd.Series([previsto.iloc[resto].sum()])], ignore_index=True),
+            pd.concat([realizado.iloc[manter], pd.Series([realizado.iloc[resto].sum()])], ignore_index=True))
+
+def _nova_figura(tamanho):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=tamanho, facecolor='white')
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor(COR_FUNDO_EIXOS)
+    ax.set_axisbelow(True)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.tick_params(colors=COR_TEXTO, length=0)
+    ax.grid(True, color='white', linestyle='-')
+    return fig, ax
+
+def _estilizar_textos(ax):
+    ax.title.set_color(COR_TEXTO)
+    ax.xaxis.label.set_color(COR_TEXTO)
+    ax.yaxis.label.set_color(COR_TEXTO)
+    legenda = ax.get_legend()
+    if legenda is not None:
+        legenda.set_frame_on(False)
+
+def _para_png(fig, dpi) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    return buffer.getvalue()
+
+def gerar_curva_s(df_tabela_3: pd.DataFrame, dpi: int = DPI_PADRAO, tamanho: tuple = TAMANHO_CURVA_S, cache=None,
+                  desenhar: bool = True):
     """
     Gera um gráfico de Curva S (Previsto Acumulado vs. Realizado Acumulado)
     a partir dos dados da Tabela 3 (gerar_tabela_previsto_realizado_mes).
+    Com `desenhar=False`, devolve só a imagem já guardada em `cache` (ou None).
+
+    Returns:
+        bytes: Imagem PNG em memória, ou None se não houver dados.
     """
     try:
         if df_tabela_3.empty:
             return None
 
-        # Garante que os dados são numéricos
-        df_tabela_3['Total Previsto'] = pd.to_numeric(df_tabela_3['Total Previsto'], errors='coerce').fillna(0)
-        df_tabela_3['Total Realizado'] = pd.to_numeric(df_tabela_3['Total Realizado'], errors='coerce').fillna(0)
-        
+        # Garante que os dados são numéricos (sem alterar o DataFrame recebido)
+        previsto = pd.to_numeric(df_tabela_3['Total Previsto'], errors='coerce').fillna(0)
+        realizado = pd.to_numeric(df_tabela_3['Total Realizado'], errors='coerce').fillna(0)
+
         # Calcula o cumulativo
-        df_plot = pd.DataFrame()
-        df_plot['Mês'] = df_tabela_3['Mês']
-        df_plot['Previsto Acumulado'] = df_tabela_3['Total Previsto'].cumsum()
-        df_plot['Realizado Acumulado'] = df_tabela_3['Total Realizado'].cumsum()
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        ax.plot(df_plot['Mês'], df_plot['Previsto Acumulado'], label='Previsto Acumulado', marker='o', color='blue')
-        ax.plot(df_plot['Mês'], df_plot['Realizado Acumulado'], label='Realizado Acumulado', marker='s', color='green')
-        
-        ax.set_title('Desempenho Financeiro (Curva S)', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Mês', fontsize=12)
-        ax.set_ylabel('Valor Acumulado (R$)', fontsize=12)
-        ax.legend()
-        
-        # Formata o eixo Y
-        formatter = plt.FuncFormatter(formatar_reais)
-        ax.yaxis.set_major_formatter(formatter)
-        ax.grid(True)
-        
-        # Salva em arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png", prefix="curva_s_") as tmpfile:
-            plt.savefig(tmpfile.name, format='png', bbox_inches='tight')
-            plt.close(fig)
-            return tmpfile.name
-            
+        meses = df_tabela_3['Mês']
+        previsto_acumulado = previsto.cumsum()
+        realizado_acumulado = realizado.cumsum()
+
+        chave = chave_grafico("curva_s", {"meses": meses, "previsto": previsto_acumulado,
+                                          "realizado": realizado_acumulado}, dpi=dpi, tamanho=tamanho,
+                              max_pixels=MAX_PIXELS_GRAFICO)
+        return _com_cache(cache, chave, lambda: _desenhar_curva_s(
+            meses, previsto_acumulado, realizado_acumulado, dpi, tamanho), desenhar)
+
     except Exception as e:
-        print(f"Erro ao gerar Curva S: {e}")
-        plt.close(fig)
+        logger.exception(f"Erro ao gerar Curva S: {e}")
         return None
 
-def gerar_grafico_aderencia(df_tabela_5: pd.DataFrame):
+def _desenhar_curva_s(meses, previsto_acumulado, realizado_acumulado, dpi, tamanho) -> bytes:
+    from matplotlib.ticker import FuncFormatter
+    fig, ax = _nova_figura(tamanho)
+
+    ax.plot(meses, previsto_acumulado, label='Previsto Acumulado', marker='o', color='blue')
+    ax.plot(meses, realizado_acumulado, label='Realizado Acumulado', marker='s', color='green')
+
+    ax.set_title('Desempenho Financeiro (Curva S)', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Mês', fontsize=12)
+    ax.set_ylabel('Valor Acumulado (R$)', fontsize=12)
+    ax.legend()
+
+    # Formata o eixo Y
+    ax.yaxis.set_major_formatter(FuncFormatter(formatar_reais))
+    _estilizar_textos(ax)
+
+    return _para_png(fig, _dpi_no_orcamento(tamanho, dpi))
+
+def gerar_grafico_aderencia(df_tabela_5: pd.DataFrame, dpi: int = DPI_PADRAO, largura: float = LARGURA_ADERENCIA,
+                            cache=None, max_itens: int = None, desenhar: bool = True):
     """
     Gera um gráfico de barras comparando Previsto Acumulado vs. Realizado Acumulado
     por item, a partir dos dados da Tabela 5 (gerar_tabela_previsto_realizado_acumulado).
+
+    Com mais de `max_itens` itens (padrão: GRAFICO_ADERENCIA_MAX_ITENS; 0 = todos), só
+    os de maior desvio aparecem, e os demais são somados em "Outros" (`resumir_itens`).
+    Com `desenhar=False`, devolve só a imagem já guardada em `cache` (ou None).
+
+    Returns:
+        bytes: Imagem PNG em memória, ou None se não houver dados.
     """
     try:
         if df_tabela_5.empty:
             return None
 
         # Filtra a linha 'TOTAL' se ela existir
-        df_plot = df_tabela_5[df_tabela_5['Item'].str.upper() != 'TOTAL'].copy()
-        
+        df_plot = df_tabela_5[df_tabela_5['Item'].astype(str).str.upper() != 'TOTAL']
+
         if df_plot.empty:
             return None
-            
+
         # Garante que os dados são numéricos
-        df_plot['Valor Previsto Acumulado'] = pd.to_numeric(df_plot['Valor Previsto Acumulado'], errors='coerce').fillna(0)
-        df_plot['Valor Realizado Acumulado'] = pd.to_numeric(df_plot['Valor Realizado Acumulado'], errors='coerce').fillna(0)
-
-        n_itens = len(df_plot)
-        index = np.arange(n_itens)
-        bar_width = 0.35
-        
-        fig, ax = plt.subplots(figsize=(12, max(8, n_itens * 0.8))) # Altura dinâmica
-        
-        bars1 = ax.barh(index - bar_width/2, df_plot['Valor Previsto Acumulado'], bar_width, label='Previsto Acumulado', color='tab:blue')
-        bars2 = ax.barh(index + bar_width/2, df_tabela_5['Valor Realizado Acumulado'], bar_width, label='Realizado Acumulado', color='tab:green')
-        
-        ax.set_title('Aderência às Etapas (Acumulado)', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Valor (R$)', fontsize=12)
-        ax.set_ylabel('Itens', fontsize=12)
-        ax.set_yticks(index)
-        ax.set_yticklabels(df_plot['Item'], ha='right')
-        ax.legend()
-        
-        # Formata o eixo X
-        formatter = plt.FuncFormatter(formatar_reais)
-        ax.xaxis.set_major_formatter(formatter)
-        
-        ax.grid(axis='x', linestyle='--', alpha=0.7)
-        plt.gca().invert_yaxis() # Item de cima primeiro
-        
-        # Salva em arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png", prefix="aderencia_") as tmpfile:
-            plt.savefig(tmpfile.name, format='png', bbox_inches='tight')
-            plt.close(fig)
-            return tmpfile.name
+        previsto = pd.to_numeric(df_plot['Valor Previsto Acumulado'], errors='coerce').fillna(0)
+        realizado = pd.to_numeric(df_plot['Valor Realizado Acumulado'], errors='coerce').fillna(0)
+        itens, previsto, realizado = resumir_itens(
+            df_plot['Item'], previsto, realizado, MAX_ITENS_ADERENCIA if max_itens is None else max_itens)
+
+        chave = chave_grafico("aderencia", {"itens": itens, "previsto": previsto, "realizado": realizado},
+                              dpi=dpi, largura=largura, max_pixels=MAX_PIXELS_GRAFICO)
+        return _com_cache(cache, chave, lambda: _desenhar_aderencia(itens, previsto, realizado, dpi, largura),
+                          desenhar)
 
     except Exception as e:
-        print(f"Erro ao gerar gráfico de aderência: {e}")
-        plt.close(fig)
+        logger.exception(f"Erro ao gerar gráfico de aderência: {e}")
         return None
 
+def _desenhar_aderencia(itens, previsto, realizado, dpi, largura) -> bytes:
+    from matplotlib.ticker import FuncFormatter
+    n_itens = len(itens)
+    index = np.arange(n_itens)
+    bar_width = 0.35
+
+    tamanho = (largura, max(8, n_itens * ALTURA_POR_ITEM)) # Altura dinâmica
+    fig, ax = _nova_figura(tamanho)
+
+    ax.barh(index - bar_width/2, previsto, bar_width, label='Previsto Acumulado', color='tab:blue')
+    ax.barh(index + bar_width/2, realizado, bar_width, label='Realizado Acumulado', color='tab:green')
+
+    ax.set_title('Aderência às Etapas (Acumulado)', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Valor (R$)', fontsize=12)
+    ax.set_ylabel('Itens', fontsize=12)
+    ax.set_yticks(index)
+    ax.set_yticklabels(itens, ha='right')
+    ax.legend()
+
+    # Formata o eixo X
+    ax.xaxis.set_major_formatter(FuncFormatter(formatar_reais))
+
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+    ax.invert_yaxis() # Item de cima primeiro
+    _estilizar_textos(ax)
+
+    return _para_png(fig, _dpi_no_orcamento(tamanho, dpi))
+
 # Você pode adicionar mais funções de gráfico aqui (ex: para Tabela 2, Tabela 6, etc.)
 # def gerar_grafico_idp(df_tabela_6: pd.DataFrame):
-#     ...
\ No newline at end of file
+#     ...
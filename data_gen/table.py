@@ -1,13 +1,228 @@
+"""
+Gerador de projetos sintéticos para testes de carga e benchmarks.
+
+Produz documentos de projeto no mesmo formato gravado por `cadastro_proj` e
+`atualizar_medi` (esquema v2 de `projeto.py`, ou o legado em linhas), com número
+de itens e de meses, atraso, esparsidade da medição e semente configuráveis.
+Os projetos são gerados sob demanda (iterador), de modo que milhares deles podem
+ser gravados em JSONL ou em um banco sem ficar todos em memória.
+
+Uso:
+    python -m data_gen.table --quantidade 5000 --itens 10 200 --meses 6 60 --saida projetos.jsonl
+    python -m data_gen.table --quantidade 3 --itens 1000 --meses 120 --atraso 0 12 --formato legado
+"""
+import argparse
+import datetime
+import json
+import sys
+from dataclasses import dataclass
+
 import numpy as np
 import pandas as pd
 
-def cria_tablela(linhas, l_tipo, colunas, c_tipo):
-    return pd.DataFrame({col: pd.Series(c_tipo = dtype_map(typ)) for col, typ in zip(colunas, c_tipo)},
-                        {col: pd.Series(c_tipo = dtype_map(typ)) for col, typ in zip(linhas, l_tipo)})
+from projeto import TabelasProjeto
+
+ETAPAS = (
+    "Serviços preliminares", "Canteiro de obras", "Demolições", "Movimento de terra", "Fundações",
+    "Estrutura de concreto", "Estrutura metálica", "Alvenaria", "Cobertura", "Impermeabilização",
+    "Instalações elétricas", "Instalações hidrossanitárias", "Instalações de gases medicinais",
+    "Climatização", "Prevenção contra incêndio", "Esquadrias", "Revestimentos", "Forros", "Pisos",
+    "Pintura", "Louças e metais", "Urbanização", "Limpeza final",
+)
+CONTRATADAS = (
+    "Construtora Ômega", "Engenharia Alfa", "Construções Beta", "Delta Obras", "Sigma Engenharia",
+    "Construtora Gama", "Épsilon Serviços", "Lâmbda Construções",
+)
+
 
 def dtype_map(dtype_str):
     return {
         'str': 'object',
-        'int': 'int64',
+        'int': 'Int64',     # inteiro que aceita valores vazios
         'float': 'float64'
-    }.get(dtype_str, 'object')
\ No newline at end of file
+    }.get(dtype_str, 'object')
+
+def cria_tablela(linhas, l_tipo, colunas, c_tipo):
+    """Tabela vazia (valores nulos) com as linhas e colunas informadas e tipos por coluna."""
+    indice = pd.Index(linhas, dtype=dtype_map(l_tipo))
+    return pd.DataFrame({col: pd.Series(index=indice, dtype=dtype_map(typ)) for col, typ in zip(colunas, c_tipo)},
+                        index=indice)
+
+
+@dataclass
+class ParametrosGeracao:
+    """
+    Parâmetros de um projeto sintético. Valores em tupla (mín, máx) são sorteados por projeto.
+
+    Args:
+        itens: Número de itens (etapas) do planejamento.
+        meses: Prazo planejado, em meses.
+        atraso: Meses de atraso da execução; o prazo é estendido na mesma quantidade,
+            como faz a página de medição.
+        esparsidade: Fração das células (item x mês) medidas que ficam sem valor.
+        progresso: Fração do prazo já medida (define `medicao_atual`).
+        desvio: Variação relativa do realizado em relação ao previsto.
+    """
+    itens: object = 20
+    meses: object = 12
+    atraso: object = 0
+    esparsidade: float = 0.2
+    progresso: object = (0.3, 1.0)
+    desvio: float = 0.25
+
+
+def _sortear(rng, valor, inteiro=True):
+    if isinstance(valor, (tuple, list)):
+        baixo, alto = valor
+        return int(rng.integers(baixo, alto + 1)) if inteiro else float(rng.uniform(baixo, alto))
+    return valor
+
+def _nomes_itens(n_itens):
+    return tuple(f"{i + 1}. {ETAPAS[i % len(ETAPAS)]}" for i in range(n_itens))
+
+def gerar_tabelas(rng, n_itens, n_meses, atraso=0, esparsidade=0.2, medicao_atual=None, desvio=0.25) -> TabelasProjeto:
+    """
+    Gera planejamento e medição realistas: cada item é executado em uma janela de
+    meses consecutivos com distribuição em sino (o que dá a curva S do projeto), e a
+    medição segue o planejado com `atraso` meses de defasagem e ruído de `desvio`.
+    """
+    prazo = n_meses + atraso
+    previsto = np.zeros((n_itens, prazo))
+    meses = np.arange(n_meses)
+
+    # Janela de execução de cada item, distribuída ao longo do prazo
+    inicio = rng.integers(0, max(n_meses - 1, 1), size=n_itens)
+    duracao = np.maximum(1, (rng.uniform(0.15, 0.6, size=n_itens) * n_meses).astype(int))
+    fim = np.minimum(inicio + duracao, n_meses)
+    valor_item = rng.lognormal(mean=11.0, sigma=1.0, size=n_itens).round(2)
+
+    centro = (inicio + fim - 1) / 2
+    largura = np.maximum((fim - inicio) / 3, 0.5)
+    pesos = np.exp(-0.5 * ((meses[None, :] - centro[:, None]) / largura[:, None]) ** 2)
+    pesos *= (meses[None, :] >= inicio[:, None]) & (meses[None, :] < fim[:, None])
+    pesos /= pesos.sum(axis=1, keepdims=True)
+    previsto[:, :n_meses] = (pesos * valor_item[:, None]).round(2)
+
+    if medicao_atual is None:
+        medicao_atual = prazo
+    medicao_atual = int(min(max(medicao_atual, 1), prazo))
+
+    # Realizado = planejado deslocado pelo atraso, com ruído e meses sem medição
+    realizado = np.zeros_like(previsto)
+    realizado[:, atraso:] = previsto[:, :prazo - atraso]
+    realizado *= rng.uniform(1 - desvio, 1 + desvio, size=realizado.shape)
+    realizado *= rng.random(realizado.shape) >= esparsidade
+    realizado[:, medicao_atual:] = 0
+
+    return TabelasProjeto(
+        itens=_nomes_itens(n_itens),
+        total_etapa=previsto.sum(axis=1).round(2),
+        previsto=previsto,
+        realizado=realizado.round(2),
+        meses_medidos=tuple(range(1, medicao_atual + 1)),
+        tem_medicao=True,
+    )
+
+def gerar_projeto(indice: int, parametros: ParametrosGeracao = None, seed=None, formato: str = "v2") -> dict:
+    """
+    Gera o documento de um projeto, pronto para gravar no Firestore.
+
+    Args:
+        indice (int): Número do projeto (usado no nº do contrato e na semente padrão).
+        formato (str): "v2" (formato atual) ou "legado" ("table"/"tabela_medicao" em linhas).
+    """
+    parametros = parametros or ParametrosGeracao()
+    rng = np.random.default_rng(indice if seed is None else seed)
+
+    n_itens = _sortear(rng, parametros.itens)
+    n_meses = _sortear(rng, parametros.meses)
+    atraso = _sortear(rng, parametros.atraso)
+    progresso = _sortear(rng, parametros.progresso, inteiro=False)
+    medicao_atual = max(1, round(progresso * (n_meses + atraso)))
+    tabelas = gerar_tabelas(rng, n_itens, n_meses, atraso, parametros.esparsidade, medicao_atual, parametros.desvio)
+
+    inicio = datetime.date(2022, 1, 1) + datetime.timedelta(days=int(rng.integers(0, 3 * 365)))
+    fim = inicio + datetime.timedelta(days=30 * (n_meses + atraso))
+    valor = float(tabelas.total_etapa.sum())
+    documento = {
+        "n_contrato": f"{indice + 1:04d}/{inicio.year}",
+        "periodo_vigencia": [str(inicio), str(fim)],
+        "n_os": f"OS-{int(rng.integers(1000, 9999))}",
+        "objeto": f"Reforma e ampliação do bloco {chr(65 + indice % 26)} - projeto sintético {indice + 1}",
+        "valor_bens_receb": f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+        "contratante": "EBSERH",
+        "contratada": CONTRATADAS[int(rng.integers(len(CONTRATADAS)))],
+        "prazo_meses": n_meses + atraso,
+        "medicao_atual": medicao_atual,
+    }
+    if formato == "legado":
+        documento["table"] = tabelas.linhas_planejamento()
+        documento["tabela_medicao"] = tabelas.linhas_medicao()
+    else:
+        documento.update(tabelas.para_documento())
+    return documento
+
+def gerar_projetos(quantidade: int, parametros: ParametrosGeracao = None, seed: int = 0, formato: str = "v2"):
+    """Itera sobre `(id, documento)` de `quantidade` projetos; a mesma semente gera os mesmos projetos."""
+    sementes = np.random.SeedSequence(seed).spawn(quantidade)
+    for i, semente in enumerate(sementes):
+        yield f"sintetico_{seed}_{i:06d}", gerar_projeto(i, parametros, seed=semente, formato=formato)
+
+def para_dataframes(documento: dict):
+    """Tabelas de planejamento e medição do documento como DataFrames (com as linhas de total)."""
+    tabelas = TabelasProjeto.de_documento(documento)
+    return pd.DataFrame(tabelas.linhas_planejamento()), pd.DataFrame(tabelas.linhas_medicao())
+
+def gravar_jsonl(projetos, caminho) -> int:
+    """Grava os projetos `(id, documento)` em JSONL, um por linha, à medida que são gerados."""
+    total = 0
+    with open(caminho, "w", encoding="utf-8") as f:
+        for doc_id, documento in projetos:
+            f.write(json.dumps({"id": doc_id, "dados": documento}, ensure_ascii=False) + "\n")
+            total += 1
+    return total
+
+def ler_jsonl(caminho):
+    """Itera sobre `(id, documento)` de um arquivo gravado por `gravar_jsonl`."""
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            registro = json.loads(linha)
+            yield registro["id"], registro["dados"]
+
+def povoar(db, projetos, colecao: str = "projetos") -> int:
+    """Grava os projetos em um cliente do Firestore (emulador, banco de testes ou substituto em memória)."""
+    total = 0
+    for doc_id, documento in projetos:
+        db.collection(colecao).document(doc_id).set(documento)
+        total += 1
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera projetos sintéticos.",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument("--quantidade", type=int, default=100)
+    parser.add_argument("--itens", type=int, nargs="+", default=[20], help="Valor fixo ou intervalo (mín máx)")
+    parser.add_argument("--meses", type=int, nargs="+", default=[12], help="Valor fixo ou intervalo (mín máx)")
+    parser.add_argument("--atraso", type=int, nargs="+", default=[0], help="Valor fixo ou intervalo (mín máx)")
+    parser.add_argument("--esparsidade", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formato", choices=["v2", "legado"], default="v2")
+    parser.add_argument("--saida", help="Arquivo JSONL (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    def faixa(valores):
+        return valores[0] if len(valores) == 1 else tuple(valores[:2])
+
+    parametros = ParametrosGeracao(itens=faixa(args.itens), meses=faixa(args.meses),
+                                   atraso=faixa(args.atraso), esparsidade=args.esparsidade)
+    projetos = gerar_projetos(args.quantidade, parametros, args.seed, args.formato)
+    if args.saida:
+        total = gravar_jsonl(projetos, args.saida)
+        print(f"{total} projeto(s) gravado(s) em {args.saida}.", file=sys.stderr)
+    else:
+        for doc_id, documento in projetos:
+            print(json.dumps({"id": doc_id, "dados": documento}, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
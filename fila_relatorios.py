@@ -0,0 +1,193 @@
+"""
+Fila de geração de relatórios em segundo plano.
+
+O botão "Gerar PDF" apenas enfileira o trabalho e recebe um ID; a geração (tabelas,
+gráficos, template e LibreOffice) roda em um pool limitado de threads, fora da
+thread do script do Streamlit. A fila é um recurso do processo (`st.cache_resource`),
+então os trabalhos sobrevivem a reruns e à navegação entre as páginas do `main.py`;
+a página só consulta o estado pelo ID e mostra o download quando o PDF fica pronto.
+
+Configuração (variáveis de ambiente):
+    FILA_RELATORIOS_WORKERS    Trabalhos executados ao mesmo tempo (padrão: 2)
+    FILA_RELATORIOS_RETENCAO   Trabalhos finalizados mantidos em memória (padrão: 200)
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import streamlit as st
+
+from metricas import contar, na_requisicao, observar, requisicao_atual
+from projeto import ProjetoSnapshot
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+
+# Quantidade de trabalhos recentes usada nas médias de espera e execução
+JANELA_METRICAS = 100
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Trabalho:
+    """Um pedido de geração de relatório e seu estado."""
+    id: str
+    project_id: str
+    estado: str = PENDENTE
+    criado_em: float = 0.0
+    iniciado_em: float = None
+    concluido_em: float = None
+    pdf: bytes = None
+    erro: str = None
+    requisicao: str = None   # ID da requisição que pediu o PDF (para os logs)
+    backend: str = None      # "nativo" ou "libreoffice" (None: padrão de `relatorio.gerar_pdf`)
+    versao_dados: str = None # hash do documento do projeto enviado (ver `versao_dados`)
+
+    @property
+    def finalizado(self) -> bool:
+        return self.estado in (CONCLUIDO, FALHOU)
+
+    @property
+    def espera(self) -> float:
+        """Segundos na fila até começar (ou até agora, se ainda pendente)."""
+        return (self.iniciado_em or time.time()) - self.criado_em
+
+    @property
+    def execucao(self) -> float:
+        """Segundos de execução (ou até agora, se ainda executando); None se não começou."""
+        if self.iniciado_em is None:
+            return None
+        return (self.concluido_em or time.time()) - self.iniciado_em
+
+    @property
+    def chave(self) -> tuple:
+        """Identifica trabalhos equivalentes: mesmo projeto, mesmo backend e mesmos dados."""
+        return (self.project_id, self.backend, self.versao_dados)
+
+
+def versao_dados(projeto: ProjetoSnapshot) -> str:
+    """Hash do documento do projeto; muda a cada edição do cabeçalho, planejamento ou medição."""
+    texto = json.dumps(projeto.dados, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+class FilaRelatorios:
+    """
+    Fila de relatórios com um pool limitado de workers.
+
+    Args:
+        workers (int): Número de relatórios gerados ao mesmo tempo.
+        retencao (int): Quantos trabalhos finalizados (com o PDF em memória) são mantidos;
+            os mais antigos são descartados.
+    """
+
+    def __init__(self, workers=2, retencao=200):
+        self.workers = workers
+        self.retencao = retencao
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="relatorio")
+        self._trabalhos = OrderedDict()
+        self._ativos = {}    # Trabalho.chave -> id do trabalho pendente/executando
+        self._esperas = deque(maxlen=JANELA_METRICAS)
+        self._execucoes = deque(maxlen=JANELA_METRICAS)
+        self._falhas = 0
+        self._concluidos = 0
+        self._lock = threading.Lock()
+
+    def enviar(self, projeto: ProjetoSnapshot, backend: str = None) -> str:
+        """
+        Enfileira a geração do relatório do projeto e retorna o ID do trabalho.
+        Se já houver um trabalho pendente ou em execução para o projeto com os mesmos
+        dados e o mesmo backend de PDF, retorna o ID dele; se o projeto foi editado
+        depois, um novo trabalho é criado com o snapshot atual.
+        """
+        trabalho = Trabalho(id=uuid.uuid4().hex, project_id=projeto.id, criado_em=time.time(),
+                            requisicao=requisicao_atual(), backend=backend,
+                            versao_dados=versao_dados(projeto))
+        with self._lock:
+            existente = self._ativos.get(trabalho.chave)
+            if existente is not None:
+                return existente
+            self._trabalhos[trabalho.id] = trabalho
+            self._ativos[trabalho.chave] = trabalho.id
+        self._executor.submit(self._executar, trabalho, projeto)
+        return trabalho.id
+
+    def obter(self, trabalho_id: str) -> Trabalho:
+        """Retorna o trabalho, ou None se o ID não existir (ou já tiver sido descartado)."""
+        with self._lock:
+            return self._trabalhos.get(trabalho_id)
+
+    def _executar(self, trabalho: Trabalho, projeto: ProjetoSnapshot):
+        with na_requisicao(trabalho.requisicao):
+            self._executar_trabalho(trabalho, projeto)
+
+    def _executar_trabalho(self, trabalho: Trabalho, projeto: ProjetoSnapshot):
+        with self._lock:
+            trabalho.estado = EXECUTANDO
+            trabalho.iniciado_em = time.time()
+            self._esperas.append(trabalho.espera)
+        observar("fila_espera_segundos", trabalho.espera)
+
+        try:
+            # Importado no primeiro trabalho: tabelas, gráficos e template não pesam na abertura da página
+            from relatorio import gerar_pdf
+            pdf = gerar_pdf(projeto, backend=trabalho.backend)
+            erro = None
+        except Exception as e:
+            logger.exception(f"Falha ao gerar o relatório do projeto {projeto.id}")
+            pdf, erro = None, f"{type(e).__name__}: {e}"
+        contar("fila_trabalhos", estado=FALHOU if erro else CONCLUIDO)
+
+        with self._lock:
+            trabalho.pdf, trabalho.erro = pdf, erro
+            trabalho.estado = FALHOU if erro else CONCLUIDO
+            trabalho.concluido_em = time.time()
+            self._execucoes.append(trabalho.execucao)
+            if erro:
+                self._falhas += 1
+            else:
+                self._concluidos += 1
+            self._ativos.pop(trabalho.chave, None)
+            self._descartar_antigos()
+
+    def _descartar_antigos(self):
+        finalizados = [t.id for t in self._trabalhos.values() if t.finalizado]
+        for trabalho_id in finalizados[:max(len(finalizados) - self.retencao, 0)]:
+            del self._trabalhos[trabalho_id]
+
+    def metricas(self) -> dict:
+        """Profundidade da fila, trabalhos em execução e tempos médios de espera e execução (s)."""
+        with self._lock:
+            pendentes = [t for t in self._trabalhos.values() if t.estado == PENDENTE]
+            return {
+                "workers": self.workers,
+                "na_fila": len(pendentes),
+                "executando": sum(t.estado == EXECUTANDO for t in self._trabalhos.values()),
+                "concluidos": self._concluidos,
+                "falhas": self._falhas,
+                "espera_media": sum(self._esperas) / len(self._esperas) if self._esperas else 0.0,
+                "espera_maxima_atual": max((t.espera for t in pendentes), default=0.0),
+                "execucao_media": sum(self._execucoes) / len(self._execucoes) if self._execucoes else 0.0,
+            }
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@st.cache_resource
+def obter_fila_relatorios() -> FilaRelatorios:
+    """Fila única do processo, compartilhada por todas as sessões e páginas."""
+    return FilaRelatorios(
+        workers=int(os.getenv("FILA_RELATORIOS_WORKERS", "2")),
+        retencao=int(os.getenv("FILA_RELATORIOS_RETENCAO", "200")),
+    )
@@ -1,107 +1,54 @@
 import streamlit as st
-from docx import Document
-import tempfile
-import shutil
-import os
-import re
-import subprocess
-from pathlib import Path
+import io
+from conversao_pdf import converter_docx_bytes
+from modelos import MODELO_PADRAO, obter_registro_modelos
 
-def get_downloads_folder():
-    home = Path.home()
-    if os.name == 'nt':  # Windows
-        downloads = home / "Downloads"
-    else:  # macOS/Linux
-        downloads = home / "Downloads"
-    return downloads
+def converter_para_pdf(doc):
+    buffer = io.BytesIO()
+    doc.save(buffer)
 
-def extrair_campos(doc):
-    campos = set()
-    for p in doc.paragraphs:
-        campos.update(re.findall(r"\{\{(.*?)\}\}", p.text))
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for p in cell.paragraphs:
-                    campos.update(re.findall(r"\{\{(.*?)\}\}", p.text))
-    return list(campos)
-
-def preencher_campos(doc, dados):
-    for p in doc.paragraphs:
-        for k, v in dados.items():
-            p.text = p.text.replace(f"{{{{{k}}}}}", v)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for p in cell.paragraphs:
-                    for k, v in dados.items():
-                        p.text = p.text.replace(f"{{{{{k}}}}}", v)
-
-def converter_para_pdf(caminho_docx):
-    downloads_dir = get_downloads_folder()
-    os.makedirs(downloads_dir, exist_ok=True)
-
-    comando = [
-        "soffice",
-        "--headless",
-        "--convert-to", "pdf",
-        "--outdir", str(downloads_dir),
-        caminho_docx
-    ]
-    st.write(f"Executando comando: {' '.join(comando)}")
-    result = subprocess.run(comando, capture_output=True, text=True)
-
-    st.write("STDOUT:", result.stdout)
-    st.write("STDERR:", result.stderr)
-
-    if result.returncode != 0:
-        raise RuntimeError(f"Erro na conversão para PDF:\n{result.stderr}")
-
-    arquivos = os.listdir(downloads_dir)
-    pdfs = [f for f in arquivos if f.lower().endswith(".pdf")]
-
-    if not pdfs:
-        raise FileNotFoundError(f"Nenhum arquivo PDF encontrado na pasta {downloads_dir}")
-
-    pdfs = sorted(pdfs, key=lambda f: os.path.getmtime(os.path.join(downloads_dir, f)), reverse=True)
-    caminho_pdf = os.path.join(downloads_dir, pdfs[0])
-
-    return caminho_pdf
+    # Converte em memória com o serviço persistente do LibreOffice (nada é gravado em pastas do servidor)
+    return converter_docx_bytes(buffer.getvalue())
 
 def main():
-    st.title("📄 Gerar PDF e salvar na pasta Downloads")
-
-    caminho_fixo = "template/Template_ata_ebserh.docx"
-
-    if not os.path.exists(caminho_fixo):
-        st.error(f"Arquivo fixo não encontrado: {caminho_fixo}")
+    st.title("📄 Gerar PDF")
+
+    # Os templates ficam compilados em memória (registro de `modelos`): cada rerun só
+    # confere a data de modificação do arquivo, sem copiá-lo nem relê-lo
+    registro = obter_registro_modelos()
+    nomes = registro.nomes()
+    if not nomes:
+        st.error(f"Nenhum template encontrado em: {registro.diretorio}")
+        st.stop()
+    if len(nomes) > 1:
+        nome = st.selectbox("Template", nomes, index=nomes.index(MODELO_PADRAO) if MODELO_PADRAO in nomes else 0)
     else:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-            shutil.copyfile(caminho_fixo, tmp.name)
-            caminho_docx_temp = tmp.name
+        nome = nomes[0]
+
+    try:
+        modelo = registro.obter(nome)
+    except FileNotFoundError as e:
+        st.error(str(e))
+        st.stop()
 
-        doc = Document(caminho_docx_temp)
-        campos = extrair_campos(doc)
+    campos = modelo.campos
 
-        if campos:
-            st.success("Campos encontrados:")
-            dados = {}
-            for campo in campos:
-                dados[campo] = st.text_input(campo)
+    if campos:
+        st.success("Campos encontrados:")
+        dados = {}
+        for campo in campos:
+            dados[campo] = st.text_input(campo)
 
-            if st.button("Gerar PDF"):
-                preencher_campos(doc, dados)
+        if st.button("Gerar PDF"):
+            doc = modelo.compilado.renderizar(dados)
 
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as docx_preenchido:
-                    doc.save(docx_preenchido.name)
-                    pdf_path = converter_para_pdf(docx_preenchido.name)
+            pdf_bytes = converter_para_pdf(doc)
 
-                    with open(pdf_path, "rb") as pdf_file:
-                        st.download_button(
-                            label="📥 Baixar PDF",
-                            data=pdf_file,
-                            file_name="documento_preenchido.pdf",
-                            mime="application/pdf"
-                        )
-        else:
-            st.warning("Nenhum campo {{campo}} encontrado.")
+            st.download_button(
+                label="📥 Baixar PDF",
+                data=pdf_bytes,
+                file_name="documento_preenchido.pdf",
+                mime="application/pdf"
+            )
+    else:
+        st.warning("Nenhum campo {{campo}} encontrado.")
@@ -0,0 +1,265 @@
+"""
+Registro dos geradores do relatório: qual função produz cada placeholder do template.
+
+Cada artefato (matrizes, uma tabela, um gráfico) é registrado com o decorador
+`artefato`, que declara as suas dependências (outros artefatos) e os placeholders
+que ele preenche. A `Montagem` de um projeto calcula apenas os artefatos de que os
+placeholders do template escolhido precisam (`TemplateCompilado.campos`), cada um
+uma única vez: a Curva S usada por quatro placeholders é desenhada uma vez, e um
+template que só mostra a Tabela 1 não paga pelos gráficos.
+
+Os artefatos formam um grafo de dependências (matrizes -> tabelas -> gráficos). A
+montagem executa ao mesmo tempo todos os nós cujas dependências já estão prontas:
+as cinco tabelas juntas e cada gráfico assim que a sua tabela termina. Os nós rodam
+em um pool de threads do processo; os que passam o tempo todo com o GIL (o desenho
+dos gráficos no matplotlib, registrados com `processo=True`) são enviados pela
+thread a um pool de processos já aquecido, para que os dois gráficos sejam de fato
+desenhados em paralelo. Um nó de processo recebe só as dependências (DataFrames) e
+os campos do cabeçalho que declara em `campos`, nunca o snapshot inteiro, e a sua
+`consulta` (o cache de gráficos) é feita antes no processo principal: se a imagem
+já existe, nada é enviado ao pool. O tempo total tende ao do caminho crítico (matrizes ->
+tabela 5 -> aderência), e não à soma das etapas; o tempo de cada nó é registrado
+no processo principal (`metricas.medir` e `Montagem.tempos`).
+
+Para um placeholder novo (ex.: `grafico_7`), basta registrar a função aqui:
+
+    @artefato("grafico_idp", dependencias=("tabela_3",), placeholders=("grafico_7",))
+    def _grafico_idp(projeto, tabela_3):
+        ...
+
+Configuração (variáveis de ambiente):
+    MONTAGEM_WORKERS     Artefatos calculados ao mesmo tempo no processo, somando os relatórios (padrão: 4)
+    MONTAGEM_PROCESSOS   Processos para os nós com `processo=True`; 0 os executa em threads
+                         (padrão: 2, limitado aos núcleos livres: 0 em máquinas de um núcleo)
+"""
+import contextvars
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+import pandas as pd
+
+from cache_relatorios import obter_cache_graficos
+from data_gen.graphs import gerar_curva_s, gerar_grafico_aderencia
+from metricas import medir
+from processamento import DadosInsuficientes, calcular_tabela, montar_matrizes
+from projeto import ProjetoSnapshot
+
+
+@dataclass(frozen=True)
+class Artefato:
+    """Um produto intermediário do relatório e a função que o calcula a partir das dependências."""
+    nome: str
+    funcao: object            # funcao(projeto, **dependencias); com `processo`, funcao(cabecalho, **dependencias)
+    dependencias: tuple = ()
+    processo: bool = False    # CPU puro com o GIL: executado no pool de processos, de nível de módulo
+    campos: tuple = ()        # com `processo`: campos de projeto.dados passados em `cabecalho`
+    consulta: object = None   # consulta(cabecalho, **dependencias) -> valor já pronto (cache) ou None
+
+# nome -> Artefato
+ARTEFATOS = {}
+# placeholder do template -> nome do artefato que o preenche
+PLACEHOLDERS = {}
+
+
+def artefato(nome: str, dependencias=(), placeholders=(), processo=False, campos=(), consulta=None):
+    """Registra a função decorada como geradora do artefato `nome`."""
+    def registrar(funcao):
+        for dependencia in dependencias:
+            if dependencia not in ARTEFATOS:
+                raise ValueError(f"Artefato '{nome}' depende de '{dependencia}', que não está registrado.")
+        ARTEFATOS[nome] = Artefato(nome, funcao, tuple(dependencias), processo, tuple(campos), consulta)
+        for placeholder in placeholders:
+            PLACEHOLDERS[placeholder] = nome
+        return funcao
+    return registrar
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def obter_executor() -> ThreadPoolExecutor:
+    """Pool de threads do processo usado pelas montagens, criado na primeira chamada."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.getenv("MONTAGEM_WORKERS", "4")),
+                                           thread_name_prefix="montagem")
+        return _executor
+
+def _aquecer():
+    """Carrega o matplotlib no processo antes do primeiro gráfico a desenhar (ele só é importado se houver o que desenhar)."""
+    importlib.import_module("matplotlib.backends.backend_agg")
+
+_processos = None
+
+def obter_pool_processos() -> ProcessPoolExecutor:
+    """Pool de processos do processo atual (None se `MONTAGEM_PROCESSOS` for 0), já aquecido."""
+    global _processos
+    with _executor_lock:
+        n = int(os.getenv("MONTAGEM_PROCESSOS", max(min(2, (os.cpu_count() or 1) - 1), 0)))
+        if _processos is None and n > 0:
+            # "spawn" evita herdar threads do gRPC/Streamlit do processo pai
+            _processos = ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(n):
+                _processos.submit(_aquecer)
+        return _processos
+
+
+class Montagem:
+    """
+    Cálculo sob demanda dos artefatos de um projeto, com memória: cada artefato é
+    calculado no máximo uma vez, na primeira vez em que é pedido.
+    """
+
+    def __init__(self, projeto: ProjetoSnapshot):
+        self.projeto = projeto
+        self.valores = {}
+        self.tempos = {}    # artefato -> segundos de cálculo
+
+    def _executar(self, nome: str, em_processo: bool = False):
+        item = ARTEFATOS[nome]
+        dependencias = {d: self.valores[d] for d in item.dependencias}
+        # Nós de processo recebem só os campos do cabeçalho que declaram (o pickle é pequeno)
+        primeiro = {c: self.projeto.dados.get(c) for c in item.campos} if item.processo else self.projeto
+        processos = obter_pool_processos() if em_processo and item.processo else None
+        inicio = time.perf_counter()
+        with medir(nome, projeto=self.projeto.id) as etapa:
+            valor = None
+            if processos is not None:
+                if item.consulta is not None:
+                    valor = item.consulta(primeiro, **dependencias)
+                if valor is None:
+                    valor = processos.submit(item.funcao, primeiro, **dependencias).result()
+            else:
+                valor = item.funcao(primeiro, **dependencias)
+            if valor is None:
+                etapa.falhar(f"{nome} não gerado")
+        self.tempos[nome] = time.perf_counter() - inicio
+        return valor
+
+    def obter(self, nome: str):
+        """Calcula (na thread atual) o artefato e as dependências que faltam."""
+        if nome not in self.valores:
+            for dependencia in ARTEFATOS[nome].dependencias:
+                self.obter(dependencia)
+            self.valores[nome] = self._executar(nome)
+        return self.valores[nome]
+
+    def calcular(self, nomes, executor: ThreadPoolExecutor = None):
+        """
+        Calcula os artefatos `nomes` e as suas dependências, executando ao mesmo tempo
+        os que não dependem uns dos outros. A primeira falha cancela o que ainda não
+        começou e é propagada.
+        """
+        executor = executor or obter_executor()
+        pendentes = {}   # artefato -> dependências ainda não calculadas
+        a_visitar = [n for n in nomes if n not in self.valores]
+        while a_visitar:
+            nome = a_visitar.pop()
+            if nome not in pendentes:
+                pendentes[nome] = {d for d in ARTEFATOS[nome].dependencias if d not in self.valores}
+                a_visitar.extend(pendentes[nome])
+
+        em_execucao = {}
+        def submeter_prontos():
+            for nome in [n for n, deps in pendentes.items() if not deps]:
+                del pendentes[nome]
+                # Cada nó roda no contexto de quem pediu (ID da requisição nos logs)
+                contexto = contextvars.copy_context()
+                em_execucao[executor.submit(contexto.run, self._executar, nome, True)] = nome
+
+        submeter_prontos()
+        while em_execucao:
+            concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                nome = em_execucao.pop(futuro)
+                try:
+                    self.valores[nome] = futuro.result()
+                except Exception:
+                    for outro in em_execucao:
+                        outro.cancel()
+                    raise
+                for deps in pendentes.values():
+                    deps.discard(nome)
+            submeter_prontos()
+
+    def caminho_critico(self) -> float:
+        """Soma dos tempos no caminho mais longo do grafo calculado (limite inferior da montagem)."""
+        duracao = {}
+        def ate(nome):
+            if nome not in duracao:
+                duracao[nome] = self.tempos.get(nome, 0.0) + max(
+                    (ate(d) for d in ARTEFATOS[nome].dependencias), default=0.0)
+            return duracao[nome]
+        return max((ate(n) for n in self.tempos), default=0.0)
+
+    def preencher(self, campos, paralelo: bool = True) -> dict:
+        """
+        Dicionário para o template: os dados do projeto e os placeholders de `campos`
+        que têm gerador registrado (os demais ficam de fora).
+        """
+        usados = {campo: PLACEHOLDERS[campo] for campo in campos if campo in PLACEHOLDERS}
+        if paralelo:
+            self.calcular(set(usados.values()))
+        dados = self.projeto.dados.copy()
+        for campo, nome in usados.items():
+            dados[campo] = self.obter(nome)
+        return dados
+
+
+# --- Tabelas ---
+
+@artefato("matrizes")
+def _matrizes(projeto):
+    try:
+        return montar_matrizes(projeto)
+    except Exception as e:
+        raise RuntimeError(f"Falha ao processar as tabelas do projeto {projeto.id}: {e}") from e
+
+# nome -> placeholder no template
+_TABELAS_TEMPLATE = {
+    'tabela_1': 'table',
+    'tabela_2': 'table_2',
+    'tabela_3': 'table_3',
+    'tabela_4': 'table_4',
+    'tabela_5': 'table_5',
+}
+
+def _registrar_tabela(nome, placeholder):
+    @artefato(nome, dependencias=("matrizes",), placeholders=(placeholder,))
+    def _tabela(projeto, matrizes):
+        try:
+            return calcular_tabela(projeto, nome, matrizes)
+        except DadosInsuficientes:
+            # Sem planejamento ou medição o relatório sai com a tabela vazia (o aviso já foi para o log)
+            return pd.DataFrame()
+
+for _nome, _placeholder in _TABELAS_TEMPLATE.items():
+    _registrar_tabela(_nome, _placeholder)
+# (Registre table_6, table_7... aqui quando existirem)
+
+
+# --- Gráficos (imagens PNG em memória, reaproveitadas do cache de gráficos se os dados não mudaram) ---
+# O desenho usa só a tabela: nenhum campo do cabeçalho é enviado ao processo.
+
+def _aderencia_em_cache(cabecalho, tabela_5):
+    return gerar_grafico_aderencia(tabela_5, cache=obter_cache_graficos(), desenhar=False)
+
+@artefato("grafico_aderencia", dependencias=("tabela_5",), placeholders=("grafico_1", "grafico_2"),
+          processo=True, consulta=_aderencia_em_cache)
+def _grafico_aderencia(cabecalho, tabela_5):
+    return gerar_grafico_aderencia(tabela_5, cache=obter_cache_graficos())
+
+def _curva_s_em_cache(cabecalho, tabela_3):
+    return gerar_curva_s(tabela_3, cache=obter_cache_graficos(), desenhar=False)
+
+@artefato("grafico_curva_s", dependencias=("tabela_3",),
+          placeholders=("grafico_3", "grafico_4", "grafico_5", "grafico_6"), processo=True,
+          consulta=_curva_s_em_cache)
+def _grafico_curva_s(cabecalho, tabela_3):
+    return gerar_curva_s(tabela_3, cache=obter_cache_graficos())
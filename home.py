@@ -22,7 +22,7 @@ def main():
     st.subheader("3. Consulta e geração do relatório de medição")
     st.image("img/Screenshot from 2025-10-20 09-15-37.png", width=1000)
 
-    st.text("A Consulta e geração serve dois propositos, o primeiro é buscar informações para que sejam realizadas atualizações de mediçoes ou de projetos e a geração da ata referente a ultima atualização. O site não quarda as atas, sempre que o pdf é gerado todas as informações referentes ao projeto selecionados são solicitadas do banco de dados e processadas novamente.")
+    st.text("A Consulta e geração serve dois propositos, o primeiro é buscar informações para que sejam realizadas atualizações de mediçoes ou de projetos e a geração da ata referente a ultima atualização. As atas geradas ficam guardadas em cache: se o projeto e o template não mudaram desde a última geração, o mesmo PDF é devolvido imediatamente. Quando há alterações, todas as informações referentes ao projeto selecionado são processadas novamente.")
 
     st.subheader("4. Atualização de tabela de Planejamento")
     st.image("img/Screenshot from 2025-10-20 09-16-52.png", width=1000)
@@ -0,0 +1,142 @@
+"""
+Geração em lote de Atas de Medição.
+
+Gera o relatório de vários projetos de uma vez (ex.: fechamento do mês), executando
+tabelas, gráficos, preenchimento do template e conversão para PDF em um pool de
+processos que usa todos os núcleos da máquina. Falhas de um projeto são registradas
+sem interromper o lote.
+
+Uso:
+    python lote.py --saida atas/                     # todos os projetos
+    python lote.py --ids ID1 ID2 --zip atas.zip      # projetos específicos em um ZIP
+    python lote.py --campo contratada --termo omega --workers 4 --saida atas/
+    python lote.py --backend libreoffice --saida atas/   # PDF pelo template DOCX + LibreOffice
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from firebase_admin import firestore
+
+from busca import normalizar
+from conversao_pdf import BACKENDS
+from projeto import carregar_projeto
+from relatorio import gerar_relatorio
+from repositorio import conectar_firestore
+
+
+@dataclass
+class ResultadoLote:
+    """Resultado da geração em lote: PDFs gerados e falhas por projeto."""
+    pdfs: dict = field(default_factory=dict)     # project_id -> caminho do PDF
+    falhas: dict = field(default_factory=dict)   # project_id -> mensagem de erro
+    zip_path: str = None
+
+
+def _inicializar_processo():
+    # Cada processo do pool usa uma única instância do LibreOffice e monta os gráficos em
+    # threads (sem processos próprios); o paralelismo vem do pool
+    os.environ["CONVERSAO_WORKERS"] = "1"
+    os.environ["MONTAGEM_PROCESSOS"] = "0"
+    conectar_firestore()
+
+def _gerar_projeto(project_id: str, dir_saida: str, backend: str = None):
+    """Executado em um processo do pool: gera o PDF de um projeto."""
+    projeto = carregar_projeto(firestore.client(), project_id)
+    if projeto is None:
+        raise LookupError(f"Projeto com ID '{project_id}' não foi encontrado.")
+    return gerar_relatorio(projeto, dir_saida, backend=backend)
+
+def selecionar_projetos(db: firestore.client, campo: str = None, termo: str = None) -> list:
+    """
+    Lista os IDs dos projetos cujo `campo` contém `termo` (sem acentos/maiúsculas).
+    Sem filtro, retorna todos os projetos. Apenas os campos de cabeçalho são lidos.
+    """
+    campos = ["n_contrato"] + ([campo] if campo and campo != "n_contrato" else [])
+    ids = []
+    for doc in db.collection("projetos").select(campos).stream():
+        if not campo or normalizar(termo) in normalizar(doc.to_dict().get(campo)):
+            ids.append(doc.id)
+    return ids
+
+def gerar_lote(project_ids, dir_saida, workers=None, zip_path=None, ao_progredir=None, backend=None) -> ResultadoLote:
+    """
+    Gera os PDFs dos projetos em paralelo.
+
+    Args:
+        project_ids (list[str]): IDs dos projetos.
+        dir_saida (str): Diretório onde os PDFs serão gravados.
+        workers (int): Número de processos (padrão: número de núcleos).
+        zip_path (str): Se informado, também empacota os PDFs neste arquivo ZIP.
+        ao_progredir (callable): Chamado como `ao_progredir(concluidos, total, project_id, erro)`
+            a cada projeto finalizado; `erro` é None em caso de sucesso.
+        backend (str): Backend de PDF ("nativo" ou "libreoffice"; padrão: `PDF_BACKEND`).
+
+    Returns:
+        ResultadoLote: PDFs gerados e falhas por projeto.
+    """
+    resultado = ResultadoLote()
+    total = len(project_ids)
+    if total == 0:
+        return resultado
+
+    os.makedirs(dir_saida, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, total)
+
+    # "spawn" evita herdar threads do gRPC/Streamlit do processo pai
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto, initializer=_inicializar_processo) as pool:
+        futuros = {pool.submit(_gerar_projeto, pid, str(dir_saida), backend): pid for pid in project_ids}
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            pid = futuros[futuro]
+            erro = None
+            try:
+                resultado.pdfs[pid] = futuro.result()
+            except Exception as e:
+                erro = f"{type(e).__name__}: {e}"
+                resultado.falhas[pid] = erro
+            if ao_progredir:
+                ao_progredir(concluidos, total, pid, erro)
+
+    if zip_path:
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for caminho in resultado.pdfs.values():
+                zf.write(caminho, arcname=Path(caminho).name)
+        resultado.zip_path = str(zip_path)
+
+    return resultado
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera Atas de Medição em lote.")
+    parser.add_argument("--ids", nargs="*", help="IDs dos projetos (padrão: todos ou os filtrados)")
+    parser.add_argument("--campo", help="Campo usado no filtro (ex.: contratada, n_contrato)")
+    parser.add_argument("--termo", default="", help="Termo buscado no campo")
+    parser.add_argument("--saida", default="atas", help="Diretório dos PDFs")
+    parser.add_argument("--zip", help="Empacota os PDFs neste arquivo ZIP")
+    parser.add_argument("--workers", type=int, help="Número de processos (padrão: núcleos da máquina)")
+    parser.add_argument("--backend", choices=BACKENDS, help="Backend de PDF (padrão: variável PDF_BACKEND)")
+    args = parser.parse_args(argv)
+
+    db = conectar_firestore()
+    ids = args.ids or selecionar_projetos(db, args.campo, args.termo)
+    print(f"Gerando {len(ids)} relatório(s) em {args.saida}...")
+
+    def progresso(concluidos, total, pid, erro):
+        status = "ok" if erro is None else f"FALHA - {erro}"
+        print(f"[{concluidos}/{total}] {pid}: {status}", flush=True)
+
+    resultado = gerar_lote(ids, args.saida, workers=args.workers, zip_path=args.zip, ao_progredir=progresso,
+                           backend=args.backend)
+
+    print(f"Concluído: {len(resultado.pdfs)} gerado(s), {len(resultado.falhas)} falha(s).")
+    if resultado.zip_path:
+        print(f"ZIP: {resultado.zip_path}")
+    return 1 if resultado.falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,35 @@
+import importlib
+import sys
+import time
 import streamlit as st
-import home
-import cadastro_proj
-import consultar_proj
-import atualizar_proj
-import gera_pdf
-import atualizar_medi
+from metricas import iniciar_exportacao, observar
+
+# Registro das páginas: chave -> (rótulo do menu, módulo). O módulo só é importado
+# quando a página é aberta pela primeira vez no processo, de modo que a página
+# inicial não carrega pandas, matplotlib, python-docx nem o firebase_admin.
+PAGINAS = {
+    "home": ("Início", "home"),
+    "cadastro": ("Cadastro de Projeto", "cadastro_proj"),
+    "consultar": ("Consulta de Projeto", "consultar_proj"),
+    "atualizar": ("Atualização de Projeto", "atualizar_proj"),
+    "medicoes": ("Atualização de Medições", "atualizar_medi"),
+}
+
+def carregar_pagina(chave):
+    """Importa o módulo da página (uma vez por processo) e registra o tempo da primeira importação."""
+    _, nome_modulo = PAGINAS[chave]
+    if nome_modulo in sys.modules:
+        return sys.modules[nome_modulo]
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nome_modulo)
+    observar("pagina_importacao_segundos", time.perf_counter() - inicio, pagina=chave)
+    return modulo
 
 st.set_page_config(layout="wide")
 
+# Logs estruturados e endpoint /metrics (uma vez por processo)
+iniciar_exportacao()
+
 def get_github_icon_link(url):
     return f"""
     <a href="{url}" target="_blank" style="display: inline-flex; align-items: center; text-decoration: none;">
@@ -25,29 +47,13 @@ if "page" not in st.session_state:
 # Barra lateral com botões
 with st.sidebar:
     st.image("img/logo_ebserh.png", width=200)
-    if st.button("Início", type="tertiary"):
-        st.session_state.page = "home"
-    if st.button("Cadastro de Projeto", type="tertiary"):
-        st.session_state.page = "cadastro"
-    if st.button("Consulta de Projeto", type="tertiary"):
-        st.session_state.page = "consultar"
-    if st.button("Atualização de Projeto", type="tertiary"):
-        st.session_state.page = "atualizar"
-    if st.button("Atualização de Medições", type="tertiary"):
-        st.session_state.page = "medicoes"
+    for chave, (rotulo, _) in PAGINAS.items():
+        if st.button(rotulo, type="tertiary"):
+            st.session_state.page = chave
 
 
 # Mostra a página correspondente
-if st.session_state.page == "home":
-    home.main()
-elif st.session_state.page == "cadastro":
-    cadastro_proj.main()
-elif st.session_state.page == "consultar":
-    consultar_proj.main()
-elif st.session_state.page == "atualizar":
-    atualizar_proj.main()
-elif st.session_state.page == "medicoes":
-    atualizar_medi.main()
+carregar_pagina(st.session_state.page).main()
 
 st.sidebar.header("Sobre")
 github_url = "https://github.com/LSLeal14/docx-to-pdf-app.git"
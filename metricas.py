@@ -0,0 +1,329 @@
+"""
+Medição de tempos, contadores e logs estruturados da aplicação.
+
+Cada etapa relevante (leitura/escrita no Firestore, cada tabela, cada gráfico,
+preenchimento do template, conversão e download) é envolvida em `medir(...)`, que
+registra a duração em um histograma com o nome da etapa e o resultado (`ok`/`erro`)
+e emite uma linha de log em JSON com o ID da requisição. O ID é criado a cada
+execução de página (`nova_requisicao`) e acompanha o trabalho na fila de relatórios,
+de modo que todas as etapas de um mesmo PDF podem ser agrupadas nos logs.
+
+As métricas ficam em memória no processo e podem ser exportadas no formato de texto
+do Prometheus, em um arquivo (atualizado periodicamente) e/ou em um endpoint HTTP.
+Os histogramas permitem calcular p50/p95/p99 por etapa; a taxa de erros sai da
+razão entre as contagens com `status="erro"` e o total.
+
+Configuração (variáveis de ambiente):
+    METRICAS_ARQUIVO     Caminho do arquivo .prom gravado periodicamente (padrão: desativado)
+    METRICAS_INTERVALO   Intervalo mínimo, em segundos, entre gravações do arquivo (padrão: 15)
+    METRICAS_PORTA       Porta do endpoint HTTP `/metrics` (padrão: desativado)
+    METRICAS_LOG         Nível dos logs estruturados na saída de erro (padrão: INFO; vazio desativa)
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites dos buckets (s): de 1 ms a 2 min, cobrindo de uma tabela a uma conversão lenta
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+PREFIXO = "atas"
+
+logger = logging.getLogger(__name__)
+
+_requisicao = contextvars.ContextVar("requisicao", default=None)
+
+
+# --- ID da requisição ---
+
+def nova_requisicao(**contexto) -> str:
+    """Inicia uma requisição (ex.: uma execução de página) e retorna o seu ID."""
+    requisicao_id = uuid.uuid4().hex[:12]
+    _requisicao.set(requisicao_id)
+    registrar_evento("requisicao", **contexto)
+    return requisicao_id
+
+def requisicao_atual() -> str:
+    return _requisicao.get()
+
+@contextmanager
+def na_requisicao(requisicao_id: str):
+    """Executa o bloco com o ID de requisição informado (ex.: em uma thread da fila)."""
+    token = _requisicao.set(requisicao_id)
+    try:
+        yield
+    finally:
+        _requisicao.reset(token)
+
+
+# --- Registro de métricas ---
+
+def _rotulos(rotulos: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _formatar_rotulos(rotulos: tuple, extra: tuple = ()) -> str:
+    pares = rotulos + extra
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+def _formatar_numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+class Histograma:
+    """Contagens acumuladas por bucket, soma e total de observações de uma série."""
+
+    def __init__(self, limites=BUCKETS):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)   # o último é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q: float) -> float:
+        """Estimativa do quantil `q` (limite superior do bucket que o contém)."""
+        if not self.total:
+            return 0.0
+        alvo, acumulado = q * self.total, 0
+        for limite, contagem in zip(self.limites + (float("inf"),), self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+
+class RegistroMetricas:
+    """Histogramas e contadores do processo, seguros para uso entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}   # (nome, rótulos) -> Histograma
+        self._contadores = {}    # (nome, rótulos) -> valor
+        self._descricoes = {}
+
+    def observar(self, nome: str, valor: float, descricao: str = "", **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        with self._lock:
+            self._descricoes.setdefault(nome, descricao)
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma()
+            histograma.observar(valor)
+
+    def incrementar(self, nome: str, valor: float = 1, descricao: str = "", **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        with self._lock:
+            self._descricoes.setdefault(f"{nome}_total", descricao)
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def resumo(self, nome: str = "etapa_duracao_segundos") -> dict:
+        """Contagem, erros, média e p50/p95/p99 por etapa (para exibição na própria aplicação)."""
+        por_etapa = {}
+        with self._lock:
+            for (n, rotulos), h in self._histogramas.items():
+                if n != nome:
+                    continue
+                r = dict(rotulos)
+                item = por_etapa.setdefault(r.get("etapa", ""), {"total": 0, "erros": 0, "soma": 0.0, "hist": Histograma()})
+                item["total"] += h.total
+                item["soma"] += h.soma
+                item["erros"] += h.total if r.get("status") == "erro" else 0
+                item["hist"].contagens = [a + b for a, b in zip(item["hist"].contagens, h.contagens)]
+                item["hist"].total += h.total
+        return {
+            etapa: {
+                "total": item["total"],
+                "erros": item["erros"],
+                "media_s": item["soma"] / item["total"] if item["total"] else 0.0,
+                "p50_s": item["hist"].quantil(0.50),
+                "p95_s": item["hist"].quantil(0.95),
+                "p99_s": item["hist"].quantil(0.99),
+            }
+            for etapa, item in sorted(por_etapa.items())
+        }
+
+    def exportar_prometheus(self) -> str:
+        """Todas as séries no formato de texto do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            histogramas = sorted((k, (h.limites, list(h.contagens), h.soma, h.total)) for k, h in self._histogramas.items())
+            contadores = sorted(self._contadores.items())
+            descricoes = dict(self._descricoes)
+
+        linhas, declarados = [], set()
+
+        def cabecalho(nome, tipo):
+            if nome not in declarados:
+                declarados.add(nome)
+                if descricoes.get(nome):
+                    linhas.append(f"# HELP {PREFIXO}_{nome} {descricoes[nome]}")
+                linhas.append(f"# TYPE {PREFIXO}_{nome} {tipo}")
+
+        for (nome, rotulos), (limites, contagens, soma, total) in histogramas:
+            cabecalho(nome, "histogram")
+            acumulado = 0
+            for limite, contagem in zip(limites + (float("inf"),), contagens):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f"{PREFIXO}_{nome}_bucket{_formatar_rotulos(rotulos, (('le', le),))} {acumulado}")
+            linhas.append(f"{PREFIXO}_{nome}_sum{_formatar_rotulos(rotulos)} {repr(soma)}")
+            linhas.append(f"{PREFIXO}_{nome}_count{_formatar_rotulos(rotulos)} {total}")
+
+        for (nome, rotulos), valor in contadores:
+            cabecalho(f"{nome}_total", "counter")
+            linhas.append(f"{PREFIXO}_{nome}_total{_formatar_rotulos(rotulos)} {_formatar_numero(valor)}")
+
+        return "\n".join(linhas) + "\n"
+
+    def gravar_arquivo(self, caminho: str):
+        """Grava a exportação de forma atômica (o coletor nunca lê um arquivo pela metade)."""
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.exportar_prometheus())
+        os.replace(temporario, caminho)
+
+
+REGISTRO = RegistroMetricas()
+
+
+# --- Logs estruturados e medição de etapas ---
+
+def registrar_evento(evento: str, nivel: int = logging.INFO, **campos):
+    """Emite uma linha de log em JSON com o ID da requisição atual."""
+    if logger.isEnabledFor(nivel):
+        registro = {"evento": evento, "requisicao": requisicao_atual(), **campos}
+        logger.log(nivel, json.dumps(registro, ensure_ascii=False, default=str))
+
+def contar(nome: str, valor: float = 1, **rotulos):
+    """Incrementa um contador (exportado como `atas_<nome>_total`)."""
+    REGISTRO.incrementar(nome, valor, **rotulos)
+    _exportar_se_devido()
+
+def observar(nome: str, valor: float, **rotulos):
+    """Registra um valor (em segundos) em um histograma (`atas_<nome>`)."""
+    REGISTRO.observar(nome, valor, **rotulos)
+    _exportar_se_devido()
+
+class Medicao:
+    """Etapa em andamento, devolvida por `medir`; `falhar` marca o resultado como erro sem exceção."""
+
+    def __init__(self, etapa: str):
+        self.etapa = etapa
+        self.erro = None
+
+    def falhar(self, motivo: str):
+        self.erro = motivo
+
+
+@contextmanager
+def medir(etapa: str, **campos):
+    """
+    Mede o bloco como a etapa `etapa`: registra a duração no histograma
+    `atas_etapa_duracao_segundos{etapa, status}` e emite um log estruturado.
+    Exceções são contadas como erro e propagadas; funções que sinalizam falha
+    retornando None podem usar `Medicao.falhar`. `campos` só vão para o log
+    (ex.: ID do projeto), para não multiplicar as séries do histograma.
+    """
+    medicao = Medicao(etapa)
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    except BaseException as e:
+        medicao.falhar(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        status = "erro" if medicao.erro else "ok"
+        REGISTRO.observar("etapa_duracao_segundos", duracao, "Duração de cada etapa, em segundos.",
+                          etapa=etapa, status=status)
+        if medicao.erro:
+            campos["erro"] = medicao.erro
+        registrar_evento("etapa", logging.WARNING if medicao.erro else logging.INFO, etapa=etapa, status=status,
+                         duracao_ms=round(duracao * 1000, 3), **campos)
+        _exportar_se_devido()
+
+
+# --- Exportação ---
+
+_exportacao_lock = threading.Lock()
+_ultima_exportacao = 0.0
+_servidor = None
+
+def _exportar_se_devido():
+    """Grava o arquivo de métricas se METRICAS_ARQUIVO estiver definido e o intervalo tiver passado."""
+    global _ultima_exportacao
+    caminho = os.getenv("METRICAS_ARQUIVO")
+    if not caminho:
+        return
+    agora = time.monotonic()
+    if agora - _ultima_exportacao < float(os.getenv("METRICAS_INTERVALO", "15")):
+        return
+    if not _exportacao_lock.acquire(blocking=False):
+        return
+    try:
+        _ultima_exportacao = agora
+        REGISTRO.gravar_arquivo(caminho)
+    except OSError:
+        logger.exception(f"Falha ao gravar as métricas em {caminho}")
+    finally:
+        _exportacao_lock.release()
+
+
+class _TratadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = REGISTRO.exportar_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_exportacao():
+    """
+    Configura os logs estruturados (nível METRICAS_LOG, na saída de erro) e inicia o
+    endpoint HTTP `/metrics` se METRICAS_PORTA estiver definida. Pode ser chamada a
+    cada execução: a configuração é feita uma única vez por processo.
+    """
+    global _servidor
+    if _servidor is not None:
+        return
+    with _exportacao_lock:
+        if _servidor is not None:
+            return
+        _servidor = False
+        nivel = os.getenv("METRICAS_LOG", "INFO")
+        if nivel:
+            tratador = logging.StreamHandler()
+            tratador.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+            logger.addHandler(tratador)
+            logger.setLevel(nivel.upper())
+            logger.propagate = False
+
+        porta = os.getenv("METRICAS_PORTA")
+        if not porta:
+            return
+        try:
+            _servidor = ThreadingHTTPServer(("0.0.0.0", int(porta)), _TratadorMetricas)
+        except OSError:
+            logger.exception(f"Não foi possível abrir o endpoint de métricas na porta {porta}")
+            return
+        threading.Thread(target=_servidor.serve_forever, name="metricas", daemon=True).start()
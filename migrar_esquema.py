@@ -0,0 +1,133 @@
+"""
+Migração dos documentos de projeto para o esquema colunar das tabelas (v2).
+
+Converte "table" e "tabela_medicao" (listas de linhas com "Mês 1" ... "Mês N",
+zeros nos meses futuros e percentuais em texto) para os campos "planejamento" e
+"medicao" descritos em `projeto.py`, removendo os campos legados. Documentos que
+já estão no v2 são ignorados, de modo que a migração pode ser repetida.
+
+Com `--manter-legado`, "table" e "tabela_medicao" ficam no documento (para reverter),
+mas deixam de ser atualizados: a primeira gravação do planejamento ou da medição os
+apaga. Uma nova execução sem a opção remove as cópias legadas que restarem, depois de
+conferir que ainda batem com as tabelas v2 (as que divergem são mantidas e listadas).
+
+Uso:
+    python migrar_esquema.py --simular              # só mostra o que seria migrado
+    python migrar_esquema.py                        # migra todos os projetos
+    python migrar_esquema.py --ids ID1 ID2 --manter-legado
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+from firebase_admin import firestore
+
+from repositorio import conectar_firestore
+from projeto import CAMPOS_LEGADOS, VERSAO_ESQUEMA, TabelasProjeto, remocao_legados
+
+# Limite de operações por lote de escrita do Firestore
+TAMANHO_LOTE = 400
+
+
+def _tamanho(dados: dict) -> int:
+    """Tamanho aproximado dos campos, em bytes (JSON)."""
+    return len(json.dumps(dados, default=str, ensure_ascii=False).encode())
+
+def migrar_documento(dados: dict, manter_legado: bool = False) -> dict:
+    """
+    Retorna os campos a atualizar para levar o documento ao esquema atual,
+    ou None se ele já estiver migrado.
+    """
+    if dados.get("schema_version", 1) >= VERSAO_ESQUEMA:
+        return None
+    tabelas = TabelasProjeto.de_documento(dados)
+    return tabelas.para_documento() if manter_legado else tabelas.para_atualizacao()
+
+def legado_confere(dados: dict) -> bool:
+    """Indica se as cópias legadas de um documento v2 ainda batem com as tabelas v2."""
+    v2 = TabelasProjeto.de_documento(dados)
+    legado = TabelasProjeto.de_documento({c: v for c, v in dados.items() if c != "schema_version"})
+    if v2.itens != legado.itens or not np.allclose(v2.total_etapa, legado.total_etapa):
+        return False
+    n_meses = max(v2.n_meses, legado.n_meses)
+    return all(
+        np.allclose(v2._ajustar_meses(getattr(v2, m), n_meses), legado._ajustar_meses(getattr(legado, m), n_meses))
+        for m in ("previsto", "realizado")
+    )
+
+def migrar(db: firestore.client, ids=None, simular=False, manter_legado=False) -> dict:
+    """
+    Migra os projetos (todos ou os `ids` informados). Sem `manter_legado`, também
+    remove as cópias legadas deixadas em documentos v2 por uma migração anterior.
+
+    Returns:
+        dict: Contagem de documentos migrados, limpos, divergentes e ignorados e os
+        tamanhos antes/depois (bytes).
+    """
+    colecao = db.collection("projetos")
+    documentos = (colecao.document(i).get() for i in ids) if ids else colecao.stream()
+    resumo = {"migrados": 0, "limpos": 0, "divergentes": 0, "ignorados": 0, "bytes_antes": 0, "bytes_depois": 0}
+
+    lote = db.batch()
+    pendentes = 0
+    for doc in documentos:
+        if not doc.exists:
+            print(f"{doc.id}: não encontrado")
+            continue
+        dados = doc.to_dict()
+        atualizacao = migrar_documento(dados, manter_legado)
+        if atualizacao is not None:
+            antes = _tamanho({c: dados.get(c) for c in CAMPOS_LEGADOS})
+            depois = _tamanho({c: v for c, v in atualizacao.items() if c not in CAMPOS_LEGADOS})
+            resumo["migrados"] += 1
+            resumo["bytes_antes"] += antes
+            resumo["bytes_depois"] += depois
+            print(f"{doc.id}: {antes} -> {depois} bytes")
+        elif manter_legado or not any(c in dados for c in CAMPOS_LEGADOS):
+            resumo["ignorados"] += 1
+            continue
+        elif legado_confere(dados):
+            atualizacao = remocao_legados(dados)
+            resumo["limpos"] += 1
+            print(f"{doc.id}: cópia legada removida")
+        else:
+            resumo["divergentes"] += 1
+            print(f"{doc.id}: cópia legada diverge das tabelas v2; mantida")
+            continue
+
+        if not simular:
+            lote.update(doc.reference, atualizacao)
+            pendentes += 1
+            if pendentes >= TAMANHO_LOTE:
+                lote.commit()
+                lote = db.batch()
+                pendentes = 0
+
+    if pendentes:
+        lote.commit()
+    return resumo
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra as tabelas dos projetos para o esquema colunar (v2).")
+    parser.add_argument("--ids", nargs="*", help="IDs dos projetos (padrão: todos)")
+    parser.add_argument("--simular", action="store_true", help="Não grava nada, só mostra o que seria migrado")
+    parser.add_argument("--manter-legado", action="store_true",
+                        help="Mantém 'table' e 'tabela_medicao' no documento (para reverter) "
+                             "até a próxima gravação do projeto")
+    args = parser.parse_args(argv)
+
+    resumo = migrar(conectar_firestore(), args.ids, args.simular, args.manter_legado)
+
+    acao = "Seriam migrados" if args.simular else "Migrados"
+    print(f"{acao}: {resumo['migrados']} projeto(s); já no v2: {resumo['ignorados']}.")
+    if resumo["limpos"] or resumo["divergentes"]:
+        limpeza = "Cópias legadas a remover" if args.simular else "Cópias legadas removidas"
+        print(f"{limpeza}: {resumo['limpos']}; divergentes (mantidas): {resumo['divergentes']}.")
+    if resumo["bytes_antes"]:
+        print(f"Tabelas: {resumo['bytes_antes']} -> {resumo['bytes_depois']} bytes "
+              f"({resumo['bytes_depois'] / resumo['bytes_antes']:.0%}).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
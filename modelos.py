@@ -0,0 +1,121 @@
+"""
+Registro dos templates (modelos .docx) dos relatórios, carregados uma vez por processo.
+
+Cada modelo é lido do disco e compilado uma única vez (`TemplateCompilado`: placeholders
+consolidados e localizados, lista de campos) e fica em memória; cada renderização
+recebe uma cópia profunda do documento já analisado (`TemplateCompilado.documento`),
+sem cópia em arquivo temporário nem nova leitura do .docx. A cada pedido, o registro
+compara a data de modificação e o tamanho do arquivo com os da versão carregada: se o
+template foi substituído, ele é recompilado na hora (sem reiniciar o app), e a chave
+dos relatórios em cache muda com ele (`Modelo.conteudo`).
+
+Os modelos têm nome: cada `.docx` de TEMPLATES_DIR é registrado pelo nome do arquivo
+sem extensão (ex.: "Template_ata_ebserh"); outros podem ser incluídos com `registrar`.
+
+Configuração (variáveis de ambiente):
+    TEMPLATES_DIR    Diretório dos templates (padrão: template)
+    MODELO_PADRAO    Nome do template usado quando nenhum é escolhido (padrão: Template_ata_ebserh)
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from io import BytesIO
+from pathlib import Path
+
+from template_docx import TemplateCompilado
+
+MODELO_PADRAO = os.getenv("MODELO_PADRAO", "Template_ata_ebserh")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Modelo:
+    """Uma versão carregada de um template: bytes do arquivo, estrutura compilada e layout do PDF."""
+    nome: str
+    caminho: str
+    assinatura: tuple         # (mtime_ns, tamanho) do arquivo quando foi lido
+    conteudo: bytes = field(repr=False)
+    compilado: TemplateCompilado = field(repr=False)
+
+    @property
+    def campos(self) -> list:
+        """Placeholders do template, em ordem alfabética."""
+        return sorted(self.compilado.campos)
+
+    @cached_property
+    def layout(self):
+        """Layout do template para o backend nativo (`pdf_nativo`), lido na primeira vez em que é pedido."""
+        # Importado só aqui: o ReportLab pode não estar instalado na imagem
+        from pdf_nativo import LayoutTemplate
+        return LayoutTemplate.de_documento(self.compilado.documento())
+
+
+class RegistroModelos:
+    """Templates por nome, compilados sob demanda e recarregados quando o arquivo muda."""
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self._caminhos = {}      # nome -> caminho registrado com `registrar`
+        self._carregados = {}    # caminho -> Modelo
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, caminho):
+        """Inclui (ou substitui) o template `nome`, lido de `caminho`."""
+        with self._lock:
+            self._caminhos[nome] = str(caminho)
+
+    def nomes(self) -> list:
+        """Nomes dos templates disponíveis: os registrados e os .docx do diretório."""
+        encontrados = {p.stem for p in self.diretorio.glob("*.docx") if not p.name.startswith("~$")}
+        with self._lock:
+            return sorted(encontrados | set(self._caminhos))
+
+    def caminho(self, nome: str = None) -> str:
+        """Caminho do arquivo do template `nome` (padrão: MODELO_PADRAO)."""
+        nome = nome or MODELO_PADRAO
+        with self._lock:
+            if nome in self._caminhos:
+                return self._caminhos[nome]
+        return str(self.diretorio / f"{nome}.docx")
+
+    def obter(self, nome: str = None) -> Modelo:
+        """Template `nome` (padrão: MODELO_PADRAO), recompilado se o arquivo mudou."""
+        return self.carregar(self.caminho(nome), nome or MODELO_PADRAO)
+
+    def carregar(self, caminho, nome: str = None) -> Modelo:
+        """Template lido de `caminho`, compilado na primeira vez e sempre que o arquivo muda."""
+        caminho = str(caminho)
+        try:
+            estado = os.stat(caminho)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template não encontrado: {caminho}") from None
+        assinatura = (estado.st_mtime_ns, estado.st_size)
+
+        # A compilação fica sob o lock: pedidos simultâneos do mesmo template aguardam uma única leitura
+        with self._lock:
+            atual = self._carregados.get(caminho)
+            if atual is not None and atual.assinatura == assinatura:
+                return atual
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+            modelo = Modelo(nome or Path(caminho).stem, caminho, assinatura, conteudo,
+                            TemplateCompilado.de_arquivo(BytesIO(conteudo)))
+            self._carregados[caminho] = modelo
+        if atual is not None:
+            logger.info(f"Template {modelo.nome} alterado em disco; recompilado")
+        return modelo
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+def obter_registro_modelos() -> RegistroModelos:
+    """Retorna o registro de templates do processo, criando-o na primeira chamada."""
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroModelos(os.getenv("TEMPLATES_DIR", "template"))
+        return _registro
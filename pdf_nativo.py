@@ -0,0 +1,292 @@
+"""
+Geração da Ata de Medição direto em PDF (ReportLab), sem Word nem LibreOffice.
+
+O layout segue o template `.docx`: o texto, a ordem dos blocos, o alinhamento e o
+negrito dos parágrafos, as imagens fixas (logotipos), a tabela de identificação e o
+tamanho da página e das margens são lidos do próprio template, uma vez por processo
+(`LayoutTemplate.de_documento`). A tipografia e o estilo das tabelas estão declarados
+abaixo. Os placeholders recebem os mesmos dados do caminho DOCX
+(`relatorio.montar_dados_template`): texto, tabelas (DataFrame ou lista de dicts,
+inseridas após o parágrafo) e imagens (PNG em memória, com 6" de largura).
+
+Só usa CPU e roda em qualquer thread ou processo; um relatório típico sai em bem
+menos de um segundo. O caminho DOCX + LibreOffice continua disponível e é usado como
+reserva se este falhar (ver `relatorio.gerar_pdf`).
+"""
+from dataclasses import dataclass
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from docx.oxml.ns import qn
+from docx.text.run import Run
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from template_docx import PADRAO_CAMPO, is_image, is_table, normalize_table
+
+# --- Tipografia (equivalente à do template) ---
+FONTE = "Helvetica"
+TAMANHO_TEXTO = 11
+TAMANHO_TABELA = 9
+LARGURA_IMAGEM = 6.0 * inch      # mesma largura das imagens do caminho DOCX
+TABULACAO = "&nbsp;" * 4
+# Células de texto maiores que isto quebram linha (as demais são desenhadas direto, mais rápido)
+MAX_CELULA_SEM_QUEBRA = 16
+
+ALINHAMENTOS = {"center": TA_CENTER, "both": TA_JUSTIFY, "distribute": TA_JUSTIFY,
+                "right": TA_RIGHT, "end": TA_RIGHT}
+
+ESTILO_GRADE = [
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("FONTNAME", (0, 0), (-1, -1), FONTE),
+    ("FONTSIZE", (0, 0), (-1, -1), TAMANHO_TABELA),
+    ("LEFTPADDING", (0, 0), (-1, -1), 3),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 3),
+    ("TOPPADDING", (0, 0), (-1, -1), 2),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+]
+
+# Imagens gravadas em binário: a codificação ASCII85 (padrão do ReportLab) só serve para
+# PDFs 7 bits e, sem a extensão em C, é a etapa mais lenta do desenho
+rl_config.useA85 = 0
+
+EMU_POR_PONTO = 12700
+TWIPS_POR_PONTO = 20
+
+
+@dataclass(frozen=True)
+class Trecho:
+    """Um run do template: texto e formatação."""
+    texto: str
+    negrito: bool = False
+    italico: bool = False
+
+@dataclass(frozen=True)
+class BlocoParagrafo:
+    trechos: tuple
+    alinhamento: int = TA_LEFT
+    imagens: tuple = ()      # (bytes, largura em pt, altura em pt)
+
+@dataclass(frozen=True)
+class BlocoTabela:
+    linhas: tuple            # linhas -> células -> tuple[Trecho]
+    larguras: tuple = None   # largura das colunas em pt (grade do template)
+
+
+def _trechos(elemento) -> tuple:
+    trechos = []
+    for r in elemento.iter(qn("w:r")):
+        run = Run(r, None)
+        if run.text:
+            trechos.append(Trecho(run.text, bool(run.bold), bool(run.italic)))
+    return tuple(trechos)
+
+def _imagens(p_element, parte) -> tuple:
+    imagens = []
+    for desenho in p_element.iter(qn("w:drawing")):
+        blip = next(desenho.iter(qn("a:blip")), None)
+        extensao = next(desenho.iter(qn("wp:extent")), None)
+        if blip is None or extensao is None:
+            continue
+        imagem = parte.related_parts.get(blip.get(qn("r:embed")))
+        if imagem is not None:
+            imagens.append((imagem.blob, int(extensao.get("cx")) / EMU_POR_PONTO,
+                            int(extensao.get("cy")) / EMU_POR_PONTO))
+    return tuple(imagens)
+
+def _paragrafo(p_element, parte) -> BlocoParagrafo:
+    jc = p_element.find(f"{qn('w:pPr')}/{qn('w:jc')}")
+    alinhamento = ALINHAMENTOS.get(jc.get(qn("w:val")) if jc is not None else None, TA_LEFT)
+    return BlocoParagrafo(_trechos(p_element), alinhamento, _imagens(p_element, parte))
+
+def _tabela(tbl_element) -> BlocoTabela:
+    larguras = tuple(int(c.get(qn("w:w"))) / TWIPS_POR_PONTO
+                     for c in tbl_element.iter(qn("w:gridCol")) if c.get(qn("w:w")))
+    linhas = []
+    for tr in tbl_element.iter(qn("w:tr")):
+        celulas = []
+        for tc in tr.iter(qn("w:tc")):
+            trechos = []
+            for k, p in enumerate(tc.iter(qn("w:p"))):
+                if k:
+                    trechos.append(Trecho("\n"))
+                trechos.extend(_trechos(p))
+            celulas.append(tuple(trechos))
+        linhas.append(tuple(celulas))
+    return BlocoTabela(tuple(linhas), larguras or None)
+
+
+@dataclass(frozen=True)
+class LayoutTemplate:
+    """Estrutura do template (página, margens e blocos do corpo) usada para desenhar o PDF."""
+    blocos: tuple
+    tamanho_pagina: tuple    # (largura, altura) em pt
+    margens: tuple           # (esquerda, direita, topo, base) em pt
+
+    @classmethod
+    def de_documento(cls, doc) -> "LayoutTemplate":
+        """Lê o layout de um template (de preferência já consolidado por `TemplateCompilado`)."""
+        blocos = []
+        for elemento in doc.element.body.iterchildren():
+            if elemento.tag == qn("w:p"):
+                blocos.append(_paragrafo(elemento, doc.part))
+            elif elemento.tag == qn("w:tbl"):
+                blocos.append(_tabela(elemento))
+        secao = doc.sections[0]
+        return cls(
+            blocos=tuple(blocos),
+            tamanho_pagina=(secao.page_width.pt, secao.page_height.pt),
+            margens=(secao.left_margin.pt, secao.right_margin.pt, secao.top_margin.pt, secao.bottom_margin.pt),
+        )
+
+    @property
+    def largura_util(self) -> float:
+        return self.tamanho_pagina[0] - self.margens[0] - self.margens[1]
+
+    @property
+    def altura_util(self) -> float:
+        return self.tamanho_pagina[1] - self.margens[2] - self.margens[3]
+
+
+# --- Desenho ---
+
+def _estilo(tamanho, alinhamento=TA_LEFT) -> ParagraphStyle:
+    return ParagraphStyle(f"{FONTE}-{tamanho}-{alinhamento}", fontName=FONTE, fontSize=tamanho,
+                          leading=tamanho * 1.2, alignment=alinhamento)
+
+def _markup(trechos, dados, anexos) -> str:
+    """
+    Markup do ReportLab para os trechos, com os placeholders preenchidos. Tabelas e
+    imagens são acrescentadas a `anexos` (desenhadas após o parágrafo); placeholders
+    sem dado ficam como estão, como no caminho DOCX.
+    """
+    def substituir(m):
+        campo = m.group(1)
+        if campo not in dados:
+            return m.group(0)
+        valor = dados[campo]
+        if is_table(valor) or is_image(valor):
+            anexos.append(valor)
+            return ""
+        return "" if valor is None else str(valor)
+
+    partes = []
+    for t in trechos:
+        texto = escape(PADRAO_CAMPO.sub(substituir, t.texto)).replace("\t", TABULACAO).replace("\n", "<br/>")
+        if texto and t.negrito:
+            texto = f"<b>{texto}</b>"
+        if texto and t.italico:
+            texto = f"<i>{texto}</i>"
+        partes.append(texto)
+    return "".join(partes)
+
+class _Imagem(Flowable):
+    """Imagem centralizada desenhada de um `ImageReader`, que pode ser compartilhado."""
+
+    def __init__(self, leitor: ImageReader, largura: float, altura: float):
+        super().__init__()
+        self.leitor, self.width, self.height = leitor, largura, altura
+        self.hAlign = "CENTER"
+
+    def wrap(self, largura_disponivel, altura_disponivel):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.leitor, 0, 0, self.width, self.height, mask="auto")
+
+def _leitor(valor) -> ImageReader:
+    if isinstance(valor, (bytes, bytearray)):
+        return ImageReader(BytesIO(valor))
+    if isinstance(valor, BytesIO):
+        valor.seek(0)
+        return ImageReader(BytesIO(valor.read()))
+    return ImageReader(str(valor))
+
+def _imagem(leitor: ImageReader, largura, altura_max) -> _Imagem:
+    """Imagem com a largura dada (proporção mantida), limitada a `altura_max`."""
+    largura_px, altura_px = leitor.getSize()
+    altura = largura * altura_px / largura_px
+    if altura > altura_max:
+        largura, altura = largura * altura_max / altura, altura_max
+    return _Imagem(leitor, largura, altura)
+
+def _celula(valor, estilo):
+    texto = "" if valor is None else str(valor)
+    if len(texto) > MAX_CELULA_SEM_QUEBRA:
+        return Paragraph(escape(texto), estilo)
+    return texto
+
+def _tabela_dados(registros, largura_util) -> Table:
+    """Tabela de dados com grade e cabeçalho em negrito, repetido em cada página."""
+    colunas = list(registros[0].keys())
+    estilo = _estilo(TAMANHO_TABELA)
+    linhas = [[Paragraph(f"<b>{escape(str(c))}</b>", estilo) for c in colunas]]
+    linhas.extend([_celula(r.get(c), estilo) for c in colunas] for r in registros)
+
+    # Largura das colunas proporcional ao conteúdo (limitada, para o texto longo quebrar)
+    pesos = [min(max([len(max(str(c).split() or [""], key=len))] + [len(str(r.get(c, ""))) for r in registros]), 40) + 2
+             for c in colunas]
+    larguras = [largura_util * p / sum(pesos) for p in pesos]
+    tabela = Table(linhas, colWidths=larguras, repeatRows=1)
+    tabela.setStyle(TableStyle(ESTILO_GRADE))
+    return tabela
+
+def _anexo(valor, layout: LayoutTemplate, leitores: dict):
+    if is_table(valor):
+        registros = normalize_table(valor)
+        return _tabela_dados(registros, layout.largura_util) if registros else None
+    # O mesmo gráfico usado em vários placeholders é decodificado e embutido uma única vez
+    if id(valor) not in leitores:
+        leitores[id(valor)] = _leitor(valor)
+    return _imagem(leitores[id(valor)], min(LARGURA_IMAGEM, layout.largura_util), layout.altura_util * 0.9)
+
+def _blocos(layout: LayoutTemplate, dados: dict) -> list:
+    estilo_texto = {a: _estilo(TAMANHO_TEXTO, a) for a in (TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY)}
+    estilo_celula = _estilo(TAMANHO_TEXTO - 1)
+    linha_vazia = TAMANHO_TEXTO * 1.2
+    leitores = {}   # id do valor -> ImageReader
+
+    elementos = []
+    for bloco in layout.blocos:
+        anexos = []
+        if isinstance(bloco, BlocoTabela):
+            linhas = [[Paragraph(_markup(celula, dados, anexos), estilo_celula) for celula in linha]
+                      for linha in bloco.linhas]
+            larguras = bloco.larguras
+            if larguras and sum(larguras) > layout.largura_util:
+                larguras = [w * layout.largura_util / sum(larguras) for w in larguras]
+            tabela = Table(linhas, colWidths=larguras)
+            tabela.setStyle(TableStyle(ESTILO_GRADE))
+            elementos.append(tabela)
+        else:
+            markup = _markup(bloco.trechos, dados, anexos)
+            if bloco.imagens:
+                # Imagens do mesmo parágrafo (ex.: logotipos do cabeçalho) ficam lado a lado
+                imagens = [_Imagem(_leitor(imagem), largura, altura) for imagem, largura, altura in bloco.imagens]
+                elementos.append(imagens[0] if len(imagens) == 1 else Table([imagens]))
+            if markup.strip():
+                elementos.append(Paragraph(markup, estilo_texto[bloco.alinhamento]))
+            elif not bloco.imagens and not anexos:
+                elementos.append(Spacer(1, linha_vazia))
+        for valor in anexos:
+            anexo = _anexo(valor, layout, leitores)
+            if anexo is not None:
+                elementos.append(anexo)
+    return elementos
+
+def renderizar_pdf(layout: LayoutTemplate, dados: dict, titulo: str = "Ata de Medição") -> bytes:
+    """Desenha o template preenchido com `dados` e retorna os bytes do PDF."""
+    buffer = BytesIO()
+    esquerda, direita, topo, base = layout.margens
+    documento = SimpleDocTemplate(
+        buffer, pagesize=layout.tamanho_pagina, title=titulo,
+        leftMargin=esquerda, rightMargin=direita, topMargin=topo, bottomMargin=base,
+    )
+    documento.build(_blocos(layout, dados))
+    return buffer.getvalue()
@@ -0,0 +1,78 @@
+"""
+Ponte UNO de um trabalhador de conversão.
+
+Este script é executado pelo Python do LibreOffice (que possui o módulo `uno`),
+não pelo Python da aplicação. Ele se conecta a uma instância `soffice` já em
+execução e atende pedidos de conversão recebidos pela entrada padrão, uma linha
+JSON por pedido: {"entrada": "...docx", "saida": "...pdf"}. Cada resposta é
+escrita como uma linha JSON na saída padrão.
+"""
+import json
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+
+def propriedade(nome, valor):
+    p = PropertyValue()
+    p.Name = nome
+    p.Value = valor
+    return p
+
+def responder(dados):
+    sys.stdout.write(json.dumps(dados) + "\n")
+    sys.stdout.flush()
+
+def conectar(nome_pipe, espera_max):
+    """Aguarda o soffice aceitar conexões e retorna o serviço Desktop."""
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    url = f"uno:pipe,name={nome_pipe};urp;StarOffice.ComponentContext"
+
+    limite = time.monotonic() + espera_max
+    while True:
+        try:
+            ctx = resolver.resolve(url)
+            return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        except NoConnectException:
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.2)
+
+def converter(desktop, entrada, saida):
+    doc = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(entrada), "_blank", 0,
+        (propriedade("Hidden", True), propriedade("ReadOnly", True))
+    )
+    try:
+        doc.storeToURL(uno.systemPathToFileUrl(saida), (propriedade("FilterName", "writer_pdf_Export"),))
+    finally:
+        doc.close(True)
+
+def main():
+    nome_pipe = sys.argv[1]
+    espera_max = float(sys.argv[2]) if len(sys.argv) > 2 else 30.0
+
+    try:
+        desktop = conectar(nome_pipe, espera_max)
+    except Exception as e:
+        responder({"pronto": False, "erro": str(e)})
+        return 1
+    responder({"pronto": True})
+
+    for linha in sys.stdin:
+        if not linha.strip():
+            continue
+        try:
+            pedido = json.loads(linha)
+            converter(desktop, pedido["entrada"], pedido["saida"])
+            responder({"ok": True, "saida": pedido["saida"]})
+        except Exception as e:
+            responder({"ok": False, "erro": str(e)})
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
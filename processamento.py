@@ -1,279 +1,282 @@
+import logging
+from dataclasses import dataclass
+import numpy as np
 import pandas as pd
-from firebase_admin import firestore
-import streamlit as st
+from projeto import ProjetoSnapshot
+from metricas import medir
 
-# A função de gerar a Tabela 1 permanece a mesma, como referência.
-def gerar_tabela_percentual(db: firestore.client, project_id: str) -> pd.DataFrame:
-    """
-    Busca os dados de um projeto no Firestore, calcula o percentual de cada etapa
-    em relação ao valor total do projeto e retorna um DataFrame formatado.
-    """
-    try:
-        # 1. Buscar no documento do projeto no Firestore 
-        doc_ref = db.collection("projetos").document(project_id)
-        doc = doc_ref.get()
+# Motor numérico das tabelas do relatório.
+#
+# O planejamento e a medição (`projeto.tabelas`, já numéricos) são montados uma
+# única vez em duas matrizes alinhadas (itens x meses), com a linha de totais.
+# As cinco tabelas saem dessas matrizes com operações vetorizadas do NumPy
+# (fatias, somas e divisões por coluna), sem laços por mês, e os percentuais só
+# são formatados como texto no final.
+#
+# Este módulo roda fora do Streamlit (threads da fila, processos do lote, pools de
+# `geradores`): os problemas são registrados no log e lançados como exceções, e quem
+# chamou decide como mostrá-los (`Trabalho.erro`, `ao_progredir`, `st.error` na página).
 
-        if not doc.exists:
-            st.error(f"Erro: Projeto com ID '{project_id}' não foi encontrado.")
-            return None
+LINHA_TOTAL_PLANEJAMENTO = 'TOTAL'
 
-        project_data = doc.to_dict()
+logger = logging.getLogger(__name__)
 
-        # 2. Extrai dados 
-        tabela_dados = project_data.get("table", [])
 
-        if not tabela_dados:
-            return pd.DataFrame(columns=['Item', 'Total por etapa', 'Percentual da etapa no total'])
+class DadosInsuficientes(ValueError):
+    """O projeto não tem o planejamento ou a medição de que a tabela precisa."""
 
-        df = pd.DataFrame(tabela_dados)
-        df['Total por etapa'] = pd.to_numeric(df['Total por etapa'], errors='coerce').fillna(0)
-        valor_total_projeto = df['Total por etapa'].sum()
 
-        if valor_total_projeto > 0:
-            df['Percentual da etapa no total'] = (df['Total por etapa'] / valor_total_projeto) * 100
-            df['Percentual da etapa no total'] = df['Percentual da etapa no total'].apply(lambda x: f"{x:.2f}%")
-        else:
-            df['Percentual da etapa no total'] = "0.00%"
+@dataclass(frozen=True)
+class MatrizesProjeto:
+    """
+    Planejamento e medição de um projeto como matrizes numéricas alinhadas.
 
-        tabela_1 = df[['Item', 'Total por etapa', 'Percentual da etapa no total']].copy()
-        return tabela_1
+    As linhas seguem a ordem dos itens do planejamento, com a linha 'TOTAL' (somas
+    das colunas) ao final. A coluna j das matrizes corresponde ao 'Mês j+1'.
+    """
+    itens: np.ndarray               # nomes dos itens do planejamento
+    eh_total: np.ndarray            # máscara da linha 'TOTAL' do planejamento
+    total_etapa: np.ndarray         # 'Total por etapa' do planejamento
+    previsto: np.ndarray            # itens x meses (planejamento)
+    realizado: np.ndarray           # itens x meses (medição alinhada ao planejamento)
+    realizado_total: np.ndarray     # total medido por item
+    total_mes_medicao: np.ndarray   # total medido por mês
+    medicao_atual: int
+
+
+def montar_matrizes(projeto: ProjetoSnapshot) -> MatrizesProjeto:
+    """Monta as matrizes do projeto a partir das tabelas já lidas, com a linha 'TOTAL' ao final."""
+    t = projeto.tabelas
+    n = len(t.itens)
+    # Garante colunas até o mês de medição atual
+    faltantes = max(int(projeto.medicao_atual or 0) - t.n_meses, 0)
+    previsto = np.pad(t.previsto, ((0, 0), (0, faltantes)))
+    realizado = np.pad(t.realizado, ((0, 0), (0, faltantes)))
+
+    total_realizado = realizado.sum(axis=0)
+    realizado = np.vstack([realizado, total_realizado])
+
+    return MatrizesProjeto(
+        itens=np.array(list(t.itens) + [LINHA_TOTAL_PLANEJAMENTO], dtype=object),
+        eh_total=np.arange(n + 1) == n,
+        total_etapa=np.append(t.total_etapa, t.total_etapa.sum()),
+        previsto=np.vstack([previsto, previsto.sum(axis=0)]),
+        realizado=realizado,
+        realizado_total=realizado.sum(axis=1),
+        total_mes_medicao=total_realizado,
+        medicao_atual=projeto.medicao_atual,
+    )
+
+def _percentual(valores):
+    """Formata percentuais como texto ('12.34%') de uma só vez."""
+    return np.char.mod('%.2f%%', np.asarray(valores, dtype=float)).astype(object)
+
+def _dividir(numerador, denominador) -> np.ndarray:
+    """Divide elemento a elemento, com 0 onde o denominador é 0."""
+    seguro = np.where(denominador != 0, denominador, 1)
+    return np.where(denominador != 0, numerador / seguro, 0.0)
+
+def _mes_atual(m: MatrizesProjeto) -> int:
+    """
+    Mês da medição atual (1 = 'Mês 1'), limitado às colunas das matrizes. 0 quando
+    ainda não há mês medido ('medicao_atual' ausente ou 0): as tabelas mostram zeros
+    em vez de um índice negativo cair no último mês do planejamento.
+    """
+    return min(max(int(m.medicao_atual or 0), 0), m.previsto.shape[1])
+
+# --- Tabelas calculadas a partir das matrizes ---
+
+def _tabela_percentual(m: MatrizesProjeto) -> pd.DataFrame:
+    valor_total_projeto = m.total_etapa.sum()
+    if valor_total_projeto > 0:
+        percentual = _percentual(m.total_etapa / valor_total_projeto * 100)
+    else:
+        percentual = "0.00%"
+    return pd.DataFrame({
+        'Item': m.itens,
+        'Total por etapa': m.total_etapa,
+        'Percentual da etapa no total': percentual,
+    })
+
+def _tabela_previsto_realizado(m: MatrizesProjeto) -> pd.DataFrame:
+    j = _mes_atual(m) - 1
+    if j < 0:
+        # Nenhum mês medido ainda: nada previsto nem realizado "no mês atual"
+        valor_previsto = valor_realizado = np.zeros(len(m.itens))
+    else:
+        valor_previsto = m.previsto[:, j]
+        valor_realizado = m.realizado[:, j]
+    # A linha 'TOTAL' traz a soma medida no mês. Até o esquema colunar ela saía sempre com
+    # 0: a linha de total da medição legada se chama 'Total por Mês' e não casava com 'TOTAL'.
+    percentual_previsto = _dividir(valor_previsto, m.total_etapa) * 100
+    percentual_realizado = _dividir(valor_realizado, m.total_etapa) * 100
+    return pd.DataFrame({
+        'Item': m.itens,
+        'Total por etapa': m.total_etapa,
+        'Valor Previsto': valor_previsto,
+        'Percentual Previsto': _percentual(percentual_previsto),
+        'Valor Realizado': valor_realizado,
+        'Percentual Realizado': _percentual(percentual_realizado),
+        'Desvio Percentual': _percentual(percentual_realizado - percentual_previsto),
+    })
+
+def _tabela_previsto_realizado_mes(m: MatrizesProjeto) -> pd.DataFrame:
+    n = _mes_atual(m)
+    valor_total_projeto = m.total_etapa[m.eh_total].sum()
+    total_previsto = m.previsto[np.flatnonzero(m.eh_total)[0], :n]
+    total_realizado = m.total_mes_medicao[:n]
+
+    # Percentuais em relação ao valor total do projeto (sem proteção contra zero, como antes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentual_previsto = total_previsto / valor_total_projeto * 100
+        percentual_realizado = total_realizado / valor_total_projeto * 100
+
+    return pd.DataFrame({
+        'Mês': np.arange(1, n + 1),
+        'Total Previsto': total_previsto,
+        'Percentual Previsto': _percentual(percentual_previsto),
+        'Total Realizado': total_realizado,
+        'Percentual Realizado': _percentual(percentual_realizado),
+        'Total Desvio': total_realizado - total_previsto,
+        'Percentual Desvio': _percentual(percentual_realizado - percentual_previsto),
+    })
+
+def _tabela_contratual(m: MatrizesProjeto) -> pd.DataFrame:
+    itens = ~m.eh_total
+    total_etapa = m.total_etapa[itens]
+    valor_realizado = m.realizado_total[itens]
+    saldo = total_etapa - valor_realizado
+    total_geral_contrato = total_etapa.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentual_realizado = valor_realizado / total_geral_contrato * 100
+        percentual_saldo = saldo / total_geral_contrato * 100
+    return pd.DataFrame({
+        'Item': m.itens[itens],
+        'Total por etapa': total_etapa,
+        'Valor Realizado': valor_realizado,
+        'Percentual Realizado': _percentual(percentual_realizado),
+        'Saldo Contratual': saldo,
+        'Percentual Saldo': _percentual(percentual_saldo),
+    })
+
+def _tabela_previsto_realizado_acumulado(m: MatrizesProjeto) -> pd.DataFrame:
+    n = _mes_atual(m)
+    itens = ~m.eh_total
+    total_etapa = m.total_etapa[itens]
+    previsto_acumulado = m.previsto[itens, :n].sum(axis=1)
+    realizado_acumulado = m.realizado[itens, :n].sum(axis=1)
+    percentual_previsto = _dividir(previsto_acumulado, total_etapa) * 100
+    percentual_realizado = _dividir(realizado_acumulado, total_etapa) * 100
+    return pd.DataFrame({
+        'Item': m.itens[itens],
+        'Total por etapa': total_etapa,
+        'Valor Previsto Acumulado': previsto_acumulado,
+        'Percentual Previsto Acumulado': _percentual(percentual_previsto),
+        'Valor Realizado Acumulado': realizado_acumulado,
+        'Percentual Realizado Acumulado': _percentual(percentual_realizado),
+        'Desvio Percentual': _percentual(percentual_realizado - percentual_previsto),
+    })
+
+# nome -> (cálculo, descrição usada na mensagem de erro)
+TABELAS = {
+    'tabela_1': (_tabela_percentual, "a tabela para o projeto {id}"),
+    'tabela_2': (_tabela_previsto_realizado, "a tabela cumulativa"),
+    'tabela_3': (_tabela_previsto_realizado_mes, "a tabela mês a mês"),
+    'tabela_4': (_tabela_contratual, "a tabela contratual"),
+    'tabela_5': (_tabela_previsto_realizado_acumulado, "a tabela acumulada"),
+}
+
+def _gerar(projeto: ProjetoSnapshot, nome: str, matrizes: MatrizesProjeto = None) -> pd.DataFrame:
+    calculo, descricao = TABELAS[nome]
+    if nome == 'tabela_1':
+        if not projeto.tabelas.itens:
+            return pd.DataFrame(columns=['Item', 'Total por etapa', 'Percentual da etapa no total'])
+    elif not projeto.tabelas.itens or not projeto.tabelas.tem_medicao:
+        logger.warning(f"Projeto {projeto.id} sem planejamento ou medição: {nome} não pode ser gerada")
+        raise DadosInsuficientes("Tabela de planejamento ou medição não encontrada ou vazia no documento do projeto.")
 
+    try:
+        if matrizes is None:
+            matrizes = montar_matrizes(projeto)
+        return calculo(matrizes)
     except Exception as e:
-        st.error(f"Ocorreu um erro inesperado ao gerar a tabela para o projeto {project_id}: {e}")
-        return None
+        logger.exception(f"Erro ao gerar {nome} do projeto {projeto.id}")
+        raise RuntimeError(f"Ocorreu um erro inesperado ao gerar {descricao.format(id=projeto.id)}: {e}") from e
 
-def gerar_tabela_previsto_realizado(db: firestore.client, project_id: str) -> pd.DataFrame:
+def calcular_tabela(projeto: ProjetoSnapshot, nome: str, matrizes: MatrizesProjeto = None) -> pd.DataFrame:
     """
-    Gera uma tabela comparativa acumulada entre o planejamento e a medição.
+    Calcula uma das tabelas de `TABELAS`, reaproveitando as matrizes se informadas.
 
-    A função identifica o último mês com dados na tabela de medição e calcula
-    os totais previstos e realizados acumulados até esse mês específico.
+    Raises:
+        DadosInsuficientes: O projeto não tem planejamento ou medição.
+        RuntimeError: Erro no cálculo (já registrado no log).
+    """
+    return _gerar(projeto, nome, matrizes)
 
-    Args:
-        db (firestore.client): O cliente do Firestore já inicializado.
-        project_id (str): O ID do documento do projeto a ser processado.
+def calcular_tabelas(projeto: ProjetoSnapshot) -> dict:
+    """
+    Calcula as cinco tabelas do relatório a partir de uma única conversão do projeto em matrizes.
 
     Returns:
-        pd.DataFrame: DataFrame consolidado com a análise acumulada, ou None em caso de erro.
+        dict: {'tabela_1': DataFrame, ..., 'tabela_5': DataFrame}; uma tabela é None se
+        não pôde ser gerada (o motivo vai para o log).
     """
     try:
-        # 1. Buscar o documento do projeto no Firestore
-        doc_ref = db.collection("projetos").document(project_id)
-        doc = doc_ref.get()
-
-        if not doc.exists:
-            st.error(f"Erro: Projeto com ID '{project_id}' não foi encontrado.")
-            return None
-        
-        project_data = doc.to_dict()
-        
-        # 2. Extrair dados de PLANEJAMENTO e MEDIÇÃO do mesmo documento
-        planejamento_data = project_data.get("table", [])
-        medicao_data = project_data.get("tabela_medicao", [])
-        medicao_atual = project_data.get("medicao_atual")
-
-        if not planejamento_data or not medicao_data:
-            st.warning("Tabela de planejamento ou medição não encontrada ou vazia no documento do projeto.")
-            return pd.DataFrame()
-
-        df_planejamento = pd.DataFrame(planejamento_data)
-        df_medicao = pd.DataFrame(medicao_data)
-
-        # 3. Logica de analise cumulativa
-
-        col_mes_cumulativo_planejemnto = 0
-        col_mes_cumulativo_medicao = 0
-
-        for i in range(1, medicao_atual):
-            col_mes_cumulativo_planejemnto = col_mes_cumulativo_planejemnto + df_planejamento[f'Mês {i}']
-            col_mes_cumulativo_medicao     = col_mes_cumulativo_medicao     + df_planejamento[f'Mês {i}']
-
-        df_planejamento_final = df_planejamento[['Item', 'Total por etapa', f'Mês {medicao_atual}']].copy()
-        df_planejamento_final.rename(columns={f'Mês {medicao_atual}': 'Valor Previsto'}, inplace=True)
-        df_medicao['Total por etapa'] = pd.to_numeric(df_medicao['Total por etapa'], errors='coerce').fillna(0)
-        df_medicao_final      = df_medicao     [['Item', f'Mês {medicao_atual}']].copy()
-        df_medicao_final.rename(columns={f'Mês {medicao_atual}': 'Valor Realizado'}, inplace=True)
-        
-        df_final = pd.merge(df_planejamento_final, df_medicao_final, on="Item", how="left")
-        df_final.fillna(0, inplace=True)
-
-        total_etapa = df_final['Total por etapa']
-        df_final['Percentual Previsto'] = (df_final['Valor Previsto'] / total_etapa).where(total_etapa != 0, 0) * 100
-        df_final['Percentual Realizado'] = (df_final['Valor Realizado'] / total_etapa).where(total_etapa != 0, 0) * 100
-        df_final['Desvio Percentual'] = df_final['Percentual Realizado'] - df_final['Percentual Previsto']
-
-        for col in ['Percentual Previsto', 'Percentual Realizado', 'Desvio Percentual']:
-            df_final[col] = df_final[col].apply(lambda x: f"{x:.2f}%")
-        
-        tabela_2 = df_final[[
-            'Item', 'Total por etapa', 
-            'Valor Previsto', 'Percentual Previsto', 
-            'Valor Realizado', 'Percentual Realizado', 
-            'Desvio Percentual'
-        ]].copy()
-
-        return tabela_2
-    
+        with medir("matrizes", projeto=projeto.id):
+            matrizes = montar_matrizes(projeto)
+    except Exception:
+        logger.exception(f"Erro ao processar as tabelas do projeto {projeto.id}")
+        return {nome: None for nome in TABELAS}
+    tabelas = {}
+    for nome in TABELAS:
+        with medir(nome, projeto=projeto.id) as etapa:
+            try:
+                tabelas[nome] = _gerar(projeto, nome, matrizes)
+            except (DadosInsuficientes, RuntimeError) as e:
+                tabelas[nome] = None
+                etapa.falhar(str(e))
+    return tabelas
+
+# --- Funções por tabela (mesma interface de antes) ---
+
+def gerar_tabela_percentual(projeto: ProjetoSnapshot) -> pd.DataFrame:
+    """
+    Calcula, a partir do projeto já carregado, o percentual de cada etapa
+    em relação ao valor total do projeto e retorna um DataFrame formatado.
+    """
+    return _gerar(projeto, 'tabela_1')
 
-    except Exception as e:
-        st.error(f"Ocorreu um erro inesperado ao gerar a tabela cumulativa: {e}")
-        return None
-    
-def gerar_tabela_previsto_realizado_mes(db: firestore.client, project_id: str) -> pd.DataFrame:
+def gerar_tabela_previsto_realizado(projeto: ProjetoSnapshot) -> pd.DataFrame:
+    """
+    Gera uma tabela comparativa entre o planejamento e a medição no mês de medição atual.
+
+    Args:
+        projeto (ProjetoSnapshot): O projeto já carregado do Firestore.
+
+    Returns:
+        pd.DataFrame: DataFrame consolidado com a análise do mês.
+    """
+    return _gerar(projeto, 'tabela_2')
+
+def gerar_tabela_previsto_realizado_mes(projeto: ProjetoSnapshot) -> pd.DataFrame:
     """
     Gera uma tabela comparativa mês a mês entre o planejamento e a medição, usando a linha de totais.
 
     Args:
-        db (firestore.client): O cliente do Firestore já inicializado.
-        project_id (str): O ID do documento do projeto a ser processado.
+        projeto (ProjetoSnapshot): O projeto já carregado do Firestore.
 
     Returns:
-        pd.DataFrame: DataFrame consolidado com a análise mês a mês, ou None em caso de erro.
+        pd.DataFrame: DataFrame consolidado com a análise mês a mês.
     """
-    try:
-        # 1. Buscar o documento do projeto no Firestore
-        doc_ref = db.collection("projetos").document(project_id)
-        doc = doc_ref.get()
-
-        if not doc.exists:
-            st.error(f"Erro: Projeto com ID '{project_id}' não foi encontrado.")
-            return None
-        
-        project_data = doc.to_dict()
-        
-        # 2. Extrair dados de PLANEJAMENTO e MEDIÇÃO do mesmo documento
-        planejamento_data = project_data.get("table", [])
-        medicao_data = project_data.get("tabela_medicao", [])
-        medicao_atual = project_data.get("medicao_atual")
-
-        if not planejamento_data or not medicao_data:
-            st.warning("Tabela de planejamento ou medição não encontrada ou vazia no documento do projeto.")
-            return pd.DataFrame()
-
-        df_planejamento = pd.DataFrame(planejamento_data)
-        df_medicao = pd.DataFrame(medicao_data)
-
-        total_planejamento_row = df_planejamento[df_planejamento['Item'] == 'TOTAL']
-        total_medicao_row = df_medicao[df_medicao['Item'] == 'Total por Mês']
-
-
-        if total_planejamento_row.empty or total_medicao_row.empty:
-            st.warning("Linha de totais não encontrada nas tabelas de planejamento ou medição.")
-            return pd.DataFrame()
-        
-        # Calcular o valor total do projeto para os percentuais
-        valor_total_projeto = pd.to_numeric(total_planejamento_row['Total por etapa'], errors='coerce').sum()
-
-        # 4. Preparar a tabela final
-        tabela_final = []
-        
-        # 5. Iterar por cada mês e calcular os totais e percentuais
-        for i in range(1, medicao_atual+1):
-            mes_col = f"Mês {i}"
-
-            # Coletar os valores do mês, tratando valores não numéricos
-            total_previsto = pd.to_numeric(total_planejamento_row[mes_col], errors='coerce').fillna(0).iloc[0]
-            total_realizado = pd.to_numeric(total_medicao_row[mes_col], errors='coerce').fillna(0).iloc[0]
-
-            # Calcular os percentuais em relação ao valor total do projeto
-            percentual_previsto = (total_previsto / valor_total_projeto) * 100 
-            percentual_realizado = (total_realizado / valor_total_projeto) * 100
-
-            # Calcular o desvio
-            total_desvio = total_realizado - total_previsto
-            percentual_desvio = percentual_realizado - percentual_previsto
-
-            # Adicionar os dados do mês à lista
-            tabela_final.append({
-                'Mês': i,
-                'Total Previsto': total_previsto,
-                'Percentual Previsto': f"{percentual_previsto:.2f}%",
-                'Total Realizado': total_realizado,
-                'Percentual Realizado': f"{percentual_realizado:.2f}%",
-                'Total Desvio': total_desvio,
-                'Percentual Desvio': f"{percentual_desvio:.2f}%"
-            })
-        
-        # 6. Criar o DataFrame final
-        tabela_3 = pd.DataFrame(tabela_final)
-
-        return tabela_3
-    
-    except Exception as e:
-        st.error(f"Ocorreu um erro inesperado ao gerar a tabela mês a mês: {e}")
-        return None
-    
-def gerar_tabela_contratual(db: firestore.client, project_id: str) -> pd.DataFrame:
+    return _gerar(projeto, 'tabela_3')
+
+def gerar_tabela_contratual(projeto: ProjetoSnapshot) -> pd.DataFrame:
     """
     Gera uma tabela com valores de contrato, realizado, saldo contratual e respectivos percentuais.
     """
-    try:
-        # 1. Buscar o documento do projeto no Firestore
-        doc_ref = db.collection("projetos").document(project_id)
-        doc = doc_ref.get()
-
-        if not doc.exists:
-            st.error(f"Erro: Projeto com ID '{project_id}' não foi encontrado.")
-            return None
-
-        project_data = doc.to_dict()
-
-        # 2. Extrair dados das tabelas de planejamento e medição
-        planejamento_data = project_data.get("table", [])
-        medicao_data = project_data.get("tabela_medicao", [])
-
-        if not planejamento_data or not medicao_data:
-            st.warning("Tabela de planejamento ou medição não encontrada ou vazia no documento do projeto.")
-            return pd.DataFrame()
-        
-        # 3. Criar DataFrames e remover as linhas de totais para trabalhar apenas com os itens
-        df_planejamento = pd.DataFrame(planejamento_data)
-        df_medicao = pd.DataFrame(medicao_data)
-        
-        df_planejamento = df_planejamento[df_planejamento['Item'] != 'TOTAL']
-        df_medicao = df_medicao[df_medicao['Item'] != 'Total por Mês']
-
-        # 4. Mesclar os DataFrames com base no 'Item'
-        df_planejamento['Total por etapa'] = pd.to_numeric(df_planejamento['Total por etapa'], errors='coerce').fillna(0)
-        df_medicao['Total'] = pd.to_numeric(df_medicao['Total'], errors='coerce').fillna(0)
-        
-        df_merged = pd.merge(df_planejamento[['Item', 'Total por etapa']],
-                             df_medicao[['Item', 'Total']],
-                             on='Item',
-                             how='left')
-        df_merged.rename(columns={'Total': 'Valor Realizado'}, inplace=True)
-        df_merged.fillna(0, inplace=True)
-
-        # 5. Fazer os cálculos solicitados
-        df_merged['Saldo Contratual'] = df_merged['Total por etapa'] - df_merged['Valor Realizado']
-        
-        total_geral_contrato = df_merged['Total por etapa'].sum()
-        total_geral_realizado = df_merged['Valor Realizado'].sum()
-        
-        df_merged['Percentual Realizado'] = (df_merged['Valor Realizado'] / total_geral_contrato) * 100
-        df_merged['Percentual Saldo'] = (df_merged['Saldo Contratual'] / total_geral_contrato) * 100
-
-        # 6. Formatar as colunas de percentual
-        for col in ['Percentual Realizado', 'Percentual Saldo']:
-            df_merged[col] = df_merged[col].apply(lambda x: f"{x:.2f}%")
-
-        # 7. Organizar as colunas para o resultado final
-        tabela_4 = df_merged[[
-            'Item',
-            'Total por etapa',
-            'Valor Realizado',
-            'Percentual Realizado',
-            'Saldo Contratual',
-            'Percentual Saldo'
-        ]].copy()
-        
-        return tabela_4
-    
-    except Exception as e:
-        st.error(f"Ocorreu um erro inesperado ao gerar a tabela contratual: {e}")
-        return None
-    
-def gerar_tabela_previsto_realizado_acumulado(db: firestore.client, project_id: str) -> pd.DataFrame:
+    return _gerar(projeto, 'tabela_4')
+
+def gerar_tabela_previsto_realizado_acumulado(projeto: ProjetoSnapshot) -> pd.DataFrame:
     """
     Gera uma tabela comparativa acumulada entre o planejamento e a medição.
 
@@ -281,84 +284,9 @@ def gerar_tabela_previsto_realizado_acumulado(db: firestore.client, project_id:
     para obter os totais acumulados.
 
     Args:
-        db (firestore.client): O cliente do Firestore já inicializado.
-        project_id (str): O ID do documento do projeto a ser processado.
+        projeto (ProjetoSnapshot): O projeto já carregado do Firestore.
 
     Returns:
-        pd.DataFrame: DataFrame consolidado com a análise acumulada, ou None em caso de erro.
+        pd.DataFrame: DataFrame consolidado com a análise acumulada.
     """
-    try:
-        # 1. Buscar o documento do projeto no Firestore
-        doc_ref = db.collection("projetos").document(project_id)
-        doc = doc_ref.get()
-
-        if not doc.exists:
-            st.error(f"Erro: Projeto com ID '{project_id}' não foi encontrado.")
-            return None
-        
-        project_data = doc.to_dict()
-        
-        # 2. Extrair dados de PLANEJAMENTO e MEDIÇÃO do mesmo documento
-        planejamento_data = project_data.get("table", [])
-        medicao_data = project_data.get("tabela_medicao", [])
-        medicao_atual = project_data.get("medicao_atual", 1)
-
-        if not planejamento_data or not medicao_data:
-            st.warning("Tabela de planejamento ou medição não encontrada ou vazia no documento do projeto.")
-            return pd.DataFrame()
-
-        df_planejamento = pd.DataFrame(planejamento_data)
-        df_medicao = pd.DataFrame(medicao_data)
-        
-        # Remove a linha de 'TOTAL' se existir
-        df_planejamento = df_planejamento[df_planejamento['Item'] != 'TOTAL']
-        df_medicao = df_medicao[df_medicao['Item'] != 'Total por Mês']
-        
-        # Garante que as colunas de meses são numéricas
-        colunas_meses = [f'Mês {i}' for i in range(1, medicao_atual + 1)]
-        
-        for col in colunas_meses:
-            if col not in df_planejamento.columns:
-                df_planejamento[col] = 0
-            if col not in df_medicao.columns:
-                df_medicao[col] = 0
-            
-            df_planejamento[col] = pd.to_numeric(df_planejamento[col], errors='coerce').fillna(0)
-            df_medicao[col] = pd.to_numeric(df_medicao[col], errors='coerce').fillna(0)
-
-        # 3. Calcular os totais acumulados
-        df_planejamento['Valor Previsto Acumulado'] = df_planejamento[colunas_meses].sum(axis=1)
-        df_medicao['Valor Realizado Acumulado'] = df_medicao[colunas_meses].sum(axis=1)
-
-        # 4. Mesclar os DataFrames e realizar os cálculos finais
-        df_final = pd.merge(df_planejamento[['Item', 'Total por etapa', 'Valor Previsto Acumulado']],
-                             df_medicao[['Item', 'Valor Realizado Acumulado']],
-                             on='Item',
-                             how='left')
-        df_final.fillna(0, inplace=True)
-        df_final['Total por etapa'] = pd.to_numeric(df_final['Total por etapa'], errors='coerce').fillna(0)
-        
-        total_etapa = df_final['Total por etapa']
-        df_final['Percentual Previsto Acumulado'] = (df_final['Valor Previsto Acumulado'] / total_etapa).where(total_etapa != 0, 0) * 100
-        df_final['Percentual Realizado Acumulado'] = (df_final['Valor Realizado Acumulado'] / total_etapa).where(total_etapa != 0, 0) * 100
-        df_final['Desvio Percentual'] = df_final['Percentual Realizado Acumulado'] - df_final['Percentual Previsto Acumulado']
-
-        # 5. Formatar as colunas de percentual
-        for col in ['Percentual Previsto Acumulado', 'Percentual Realizado Acumulado', 'Desvio Percentual']:
-            df_final[col] = df_final[col].apply(lambda x: f"{x:.2f}%")
-        
-        # 6. Organizar as colunas para o resultado final
-        tabela_5 = df_final[[
-            'Item', 'Total por etapa', 
-            'Valor Previsto Acumulado', 'Percentual Previsto Acumulado', 
-            'Valor Realizado Acumulado', 'Percentual Realizado Acumulado', 
-            'Desvio Percentual'
-        ]].copy()
-
-        st.table(tabela_5)
-        return tabela_5
-    
-    except Exception as e:
-        st.error(f"Ocorreu um erro inesperado ao gerar a tabela acumulada: {e}")
-        return None
-
+    return _gerar(projeto, 'tabela_5')
@@ -0,0 +1,445 @@
+from dataclasses import dataclass, field
+from functools import cached_property
+import numpy as np
+import pandas as pd
+from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+from metricas import medir
+
+# Campos de cabeçalho do projeto (exibidos na busca e usados no template)
+CAMPOS_CABECALHO = (
+    "n_contrato", "periodo_vigencia", "n_os", "objeto",
+    "valor_bens_receb", "contratante", "contratada", "prazo_meses"
+)
+
+# Versão do formato em que as tabelas de planejamento e medição são gravadas.
+#
+#   1 (legado): "table" e "tabela_medicao" como listas de linhas {"Item", "Mês 1", ..., "Mês N", ...},
+#      com linhas de total, zeros para os meses futuros e percentuais como texto.
+#   2: colunas numéricas, sem valores derivados formatados:
+#      "planejamento": {"itens": [...], "total_etapa": [...], "meses": {"1": [valor por item], ...}}
+#      "medicao":      {"meses": {"3": [valor por item], ...},   # só os meses medidos
+#                       "total_mes": {"3": total do mês, ...}}
+#      As linhas de total, o total por item e os percentuais são calculados na leitura.
+VERSAO_ESQUEMA = 2
+CAMPOS_LEGADOS = ("table", "tabela_medicao")
+LINHAS_TOTAL = ("TOTAL", "Total por Mês")
+
+
+def _numerico(valores) -> np.ndarray:
+    """Converte valores do Firestore para float em uma única chamada, com 0 no lugar de inválidos."""
+    try:
+        # Caminho rápido: só números (None vira NaN)
+        arr = np.array(valores, dtype=float)
+    except (TypeError, ValueError):
+        objetos = np.asarray(valores, dtype=object)
+        arr = np.asarray(pd.to_numeric(objetos.ravel(), errors='coerce'), dtype=float).reshape(objetos.shape)
+    return np.nan_to_num(arr, nan=0.0)
+
+def _n_meses_linhas(linhas) -> int:
+    """Maior N tal que alguma linha possui a coluna 'Mês N'."""
+    for n in range(max((len(linha) for linha in linhas), default=0), 0, -1):
+        chave = f'Mês {n}'
+        if any(chave in linha for linha in linhas):
+            return n
+    return 0
+
+def _matriz_linhas(linhas, n_meses) -> np.ndarray:
+    colunas = [f'Mês {i}' for i in range(1, n_meses + 1)]
+    return _numerico([list(map(linha.get, colunas)) for linha in linhas]).reshape(len(linhas), n_meses)
+
+def _coluna(valores, n_itens) -> np.ndarray:
+    """Vetor de um mês com exatamente `n_itens` posições (completa com 0 ou corta)."""
+    coluna = np.zeros(n_itens)
+    valores = _numerico(list(valores or []))[:n_itens]
+    coluna[:len(valores)] = valores
+    return coluna
+
+def _formatar_percentual(valor) -> str:
+    return f"{valor:.2f}%"
+
+
+@dataclass(frozen=True, eq=False)
+class TabelasProjeto:
+    """
+    Planejamento e medição de um projeto em forma numérica (itens x meses).
+
+    É a representação usada em memória, independente da versão gravada no Firestore:
+    `de_documento` lê tanto o formato legado quanto o v2, e `para_documento` sempre
+    grava o v2. A coluna j das matrizes corresponde ao 'Mês j+1'.
+    """
+    itens: tuple = ()
+    total_etapa: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    previsto: np.ndarray = field(default_factory=lambda: np.zeros((0, 0)))
+    realizado: np.ndarray = field(default_factory=lambda: np.zeros((0, 0)))
+    meses_medidos: tuple = ()     # meses com medição gravada (1 = 'Mês 1')
+    tem_medicao: bool = False
+
+    @property
+    def n_meses(self) -> int:
+        return self.previsto.shape[1]
+
+    @classmethod
+    def de_documento(cls, data: dict) -> "TabelasProjeto":
+        """Lê as tabelas de um documento de projeto, em qualquer versão do esquema."""
+        data = data or {}
+        if data.get("schema_version", 1) >= 2:
+            return cls._de_v2(data)
+        return cls._de_legado(data)
+
+    @classmethod
+    def _de_v2(cls, data):
+        planejamento = data.get("planejamento") or {}
+        medicao = data.get("medicao")
+        itens = tuple(planejamento.get("itens") or ())
+        n = len(itens)
+        meses_planejados = {int(k): v for k, v in (planejamento.get("meses") or {}).items()}
+        meses_medidos = {int(k): v for k, v in ((medicao or {}).get("meses") or {}).items()}
+        n_meses = max([int(data.get("prazo_meses") or 0), *meses_planejados, *meses_medidos, 0])
+
+        previsto = np.zeros((n, n_meses))
+        for mes, valores in meses_planejados.items():
+            previsto[:, mes - 1] = _coluna(valores, n)
+        realizado = np.zeros((n, n_meses))
+        for mes, valores in meses_medidos.items():
+            realizado[:, mes - 1] = _coluna(valores, n)
+
+        return cls(
+            itens=itens,
+            total_etapa=_coluna(planejamento.get("total_etapa"), n),
+            previsto=previsto,
+            realizado=realizado,
+            meses_medidos=tuple(sorted(meses_medidos)),
+            tem_medicao=medicao is not None,
+        )
+
+    @classmethod
+    def _de_legado(cls, data):
+        planejamento = [l for l in data.get("table") or [] if l.get("Item") not in LINHAS_TOTAL]
+        medicao_linhas = data.get("tabela_medicao") or []
+        medicao = [l for l in medicao_linhas if l.get("Item") not in LINHAS_TOTAL]
+        n_meses = max(_n_meses_linhas(planejamento), _n_meses_linhas(medicao), int(data.get("prazo_meses") or 0))
+
+        itens = tuple(linha.get("Item") for linha in planejamento)
+        previsto = _matriz_linhas(planejamento, n_meses)
+
+        # Alinha a medição às linhas do planejamento pelo nome do item
+        indice_medicao = {}
+        for k, linha in enumerate(medicao):
+            indice_medicao.setdefault(linha.get("Item"), k)
+        posicoes = np.array([indice_medicao.get(item, -1) for item in itens], dtype=int)
+        encontrado = posicoes >= 0
+        realizado = np.zeros_like(previsto)
+        realizado[encontrado] = _matriz_linhas(medicao, n_meses)[posicoes[encontrado]]
+
+        # No legado todos os meses eram gravados; considera medidos os meses até a medição
+        # atual e qualquer mês posterior que já tenha valores
+        ate = int(data.get("medicao_atual") or 0)
+        medidos = {int(j) + 1 for j in np.flatnonzero(realizado.any(axis=0))} | set(range(1, min(ate, n_meses) + 1))
+
+        return cls(
+            itens=itens,
+            total_etapa=_numerico([linha.get("Total por etapa", 0) for linha in planejamento]),
+            previsto=previsto,
+            realizado=realizado,
+            meses_medidos=tuple(sorted(medidos)) if medicao_linhas else (),
+            tem_medicao=bool(medicao_linhas),
+        )
+
+    def para_documento(self) -> dict:
+        """Campos do documento no esquema atual (v2)."""
+        documento = {
+            "schema_version": VERSAO_ESQUEMA,
+            "planejamento": {
+                "itens": list(self.itens),
+                "total_etapa": self.total_etapa.tolist(),
+                "meses": {str(j + 1): self.previsto[:, j].tolist() for j in range(self.n_meses)},
+            },
+        }
+        if self.tem_medicao:
+            documento["medicao"] = {
+                "meses": {str(m): self.realizado[:, m - 1].tolist() for m in self.meses_medidos},
+                "total_mes": {str(m): float(self.realizado[:, m - 1].sum()) for m in self.meses_medidos},
+            }
+        return documento
+
+    def para_atualizacao(self) -> dict:
+        """Como `para_documento`, removendo os campos do formato legado (para usar em `.update()`)."""
+        return {**self.para_documento(), **remocao_legados()}
+
+    def _ajustar_meses(self, matriz, n_meses):
+        if matriz.shape[1] >= n_meses:
+            return matriz
+        return np.hstack([matriz, np.zeros((matriz.shape[0], n_meses - matriz.shape[1]))])
+
+    def com_planejamento(self, itens, total_etapa, previsto) -> "TabelasProjeto":
+        """Cópia com um novo planejamento; a medição dos itens mantidos é preservada."""
+        itens = tuple(itens)
+        previsto = _numerico(previsto).reshape(len(itens), -1)
+        n_meses = max(previsto.shape[1], self.n_meses)
+        posicao = {item: k for k, item in enumerate(self.itens)}
+        realizado = np.zeros((len(itens), n_meses))
+        antigo = self._ajustar_meses(self.realizado, n_meses)
+        for k, item in enumerate(itens):
+            if item in posicao:
+                realizado[k] = antigo[posicao[item]]
+        return TabelasProjeto(
+            itens=itens,
+            total_etapa=_numerico(list(total_etapa)),
+            previsto=self._ajustar_meses(previsto, n_meses),
+            realizado=realizado,
+            meses_medidos=self.meses_medidos,
+            tem_medicao=self.tem_medicao,
+        )
+
+    def com_medicao(self, realizado, ate_mes: int) -> "TabelasProjeto":
+        """
+        Cópia com uma nova medição (itens x meses). São considerados medidos os meses
+        até `ate_mes` e qualquer mês posterior com valores.
+        """
+        realizado = _numerico(realizado).reshape(len(self.itens), -1)
+        n_meses = max(realizado.shape[1], self.n_meses)
+        realizado = self._ajustar_meses(realizado, n_meses)
+        medidos = {int(j) + 1 for j in np.flatnonzero(realizado.any(axis=0))} | set(range(1, min(ate_mes, n_meses) + 1))
+        return TabelasProjeto(
+            itens=self.itens,
+            total_etapa=self.total_etapa,
+            previsto=self._ajustar_meses(self.previsto, n_meses),
+            realizado=realizado,
+            meses_medidos=tuple(sorted(medidos)),
+            tem_medicao=True,
+        )
+
+    # --- Visão em linhas (formato das tabelas exibidas nas páginas) ---
+
+    def linhas_planejamento(self, incluir_total: bool = True) -> list:
+        colunas = [f"Mês {j + 1}" for j in range(self.n_meses)]
+        linhas = [
+            {"Item": item, "Total por etapa": total, **dict(zip(colunas, valores))}
+            for item, total, valores in zip(self.itens, self.total_etapa.tolist(), self.previsto.tolist())
+        ]
+        if incluir_total and linhas:
+            linhas.append({"Item": "TOTAL", "Total por etapa": float(self.total_etapa.sum()),
+                           **dict(zip(colunas, self.previsto.sum(axis=0).tolist()))})
+        return linhas
+
+    def linhas_medicao(self, incluir_total: bool = True) -> list:
+        colunas = [f"Mês {j + 1}" for j in range(self.n_meses)]
+        total_item = self.realizado.sum(axis=1)
+        linhas = [
+            {"Item": item, "Total por etapa": total, **dict(zip(colunas, valores)), "Total": medido,
+             "Percentual do total da etapa": _formatar_percentual(medido / total * 100) if total > 0 else "0.00%"}
+            for item, total, valores, medido in zip(
+                self.itens, self.total_etapa.tolist(), self.realizado.tolist(), total_item.tolist())
+        ]
+        if incluir_total and linhas:
+            total_etapa, total_medido = float(self.total_etapa.sum()), float(total_item.sum())
+            linhas.append({"Item": "Total por Mês", "Total por etapa": total_etapa,
+                           **dict(zip(colunas, self.realizado.sum(axis=0).tolist())), "Total": total_medido,
+                           "Percentual do total da etapa": _formatar_percentual(total_medido / total_etapa * 100) if total_etapa > 0 else "0.00%"})
+        return linhas
+
+
+@dataclass(frozen=True)
+class CabecalhoProjeto:
+    """
+    Apenas os campos de cabeçalho de um projeto, sem as tabelas, usados na busca e nas
+    listagens. O projeto completo (`ProjetoSnapshot`) só é lido quando é escolhido.
+    """
+    id: str
+    dados: dict
+
+    @classmethod
+    def de_dict(cls, project_id: str, data: dict) -> "CabecalhoProjeto":
+        data = data or {}
+        return cls(id=project_id, dados={campo: data[campo] for campo in CAMPOS_CABECALHO if campo in data})
+
+    @classmethod
+    def de_documento(cls, doc) -> "CabecalhoProjeto":
+        """Cria o cabeçalho a partir de um DocumentSnapshot (completo ou com projeção de campos)."""
+        return cls.de_dict(doc.id, doc.to_dict())
+
+
+@dataclass
+class ProjetoSnapshot:
+    """
+    Fotografia de um documento da coleção "projetos", lida uma única vez do Firestore.
+
+    Todas as funções de `processamento.py` recebem este objeto, de modo que a geração
+    de um relatório completo custa apenas uma leitura do documento.
+    """
+    id: str
+    cabecalho: dict
+    tabelas: TabelasProjeto = field(default_factory=TabelasProjeto)
+    medicao_atual: int = None
+    dados: dict = field(default_factory=dict)
+
+    @classmethod
+    def de_dict(cls, project_id: str, data: dict) -> "ProjetoSnapshot":
+        """Cria o snapshot a partir do dicionário de um documento já carregado (esquema legado ou v2)."""
+        data = data or {}
+        return cls(
+            id=project_id,
+            cabecalho={campo: data.get(campo) for campo in CAMPOS_CABECALHO if campo in data},
+            tabelas=TabelasProjeto.de_documento(data),
+            medicao_atual=data.get("medicao_atual"),
+            dados=data,
+        )
+
+    @classmethod
+    def de_documento(cls, doc) -> "ProjetoSnapshot":
+        """Cria o snapshot a partir de um DocumentSnapshot do Firestore (ex.: resultado de `.stream()`)."""
+        return cls.de_dict(doc.id, doc.to_dict())
+
+    @cached_property
+    def planejamento(self) -> list:
+        """Tabela de planejamento em linhas (com a linha 'TOTAL'), como exibida nas páginas."""
+        return self.tabelas.linhas_planejamento()
+
+    @cached_property
+    def medicao(self) -> list:
+        """Tabela de medição em linhas (com a linha 'Total por Mês'), como exibida nas páginas."""
+        return self.tabelas.linhas_medicao() if self.tabelas.tem_medicao else []
+
+
+def carregar_projeto(db: firestore.client, project_id: str) -> ProjetoSnapshot:
+    """
+    Busca o documento do projeto no Firestore uma única vez.
+
+    Returns:
+        ProjetoSnapshot: O snapshot do projeto, ou None se o documento não existir.
+    """
+    with medir("firestore_leitura", projeto=project_id, operacao="projeto"):
+        doc = db.collection("projetos").document(project_id).get()
+    if not doc.exists:
+        return None
+    return ProjetoSnapshot.de_documento(doc)
+
+
+def remocao_legados(dados: dict = None) -> dict:
+    """
+    Campos de `.update()` que apagam o formato legado: todos, ou só os presentes em
+    `dados`. Documentos migrados com `--manter-legado` os perdem na primeira gravação,
+    que deixaria as cópias legadas desatualizadas.
+    """
+    return {campo: firestore.DELETE_FIELD for campo in CAMPOS_LEGADOS if dados is None or campo in dados}
+
+def salvar_planejamento(db: firestore.client, project_id: str, itens, total_etapa, previsto,
+                        prazo_meses: int = None) -> TabelasProjeto:
+    """
+    Grava um novo planejamento dentro de uma transação, relendo o documento.
+
+    No esquema v2 só o mapa `planejamento` (com `schema_version` e `prazo_meses`) é
+    escrito: uma medição gravada por `salvar_medicao` desde que a página carregou o
+    projeto não é sobrescrita. Se a lista de itens mudou, a medição é realinhada aos
+    novos itens a partir da versão lida na própria transação (a transação é repetida
+    se outra escrita acontecer no meio). Documentos no esquema legado são convertidos
+    por inteiro para o v2, e cópias legadas mantidas na migração são apagadas.
+
+    Returns:
+        TabelasProjeto: As tabelas gravadas.
+    """
+    doc_ref = db.collection("projetos").document(project_id)
+
+    @firestore.transactional
+    def _salvar(transacao):
+        doc = doc_ref.get(transaction=transacao)
+        if not doc.exists:
+            raise LookupError(f"Projeto com ID '{project_id}' não foi encontrado.")
+        dados = doc.to_dict()
+        atual = TabelasProjeto.de_documento(dados)
+        novo = atual.com_planejamento(itens, total_etapa, previsto)
+
+        campos = {}
+        if dados.get("schema_version", 1) < VERSAO_ESQUEMA:
+            campos.update(novo.para_atualizacao())
+        else:
+            documento = novo.para_documento()
+            campos["schema_version"] = VERSAO_ESQUEMA
+            campos["planejamento"] = documento["planejamento"]
+            if novo.itens != atual.itens and "medicao" in documento:
+                # As linhas da medição seguem a ordem dos itens
+                campos["medicao"] = documento["medicao"]
+            campos.update(remocao_legados(dados))
+        if prazo_meses is not None:
+            campos["prazo_meses"] = int(prazo_meses)
+
+        transacao.update(doc_ref, campos)
+        return novo
+
+    return _salvar(db.transaction())
+
+
+class ConflitoMedicao(Exception):
+    """O mês que se tentou salvar foi alterado por outra pessoa desde que a tabela foi carregada."""
+
+
+def meses_alterados(base: TabelasProjeto, realizado) -> list:
+    """Meses (1 = 'Mês 1') cujos valores em `realizado` diferem da medição em `base`."""
+    realizado = _numerico(realizado).reshape(len(base.itens), -1)
+    n_meses = max(realizado.shape[1], base.n_meses)
+    novo = base._ajustar_meses(realizado, n_meses)
+    antigo = base._ajustar_meses(base.realizado, n_meses)
+    return [int(j) + 1 for j in np.flatnonzero(~np.isclose(novo, antigo).all(axis=0))]
+
+def salvar_medicao(db: firestore.client, project_id: str, base: TabelasProjeto, realizado,
+                   medicao_atual: int, prazo_meses: int = None) -> list:
+    """
+    Grava apenas os meses da medição que mudaram em relação a `base` (a tabela exibida
+    ao usuário), dentro de uma transação.
+
+    Cada mês alterado é escrito no seu próprio caminho de campo ("medicao.meses.`3`"),
+    junto com o total daquele mês, de modo que duas pessoas editando meses diferentes
+    não sobrescrevem uma à outra. Se um dos meses alterados já tiver sido modificado
+    no banco desde a leitura de `base`, nada é gravado e `ConflitoMedicao` é lançada.
+    Documentos ainda no esquema legado são convertidos para o v2 na mesma escrita, e
+    cópias legadas mantidas na migração são apagadas.
+
+    Returns:
+        list[int]: Os meses gravados.
+    """
+    realizado = _numerico(realizado).reshape(len(base.itens), -1)
+    realizado = base._ajustar_meses(realizado, max(realizado.shape[1], base.n_meses))
+    alterados = meses_alterados(base, realizado)
+    doc_ref = db.collection("projetos").document(project_id)
+
+    @firestore.transactional
+    def _salvar(transacao):
+        doc = doc_ref.get(transaction=transacao)
+        if not doc.exists:
+            raise LookupError(f"Projeto com ID '{project_id}' não foi encontrado.")
+        dados = doc.to_dict()
+        atual = TabelasProjeto.de_documento(dados)
+        if atual.itens != base.itens:
+            raise ConflitoMedicao("Os itens do projeto foram alterados desde que a tabela foi carregada.")
+
+        n_meses = max(realizado.shape[1], atual.n_meses, base.n_meses)
+        no_banco = atual._ajustar_meses(atual.realizado, n_meses)
+        lido = base._ajustar_meses(base.realizado, n_meses)
+        conflitos = [m for m in alterados if not np.allclose(no_banco[:, m - 1], lido[:, m - 1])]
+        if conflitos:
+            raise ConflitoMedicao(
+                f"Mês(es) {', '.join(map(str, conflitos))} alterado(s) por outra pessoa; recarregue a página."
+            )
+
+        campos = {"medicao_atual": int(medicao_atual)}
+        if prazo_meses is not None:
+            campos["prazo_meses"] = int(prazo_meses)
+
+        if dados.get("schema_version", 1) < VERSAO_ESQUEMA:
+            # Legado: converte o documento inteiro, aplicando apenas os meses alterados
+            novo = no_banco.copy()
+            for m in alterados:
+                novo[:, m - 1] = realizado[:, m - 1]
+            campos.update(atual.com_medicao(novo, ate_mes=int(medicao_atual)).para_atualizacao())
+        else:
+            for m in alterados:
+                coluna = realizado[:, m - 1]
+                campos[FieldPath("medicao", "meses", str(m)).to_api_repr()] = coluna.tolist()
+                campos[FieldPath("medicao", "total_mes", str(m)).to_api_repr()] = float(coluna.sum())
+            campos.update(remocao_legados(dados))
+
+        transacao.update(doc_ref, campos)
+
+    _salvar(db.transaction())
+    return alterados
@@ -0,0 +1,149 @@
+"""
+Pipeline de geração da Ata de Medição de um projeto.
+
+Reúne as etapas que antes ficavam dentro do botão "Gerar PDF" de `consultar_proj`:
+tabelas (`processamento`) e gráficos (`data_gen.graphs`), calculados conforme os
+placeholders do template (`geradores`), e o PDF, desenhado direto a partir do
+layout do template (`pdf_nativo`) ou pelo template DOCX preenchido e convertido
+pelo LibreOffice (`conversao_pdf`). O template vem do registro de `modelos`
+(compilado uma vez por processo e recarregado se o arquivo mudar). É usado tanto
+pela página de consulta quanto pela geração em lote (`lote.py`), que o executa em
+processos separados.
+"""
+import io
+import logging
+import os
+from pathlib import Path
+
+from geradores import PLACEHOLDERS, Montagem
+from modelos import Modelo, obter_registro_modelos
+from projeto import ProjetoSnapshot
+from conversao_pdf import BACKEND_PADRAO, BACKENDS, converter_docx_bytes
+from cache_relatorios import chave_relatorio, obter_cache_relatorios
+from data_gen.graphs import parametros_graficos
+from metricas import contar, medir
+
+CAMINHO_TEMPLATE = obter_registro_modelos().caminho()
+
+# Extensão do PDF de cada backend no cache de relatórios (os dois não são idênticos)
+EXTENSOES_PDF = {"libreoffice": ".pdf", "nativo": ".nativo.pdf"}
+
+logger = logging.getLogger(__name__)
+
+
+def obter_template_compilado(caminho_template):
+    """Template compilado (uma vez por processo, de novo se o arquivo mudar; ver `modelos`)."""
+    return obter_registro_modelos().carregar(caminho_template).compilado
+
+def obter_layout_pdf(caminho_template):
+    """Layout do template para o backend nativo, lido uma vez por versão do template."""
+    return obter_registro_modelos().carregar(caminho_template).layout
+
+def chave_cache_relatorio(projeto: ProjetoSnapshot, modelo: Modelo) -> str:
+    """Chave do relatório no cache: documento do projeto, template e configuração dos gráficos."""
+    return chave_relatorio(projeto.dados, modelo.conteudo, parametros=parametros_graficos())
+
+def montar_dados_template(projeto: ProjetoSnapshot, campos=None) -> dict:
+    """
+    Monta o dicionário de placeholders do projeto.
+
+    Só são calculadas as tabelas e os gráficos que os placeholders em `campos`
+    (normalmente `TemplateCompilado.campos`) usam, cada um uma única vez e em
+    paralelo quando independentes (ver `geradores.py`); sem `campos`, todos os
+    placeholders registrados são preenchidos. Os gráficos são imagens PNG em memória
+    (nenhum arquivo temporário é criado).
+    """
+    if campos is None:
+        campos = PLACEHOLDERS.keys()
+    with medir("montagem", projeto=projeto.id):
+        return Montagem(projeto).preencher(campos)
+
+def gerar_pdf(projeto: ProjetoSnapshot, caminho_template=CAMINHO_TEMPLATE, backend: str = None) -> bytes:
+    """
+    Executa o pipeline completo e retorna o PDF em memória.
+
+    O PDF (e o DOCX intermediário) é buscado antes no cache de relatórios, pela chave
+    do documento do projeto + template + versão do gerador; o pipeline só roda se o
+    projeto ou o template mudaram desde a última geração.
+
+    Args:
+        backend (str): "nativo" desenha o PDF direto a partir do layout do template
+            (`pdf_nativo`, sem LibreOffice); "libreoffice" preenche o DOCX em memória e
+            o converte com `converter_docx_bytes`. Padrão: `PDF_BACKEND`. Se o nativo
+            falhar ao desenhar, o PDF é gerado pelo LibreOffice.
+
+    Returns:
+        bytes: Conteúdo do PDF.
+    """
+    backend = backend or BACKEND_PADRAO
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de PDF desconhecido: {backend} (use {', '.join(BACKENDS)})")
+    with medir("relatorio", projeto=projeto.id, backend=backend):
+        return _gerar_pdf(projeto, caminho_template, backend)
+
+def _gerar_pdf(projeto: ProjetoSnapshot, caminho_template, backend) -> bytes:
+    cache = obter_cache_relatorios()
+    modelo = obter_registro_modelos().carregar(caminho_template)
+    with medir("cache_consulta", projeto=projeto.id):
+        chave = chave_cache_relatorio(projeto, modelo)
+        pdf_bytes = cache.ler(chave, EXTENSOES_PDF[backend])
+    if pdf_bytes is not None:
+        contar("relatorios", origem="cache_pdf", backend=backend)
+        return pdf_bytes
+
+    if backend == "libreoffice":
+        return _gerar_pdf_libreoffice(projeto, modelo, cache, chave)
+
+    contar("relatorios", origem="pipeline", backend=backend)
+    dados_para_template = montar_dados_template(projeto, modelo.compilado.campos)
+    try:
+        with medir("pdf_nativo", projeto=projeto.id):
+            # Importado só aqui: o ReportLab pode não estar instalado na imagem
+            from pdf_nativo import renderizar_pdf
+            pdf_bytes = renderizar_pdf(modelo.layout, dados_para_template,
+                                       titulo=f"Ata de Medição - {projeto.dados.get('n_contrato', projeto.id)}")
+    except Exception as e:
+        logger.exception(f"Falha no PDF nativo do projeto {projeto.id}; gerando pelo LibreOffice")
+        contar("relatorios_reserva", motivo=type(e).__name__)
+        return _gerar_pdf_libreoffice(projeto, modelo, cache, chave, dados_para_template)
+
+    cache.guardar(chave, EXTENSOES_PDF[backend], pdf_bytes)
+    return pdf_bytes
+
+def _gerar_pdf_libreoffice(projeto: ProjetoSnapshot, modelo: Modelo, cache, chave, dados_para_template=None) -> bytes:
+    pdf_bytes = cache.ler(chave, EXTENSOES_PDF["libreoffice"], contabilizar=False)
+    if pdf_bytes is not None:
+        return pdf_bytes
+
+    docx_bytes = cache.ler(chave, ".docx", contabilizar=False)
+    if docx_bytes is not None:
+        contar("relatorios", origem="cache_docx", backend="libreoffice")
+    else:
+        contar("relatorios", origem="pipeline", backend="libreoffice")
+        if dados_para_template is None:
+            dados_para_template = montar_dados_template(projeto, modelo.compilado.campos)
+        with medir("preencher_campos", projeto=projeto.id):
+            doc_obj = modelo.compilado.renderizar(dados_para_template)
+            buffer = io.BytesIO()
+            doc_obj.save(buffer)
+            docx_bytes = buffer.getvalue()
+        cache.guardar(chave, ".docx", docx_bytes)
+
+    with medir("converter_para_pdf", projeto=projeto.id):
+        pdf_bytes = converter_docx_bytes(docx_bytes, f"projeto_{projeto.id}")
+
+    cache.guardar(chave, EXTENSOES_PDF["libreoffice"], pdf_bytes)
+    return pdf_bytes
+
+def gerar_relatorio(projeto: ProjetoSnapshot, dir_saida, caminho_template=CAMINHO_TEMPLATE, backend: str = None) -> str:
+    """
+    Gera o PDF (ver `gerar_pdf`) e o grava como `projeto_<id>.pdf` em `dir_saida`;
+    usado pela geração em lote, que junta os arquivos em um ZIP.
+
+    Returns:
+        str: Caminho do PDF gerado.
+    """
+    os.makedirs(dir_saida, exist_ok=True)
+    pdf_path = Path(dir_saida) / f"projeto_{projeto.id}.pdf"
+    pdf_path.write_bytes(gerar_pdf(projeto, caminho_template, backend))
+    return str(pdf_path)
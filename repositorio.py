@@ -0,0 +1,256 @@
+"""
+Acesso aos projetos no Firestore, compartilhado por todas as páginas.
+
+Reúne em um só lugar o que cada página fazia por conta própria:
+
+- um único cliente do Firestore por processo (`obter_db`), em vez de uma
+  inicialização do Firebase em cada página;
+- um cache dos documentos de projeto (`RepositorioProjetos`), comum a todas as
+  sessões e reruns, com validade (TTL) e número máximo de projetos (LRU). Leituras
+  simultâneas do mesmo projeto esperam a primeira, de modo que dez pessoas abrindo
+  o mesmo contrato custam uma única leitura;
+- listagens paginadas (`listar`) que leem do Firestore só os campos de cabeçalho
+  (projeção no servidor) e avançam por cursor (`start_after`), de modo que o custo
+  de uma página não cresce com o número de contratos. A ordem padrão é o ID do
+  documento, que todo projeto tem (`order_by` em um campo omite os documentos sem ele);
+- escritas (`criar`, `atualizar`, `salvar_medicao`) que invalidam o projeto no
+  cache na hora, para que a próxima leitura já traga o que foi gravado. O listener
+  do índice de busca (`busca.py`) também atualiza os projetos em cache quando o
+  documento muda por outra via (outro processo, console do Firebase).
+
+Configuração (variáveis de ambiente):
+    FIREBASE_KEY_PATH          Caminho da chave da conta de serviço
+    REPOSITORIO_TTL            Validade, em segundos, de um projeto em cache (padrão: 300)
+    REPOSITORIO_MAX_PROJETOS   Projetos mantidos em cache (padrão: 500)
+    REPOSITORIO_TTL_LISTAGEM   Validade, em segundos, de uma página de listagem (padrão: 30)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import firebase_admin
+import streamlit as st
+from dotenv import load_dotenv
+from firebase_admin import credentials, firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from busca import obter_indice_projetos
+from metricas import contar, medir
+from projeto import (CAMPOS_CABECALHO, CabecalhoProjeto, ProjetoSnapshot, carregar_projeto, salvar_medicao,
+                     salvar_planejamento)
+
+COLECAO = "projetos"
+
+
+def conectar_firestore() -> firestore.client:
+    """Inicializa o Firebase (uma vez por processo) e retorna o cliente; usado também fora do Streamlit."""
+    load_dotenv()
+    if not firebase_admin._apps:
+        FIREBASE_KEY_PATH = os.getenv("FIREBASE_KEY_PATH", "app/firebase_key.json")
+        if not os.path.exists(FIREBASE_KEY_PATH):
+            raise FileNotFoundError(f"Arquivo de chave do Firebase não encontrado em: {FIREBASE_KEY_PATH}")
+        cred = credentials.Certificate(FIREBASE_KEY_PATH)
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+@st.cache_resource
+def obter_db() -> firestore.client:
+    """Cliente do Firestore do processo, compartilhado por todas as páginas e sessões."""
+    try:
+        with medir("firestore_conexao"):
+            return conectar_firestore()
+    except FileNotFoundError as e:
+        st.error(str(e))
+        st.stop()
+    except Exception as e:
+        st.error(f"Erro ao inicializar o Firebase: {e}")
+        st.stop()
+
+
+class RepositorioProjetos:
+    """
+    Cache de leitura dos projetos, com TTL e limite de tamanho, e escritas que o invalidam.
+
+    Args:
+        db: Cliente do Firestore.
+        ttl (float): Segundos em que um projeto lido é reaproveitado.
+        max_projetos (int): Projetos mantidos; os usados há mais tempo são descartados.
+        ttl_listagem (float): Segundos em que uma página de `listar` é reaproveitada.
+    """
+
+    def __init__(self, db, ttl=300.0, max_projetos=500, ttl_listagem=30.0):
+        self.db = db
+        self.ttl = ttl
+        self.max_projetos = max_projetos
+        self.ttl_listagem = ttl_listagem
+        self._listagens = {}             # (ordem, tamanho, id do cursor) -> (expira_em, página)
+        self._versao_listagens = 0
+        self._lock = threading.Lock()
+        self._projetos = OrderedDict()   # project_id -> (expira_em, ProjetoSnapshot)
+        self._carregando = {}            # project_id -> Event da leitura em andamento
+        self._versoes = {}               # project_id -> nº de invalidações (descarta leituras antigas)
+        self._acertos = 0
+        self._leituras = 0
+
+    # --- Leitura ---
+
+    def obter(self, project_id: str) -> ProjetoSnapshot:
+        """Retorna o projeto (do cache ou lido do Firestore), ou None se não existir."""
+        while True:
+            with self._lock:
+                item = self._projetos.get(project_id)
+                if item is not None and item[0] > time.monotonic():
+                    self._projetos.move_to_end(project_id)
+                    self._acertos += 1
+                    contar("repositorio_consultas", resultado="acerto")
+                    return item[1]
+                evento = self._carregando.get(project_id)
+                if evento is None:
+                    evento = self._carregando[project_id] = threading.Event()
+                    versao = self._versoes.get(project_id, 0)
+                    break
+            # Outra sessão já está lendo este projeto: espera e tenta o cache de novo
+            evento.wait()
+
+        contar("repositorio_consultas", resultado="leitura")
+        projeto = None
+        try:
+            projeto = carregar_projeto(self.db, project_id)
+            return projeto
+        finally:
+            with self._lock:
+                self._leituras += 1
+                # Se o projeto foi invalidado durante a leitura, o que foi lido pode estar desatualizado
+                if projeto is not None and self._versoes.get(project_id, 0) == versao:
+                    self._guardar(projeto)
+                del self._carregando[project_id]
+            evento.set()
+
+    def _guardar(self, projeto: ProjetoSnapshot):
+        self._projetos[projeto.id] = (time.monotonic() + self.ttl, projeto)
+        self._projetos.move_to_end(projeto.id)
+        while len(self._projetos) > self.max_projetos:
+            self._projetos.popitem(last=False)
+
+    def invalidar(self, project_id: str):
+        """Descarta o projeto (e as páginas de listagem) do cache; a próxima leitura vai ao Firestore."""
+        with self._lock:
+            self._projetos.pop(project_id, None)
+            self._listagens.clear()
+            self._versao_listagens += 1
+            self._versoes[project_id] = self._versoes.get(project_id, 0) + 1
+
+    def ao_mudar_documento(self, project_id: str, dados: dict):
+        """
+        Chamado pelo listener do índice de busca a cada documento alterado (`dados`
+        None se removido). Só atualiza projetos que já estão em cache.
+        """
+        with self._lock:
+            if project_id not in self._projetos:
+                return
+        projeto = ProjetoSnapshot.de_dict(project_id, dados) if dados is not None else None
+        with self._lock:
+            if projeto is None:
+                self._projetos.pop(project_id, None)
+            elif project_id in self._projetos:
+                self._guardar(projeto)
+
+    def listar(self, tamanho: int = 20, apos=None, ordem: str = None) -> tuple:
+        """
+        Uma página de projetos ordenada por `ordem`, só com os campos de cabeçalho.
+
+        Args:
+            tamanho (int): Projetos por página.
+            apos: Cursor devolvido pela página anterior (None para a primeira).
+            ordem (str): Campo de ordenação (padrão: ID do documento). O Firestore omite
+                os documentos que não têm o campo, então use só campos que todos têm.
+
+        Returns:
+            tuple: (list[CabecalhoProjeto], cursor da próxima página ou None se esta for a última).
+        """
+        ordem = ordem or FieldPath.document_id()
+        chave = (ordem, tamanho, apos.id if apos is not None else None)
+        with self._lock:
+            item = self._listagens.get(chave)
+            if item is not None and item[0] > time.monotonic():
+                return item[1]
+            versao = self._versao_listagens
+
+        # Um documento a mais indica se há próxima página
+        consulta = self.db.collection(COLECAO).select(list(CAMPOS_CABECALHO)).order_by(ordem).limit(tamanho + 1)
+        if apos is not None:
+            consulta = consulta.start_after(apos)
+        with medir("firestore_leitura", operacao="listagem", tamanho=tamanho):
+            documentos = list(consulta.stream())
+        pagina = documentos[:tamanho]
+        resultado = ([CabecalhoProjeto.de_documento(d) for d in pagina],
+                     pagina[-1] if len(documentos) > tamanho else None)
+
+        with self._lock:
+            if self._versao_listagens == versao:
+                agora = time.monotonic()
+                self._listagens = {k: v for k, v in self._listagens.items() if v[0] > agora}
+                self._listagens[chave] = (agora + self.ttl_listagem, resultado)
+        return resultado
+
+    def buscar(self, termo: str, campo: str = None) -> list:
+        """Busca no índice em memória (`busca.py`), cujo listener também mantém este cache atualizado."""
+        indice = obter_indice_projetos(self.db)
+        indice.observar(self.ao_mudar_documento)
+        return indice.buscar(termo, campo)
+
+    def contrato_existe(self, n_contrato: str) -> bool:
+        """Indica se já há um projeto com o número de contrato informado."""
+        with medir("firestore_leitura", operacao="contrato_existente"):
+            consulta = self.db.collection(COLECAO).where("n_contrato", "==", n_contrato).limit(1).stream()
+            return any(consulta)
+
+    # --- Escrita (sempre invalida o cache do projeto) ---
+
+    def criar(self, dados: dict) -> str:
+        """Grava um novo projeto e retorna o seu ID."""
+        with medir("firestore_escrita", operacao="cadastro"):
+            _, referencia = self.db.collection(COLECAO).add(dados)
+        self.invalidar(referencia.id)
+        return referencia.id
+
+    def atualizar(self, project_id: str, dados: dict, operacao: str = "atualizacao"):
+        """Atualiza campos do documento do projeto."""
+        try:
+            with medir("firestore_escrita", projeto=project_id, operacao=operacao):
+                self.db.collection(COLECAO).document(project_id).update(dados)
+        finally:
+            self.invalidar(project_id)
+
+    def salvar_planejamento(self, project_id: str, itens, total_etapa, previsto, prazo_meses: int = None):
+        """Grava o planejamento sem sobrescrever a medição (ver `projeto.salvar_planejamento`)."""
+        try:
+            with medir("firestore_escrita", projeto=project_id, operacao="planejamento"):
+                return salvar_planejamento(self.db, project_id, itens, total_etapa, previsto, prazo_meses)
+        finally:
+            self.invalidar(project_id)
+
+    def salvar_medicao(self, project_id: str, base, realizado, medicao_atual: int, prazo_meses: int = None) -> list:
+        """Grava os meses de medição alterados (ver `projeto.salvar_medicao`)."""
+        try:
+            with medir("firestore_escrita", projeto=project_id, operacao="medicao"):
+                return salvar_medicao(self.db, project_id, base, realizado, medicao_atual, prazo_meses)
+        finally:
+            # Também em caso de conflito: a versão em cache é a que ficou desatualizada
+            self.invalidar(project_id)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {"acertos": self._acertos, "leituras": self._leituras, "projetos": len(self._projetos)}
+
+
+@st.cache_resource
+def obter_repositorio() -> RepositorioProjetos:
+    """Repositório único do processo, compartilhado por todas as sessões e páginas."""
+    return RepositorioProjetos(
+        obter_db(),
+        ttl=float(os.getenv("REPOSITORIO_TTL", "300")),
+        max_projetos=int(os.getenv("REPOSITORIO_MAX_PROJETOS", "500")),
+        ttl_listagem=float(os.getenv("REPOSITORIO_TTL_LISTAGEM", "30")),
+    )
@@ -0,0 +1,265 @@
+"""
+Compilação e preenchimento de templates Word com placeholders {{campo}}.
+
+O template é analisado uma única vez: os placeholders que o Word quebrou em vários
+runs (ex.: ['{{', 'n_p', 'rocesso}}']) são consolidados em um único run e a posição
+de cada placeholder (parágrafo, run, campo) é registrada. O preenchimento percorre
+então apenas essas posições, em uma única passada, sem varrer todos os parágrafos
+para cada chave nem reconstruir o texto do parágrafo a cada substituição.
+"""
+import copy
+import re
+from io import BytesIO
+from xml.sax.saxutils import escape
+from pathlib import Path
+import pandas as pd
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.shared import Emu, Inches
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+
+PADRAO_CAMPO = re.compile(r"\{\{(.*?)\}\}")
+
+
+def is_image(v):
+    # Imagem em memória (bytes PNG/JPEG, como as geradas por data_gen.graphs)
+    if isinstance(v, (bytes, bytearray)):
+        return v[:8] == b"\x89PNG\r\n\x1a\n" or v[:3] == b"\xff\xd8\xff"
+    if isinstance(v, BytesIO):
+        return True
+    return isinstance(v, (str, Path)) and str(v).lower().endswith((".png", ".jpg", ".jpeg"))
+
+def _fonte_imagem(v):
+    """Converte o valor da imagem em algo aceito por `add_picture` (caminho ou stream)."""
+    if isinstance(v, (bytes, bytearray)):
+        return BytesIO(v)
+    if isinstance(v, BytesIO):
+        v.seek(0)
+        return v
+    return str(v)
+
+def is_table(v):
+    if isinstance(v, pd.DataFrame):
+        return True
+    if isinstance(v, list) and v and all(isinstance(r, dict) for r in v):
+        return True
+    return False
+
+def normalize_table(v):
+    if isinstance(v, pd.DataFrame):
+        return v.to_dict(orient="records")
+    return v
+
+def _paragrafos(doc):
+    """Todos os elementos w:p do corpo, incluindo os de células de tabelas, em ordem."""
+    return list(doc.element.body.iter(qn("w:p")))
+
+def _runs(p_element):
+    return p_element.findall(qn("w:r"))
+
+def _texto_run(r_element):
+    # Mesmo texto exposto por docx.text.run.Run.text (w:t, w:tab, w:br...)
+    return Run(r_element, None).text
+
+def _definir_texto_run(r_element, texto):
+    Run(r_element, None).text = texto
+
+
+class TemplateCompilado:
+    """
+    Template com as posições dos placeholders já resolvidas.
+
+    Args:
+        doc (Document): Documento do template. Os placeholders quebrados em vários
+            runs são consolidados no próprio objeto durante a compilação.
+    """
+
+    def __init__(self, doc):
+        self.ocorrencias = {}   # índice do parágrafo -> [(índice do run, campo), ...]
+        self.isolados = set()   # (índice do parágrafo, campo) onde o parágrafo contém só o placeholder
+        self.campos = set()
+        self._documento = doc
+
+        for i, p in enumerate(_paragrafos(doc)):
+            runs = _runs(p)
+            textos = [_texto_run(r) for r in runs]
+            texto_paragrafo = "".join(textos)
+            if "{{" not in texto_paragrafo:
+                continue
+
+            matches = list(PADRAO_CAMPO.finditer(texto_paragrafo))
+            if not matches:
+                continue
+
+            # Mapeia deslocamentos do texto do parágrafo para (run, deslocamento no run)
+            inicios = []
+            pos = 0
+            for t in textos:
+                inicios.append(pos)
+                pos += len(t)
+
+            def localizar(offset):
+                for k in range(len(inicios) - 1, -1, -1):
+                    if inicios[k] <= offset:
+                        return k
+                return 0
+
+            # Consolida de trás para frente para não invalidar os deslocamentos anteriores
+            locais = []
+            for m in reversed(matches):
+                r_ini = localizar(m.start())
+                r_fim = localizar(m.end() - 1)
+                if r_ini != r_fim:
+                    ini_local = m.start() - inicios[r_ini]
+                    fim_local = m.end() - inicios[r_fim]
+                    textos[r_ini] = textos[r_ini][:ini_local] + m.group(0)
+                    for k in range(r_ini + 1, r_fim):
+                        textos[k] = ""
+                        _definir_texto_run(runs[k], "")
+                    textos[r_fim] = textos[r_fim][fim_local:]
+                    _definir_texto_run(runs[r_ini], textos[r_ini])
+                    _definir_texto_run(runs[r_fim], textos[r_fim])
+                locais.append((r_ini, m.group(1)))
+
+            self.ocorrencias[i] = sorted(set(locais))
+            for m in matches:
+                self.campos.add(m.group(1))
+            if len(matches) == 1 and texto_paragrafo.strip() == matches[0].group(0):
+                self.isolados.add((i, matches[0].group(1)))
+
+    @classmethod
+    def de_arquivo(cls, caminho):
+        """
+        Compila o template (caminho ou stream) e guarda o documento já consolidado,
+        analisado uma única vez, como original das renderizações futuras.
+        """
+        template = cls(Document(caminho))
+        buffer = BytesIO()
+        template._documento.save(buffer)
+        buffer.seek(0)
+        # O original é relido do documento salvo: é exatamente o que as cópias recebiam antes
+        template._documento = Document(buffer)
+        return template
+
+    def documento(self) -> Document:
+        """
+        Nova cópia do template (com os placeholders já consolidados), sem preencher.
+
+        É uma cópia profunda do documento analisado, cerca de duas vezes mais rápida
+        que ler o .docx de novo; o original nunca é alterado.
+        """
+        return copy.deepcopy(self._documento)
+
+    def renderizar(self, dados) -> Document:
+        """Retorna um novo documento com os placeholders preenchidos."""
+        doc = self.documento()
+        self.aplicar(doc, dados)
+        return doc
+
+    def aplicar(self, doc, dados):
+        """
+        Substitui os placeholders registrados no documento (que deve ter a mesma
+        estrutura do template compilado) por:
+          - Texto (str/int/float)
+          - Imagem (bytes PNG/JPEG em memória ou caminho .png/.jpg/.jpeg)
+          - Tabela (list[dict] ou pandas.DataFrame) com grid.
+        """
+        paragrafos = _paragrafos(doc)
+
+        for i, locais in self.ocorrencias.items():
+            p_element = paragrafos[i]
+            runs = _runs(p_element)
+            for r_idx, campo in locais:
+                if campo not in dados:
+                    continue
+                valor = dados[campo]
+                ph = f"{{{{{campo}}}}}"
+                r_element = runs[r_idx]
+
+                if is_table(valor):
+                    _definir_texto_run(r_element, _texto_run(r_element).replace(ph, ""))
+                    _inserir_tabela_apos(doc, p_element, valor)
+                elif is_image(valor):
+                    paragrafo = Paragraph(p_element, doc._body)
+                    if (i, campo) in self.isolados:
+                        for r in runs:
+                            _definir_texto_run(r, "")
+                    else:
+                        # Se houver mais texto, a imagem é inserida inline
+                        _definir_texto_run(r_element, _texto_run(r_element).replace(ph, ""))
+                    paragrafo.add_run().add_picture(_fonte_imagem(valor), width=Inches(6.0))
+                else:
+                    texto = str(valor) if valor is not None else ""
+                    _definir_texto_run(r_element, _texto_run(r_element).replace(ph, texto))
+
+
+# Propriedades dos runs das tabelas, compartilhadas por todas as células (10 pt; cabeçalho em negrito)
+_RPR_CABECALHO = '<w:rPr><w:b/><w:sz w:val="20"/></w:rPr>'
+_RPR_CELULA = '<w:rPr><w:sz w:val="20"/></w:rPr>'
+
+def _colunas_e_linhas(valor):
+    """Cabeçalhos e linhas (sequências de valores, na ordem das colunas) de um DataFrame ou list[dict]."""
+    if isinstance(valor, pd.DataFrame):
+        return list(valor.columns), valor.itertuples(index=False, name=None)
+    colunas = list(valor[0].keys())
+    return colunas, ([registro.get(c) for c in colunas] for registro in valor)
+
+_SEPARADORES_RUN = re.compile(r"([\t\r\n])")
+_ELEMENTOS_SEPARADORES = {"\t": "<w:tab/>", "\r": "<w:br/>", "\n": "<w:br/>"}
+
+def _t_xml(texto):
+    # Como em python-docx: xml:space="preserve" só se houver espaço nas pontas
+    if texto.strip() != texto:
+        return f'<w:t xml:space="preserve">{escape(texto)}</w:t>'
+    return f"<w:t>{escape(texto)}</w:t>"
+
+def _run_xml(valor, rpr):
+    """XML do run que `add_run(str(valor))` criaria (None vira vazio; tabulação e quebra de linha viram w:tab/w:br)."""
+    texto = "" if valor is None else str(valor)
+    if not texto:
+        return f"<w:r>{rpr}</w:r>"
+    if "\t" in texto or "\r" in texto or "\n" in texto:
+        conteudo = "".join(_ELEMENTOS_SEPARADORES.get(parte) or _t_xml(parte)
+                           for parte in _SEPARADORES_RUN.split(texto) if parte)
+    else:
+        conteudo = _t_xml(texto)
+    return f"<w:r>{rpr}{conteudo}</w:r>"
+
+def _inserir_tabela_apos(doc, p_element, valor):
+    """
+    Cria uma tabela com grid e cabeçalho em negrito logo após o parágrafo.
+
+    O elemento w:tbl inteiro é montado como texto em uma única passada pelas linhas e
+    analisado de uma vez (`parse_xml`), em vez de criar cada célula e run pela API do
+    python-docx (`table.rows[i].cells` reconstrói a lista de células a cada acesso). O
+    XML é o mesmo que `doc.add_table(..., style='Table Grid')` com `autofit` produzia.
+    """
+    if valor is None or len(valor) == 0:
+        return
+    colunas, linhas = _colunas_e_linhas(valor)
+
+    estilo = doc.styles['Table Grid'].style_id
+    secao = doc.sections[-1]
+    largura = Emu((secao.page_width - secao.left_margin - secao.right_margin) // len(colunas)).twips
+    inicio_celula = f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{largura}"/></w:tcPr><w:p>'
+
+    partes = [
+        f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblStyle w:val="{escape(estilo)}"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLayout w:type="autofit"/><w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" '
+        'w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr><w:tblGrid>',
+        f'<w:gridCol w:w="{largura}"/>' * len(colunas),
+        '</w:tblGrid><w:tr>',
+    ]
+    for c in colunas:
+        partes += (inicio_celula, _run_xml(c, _RPR_CABECALHO), '</w:p></w:tc>')
+    partes.append('</w:tr>')
+    for linha in linhas:
+        partes.append('<w:tr>')
+        for v in linha:
+            partes += (inicio_celula, _run_xml(v, _RPR_CELULA), '</w:p></w:tc>')
+        partes.append('</w:tr>')
+    partes.append('</w:tbl>')
+
+    p_element.addnext(parse_xml("".join(partes)))